@@ -0,0 +1,7 @@
+"""
+Benchmark suite.
+
+Load tests drive the real FastAPI app against local stand-ins for OpenAI,
+Supabase and Telegram; micro-benchmarks time hot helpers in-process. Run
+`python -m benchmarks --help` from the backend directory.
+"""
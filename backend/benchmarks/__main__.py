@@ -0,0 +1,101 @@
+"""
+Run the benchmarks and write the results as JSON.
+
+    python -m benchmarks micro -o micro.json
+    python -m benchmarks load --scenarios health,openai_response --concurrency 64 -o load.json
+    python -m benchmarks all -o results.json
+    python -m benchmarks compare before.json after.json
+
+Run from the backend directory.
+"""
+import argparse
+import json
+import sys
+from typing import Any, Dict, Iterator, Tuple
+
+from .common import environment
+from .fakes import add_arguments as add_fake_arguments, config_from_args
+from .load import SCENARIOS, run_load
+from .micro import run_micro
+
+# Metrics where a higher value is better; for everything else lower is better
+HIGHER_IS_BETTER = ("throughput_rps",)
+
+
+def _flatten(results: Dict[str, Any], prefix: str = "") -> Iterator[Tuple[str, float]]:
+    for key, value in results.items():
+        name = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            yield from _flatten(value, name)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield name, value
+
+
+def compare(before: Dict[str, Any], after: Dict[str, Any]) -> None:
+    """Print the relative change of every numeric result present in both runs"""
+    print(f"before: {before['environment']['commit']}  after: {after['environment']['commit']}")
+    old = dict(_flatten({key: before[key] for key in ("load", "micro") if key in before}))
+    for name, value in _flatten({key: after[key] for key in ("load", "micro") if key in after}):
+        if name.endswith(("requests", ".ops", "lag_samples")) or ".config." in name or name not in old:
+            continue
+        previous = old[name]
+        change = (value - previous) / previous * 100 if previous else 0.0
+        better = change > 0 if name.endswith(HIGHER_IS_BETTER) else change < 0
+        marker = "+" if better and abs(change) >= 5 else "-" if abs(change) >= 5 else " "
+        print(f"{marker} {name:<60} {previous:>12.3f} -> {value:>12.3f}  ({change:+.1f}%)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    for name in ("load", "micro", "all"):
+        command = commands.add_parser(name)
+        command.add_argument("-o", "--output", help="JSON file to write (default: stdout)")
+        if name in ("load", "all"):
+            command.add_argument("--scenarios", help=f"Comma-separated subset of: {', '.join(SCENARIOS)}")
+            command.add_argument("--concurrency", type=int, default=32)
+            command.add_argument("--duration", type=float, default=10.0, help="Measured seconds per scenario")
+            command.add_argument("--warmup", type=float, default=2.0, help="Unmeasured seconds per scenario")
+            command.add_argument("--app-log", help="File for the output of the app and the fakes")
+            add_fake_arguments(command)
+        if name in ("micro", "all"):
+            command.add_argument("--benchmarks", help="Comma-separated subset of micro-benchmarks")
+            command.add_argument("--min-time", type=float, default=0.2, help="Approximate seconds per repeat")
+
+    command = commands.add_parser("compare")
+    command.add_argument("before")
+    command.add_argument("after")
+
+    args = parser.parse_args()
+
+    if args.command == "compare":
+        with open(args.before) as before, open(args.after) as after:
+            compare(json.load(before), json.load(after))
+        return
+
+    results: Dict[str, Any] = {"environment": environment()}
+    if args.command in ("micro", "all"):
+        names = args.benchmarks.split(",") if args.benchmarks else None
+        results["micro"] = run_micro(names, min_time=args.min_time)
+    if args.command in ("load", "all"):
+        results["load"] = run_load(
+            args.scenarios.split(",") if args.scenarios else None,
+            concurrency=args.concurrency,
+            duration=args.duration,
+            warmup=args.warmup,
+            fakes=config_from_args(args),
+            app_log=args.app_log,
+        )
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
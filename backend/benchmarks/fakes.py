@@ -0,0 +1,202 @@
+"""
+Local stand-ins for the OpenAI Responses API, Supabase PostgREST/Storage and the
+Telegram Bot API, served from one process on one port:
+
+    OPENAI_BASE_URL=http://127.0.0.1:<port>/v1
+    SUPABASE_URL=http://127.0.0.1:<port>
+    TELEGRAM_API_URL=http://127.0.0.1:<port>
+
+Each API answers after a configurable latency. Only the parts of the protocols
+this backend uses are implemented.
+
+    python -m benchmarks.fakes --port 8765 --openai-latency 0.3
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from typing import Any, Dict, List
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+
+@dataclass
+class FakeConfig:
+    """Latencies are in seconds"""
+    openai_latency: float = 0.2
+    # Streaming: the first chunk comes after openai_latency, then one every chunk_interval
+    stream_chunks: int = 20
+    chunk_interval: float = 0.01
+    supabase_latency: float = 0.02
+    # Rows returned by a select without an id filter
+    supabase_rows: int = 20
+    storage_object_bytes: int = 64 * 1024
+    telegram_latency: float = 0.05
+
+
+_ids = itertools.count(1)
+
+
+def _response(model: str, text: str, input_tokens: int) -> Dict[str, Any]:
+    return {
+        "id": f"resp_{next(_ids)}",
+        "object": "response",
+        "created_at": int(time.time()),
+        "status": "completed",
+        "model": model,
+        "output": [{
+            "id": f"msg_{next(_ids)}",
+            "type": "message",
+            "role": "assistant",
+            "status": "completed",
+            "content": [{"type": "output_text", "text": text, "annotations": []}],
+        }],
+        "parallel_tool_calls": True,
+        "tool_choice": "auto",
+        "tools": [],
+        "usage": {
+            "input_tokens": input_tokens,
+            "input_tokens_details": {"cached_tokens": 0},
+            "output_tokens": 16,
+            "output_tokens_details": {"reasoning_tokens": 0},
+            "total_tokens": input_tokens + 16,
+        },
+    }
+
+
+def create_app(config: FakeConfig) -> Starlette:
+    calls: Counter = Counter()
+    tables: Dict[str, Dict[str, Dict[str, Any]]] = defaultdict(dict)
+
+    async def responses(request: Request):
+        calls["openai"] += 1
+        body = await request.json()
+        await asyncio.sleep(config.openai_latency)
+        words = [f"word{i} " for i in range(config.stream_chunks)]
+        response = _response(body.get("model", "gpt-4o"), "".join(words), len(json.dumps(body)) // 4)
+        if not body.get("stream"):
+            return JSONResponse(response)
+
+        async def events():
+            sequence = itertools.count()
+            yield _sse({"type": "response.created", "sequence_number": next(sequence),
+                        "response": {**response, "status": "in_progress", "output": []}})
+            for word in words:
+                yield _sse({"type": "response.output_text.delta", "sequence_number": next(sequence),
+                            "item_id": response["output"][0]["id"], "output_index": 0,
+                            "content_index": 0, "delta": word})
+                await asyncio.sleep(config.chunk_interval)
+            yield _sse({"type": "response.completed", "sequence_number": next(sequence), "response": response})
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    async def table(request: Request):
+        calls["supabase"] += 1
+        await asyncio.sleep(config.supabase_latency)
+        rows = tables[request.path_params["table"]]
+        if request.method == "GET":
+            id_filter = request.query_params.get("id", "")
+            if id_filter.startswith("eq."):
+                row = rows.get(id_filter[3:])
+                return JSONResponse([row] if row else [])
+            return JSONResponse([{"id": i, "name": f"row {i}"} for i in range(config.supabase_rows)])
+        if request.method in ("POST", "PATCH"):
+            body = await request.json()
+            new_rows: List[Dict[str, Any]] = body if isinstance(body, list) else [body]
+            for row in new_rows:
+                if "id" in row:
+                    rows[str(row["id"])] = row
+            return JSONResponse(new_rows, status_code=201 if request.method == "POST" else 200)
+        return JSONResponse([])
+
+    async def rpc(request: Request):
+        calls["supabase"] += 1
+        await asyncio.sleep(config.supabase_latency)
+        return JSONResponse([])
+
+    async def storage_object(request: Request):
+        calls["storage"] += 1
+        await asyncio.sleep(config.supabase_latency)
+        if request.method == "GET":
+            return Response(b"x" * config.storage_object_bytes, media_type="application/octet-stream")
+        await request.body()
+        return JSONResponse({"Key": f"{request.path_params['bucket']}/{request.path_params['path']}"})
+
+    async def storage_sign(request: Request):
+        calls["storage"] += 1
+        await asyncio.sleep(config.supabase_latency)
+        path = f"{request.path_params['bucket']}/{request.path_params['path']}"
+        return JSONResponse({"signedURL": f"/object/sign/{path}?token=fake"})
+
+    async def send_message(request: Request):
+        calls["telegram"] += 1
+        body = await request.json()
+        await asyncio.sleep(config.telegram_latency)
+        return JSONResponse({"ok": True, "result": {
+            "message_id": next(_ids), "date": int(time.time()),
+            "chat": {"id": body.get("chat_id")}, "text": body.get("text"),
+        }})
+
+    async def stats(request: Request):
+        return JSONResponse(dict(calls))
+
+    return Starlette(routes=[
+        Route("/v1/responses", responses, methods=["POST"]),
+        Route("/rest/v1/rpc/{function}", rpc, methods=["POST"]),
+        Route("/rest/v1/{table}", table, methods=["GET", "POST", "PATCH", "DELETE"]),
+        Route("/storage/v1/object/sign/{bucket}/{path:path}", storage_sign, methods=["POST"]),
+        Route("/storage/v1/object/{bucket}/{path:path}", storage_object, methods=["GET", "POST", "PUT"]),
+        Route("/bot{token}/sendMessage", send_message, methods=["POST"]),
+        Route("/__fake__/stats", stats, methods=["GET"]),
+    ])
+
+
+def _sse(event: Dict[str, Any]) -> str:
+    return f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    defaults = FakeConfig()
+    parser.add_argument("--openai-latency", type=float, default=defaults.openai_latency)
+    parser.add_argument("--stream-chunks", type=int, default=defaults.stream_chunks)
+    parser.add_argument("--chunk-interval", type=float, default=defaults.chunk_interval)
+    parser.add_argument("--supabase-latency", type=float, default=defaults.supabase_latency)
+    parser.add_argument("--supabase-rows", type=int, default=defaults.supabase_rows)
+    parser.add_argument("--telegram-latency", type=float, default=defaults.telegram_latency)
+
+
+def config_from_args(args: argparse.Namespace) -> FakeConfig:
+    return FakeConfig(
+        openai_latency=args.openai_latency,
+        stream_chunks=args.stream_chunks,
+        chunk_interval=args.chunk_interval,
+        supabase_latency=args.supabase_latency,
+        supabase_rows=args.supabase_rows,
+        telegram_latency=args.telegram_latency,
+    )
+
+
+def config_to_argv(config: FakeConfig) -> List[str]:
+    return [
+        "--openai-latency", str(config.openai_latency),
+        "--stream-chunks", str(config.stream_chunks),
+        "--chunk-interval", str(config.chunk_interval),
+        "--supabase-latency", str(config.supabase_latency),
+        "--supabase-rows", str(config.supabase_rows),
+        "--telegram-latency", str(config.telegram_latency),
+    ]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    add_arguments(parser)
+    args = parser.parse_args()
+    uvicorn.run(create_app(config_from_args(args)), host="127.0.0.1", port=args.port, log_level="warning")
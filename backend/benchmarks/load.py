@@ -0,0 +1,180 @@
+"""
+Load test: start the fake upstream APIs and the real app in separate processes,
+drive each scenario with a fixed number of concurrent clients, and report
+throughput, latency percentiles, event-loop lag and memory per scenario.
+"""
+import asyncio
+import itertools
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+import httpx
+
+from .common import BACKEND_DIR, free_port, summarize_ms, wait_for_port
+from .fakes import FakeConfig, config_to_argv
+
+
+@dataclass(frozen=True)
+class Scenario:
+    name: str
+    method: str
+    path: str
+    # Builds the JSON body of the n-th request (None for no body)
+    body: Optional[Callable[[int], Any]] = None
+    # Read the body as a stream, as an SSE or NDJSON client would
+    stream: bool = False
+
+
+SCENARIOS = {scenario.name: scenario for scenario in (
+    Scenario("health", "GET", "/"),
+    Scenario("sample", "POST", "/sample/test", lambda n: {"name": "bench", "value": n}),
+    Scenario("available_tools", "GET", "/openai/available-tools"),
+    Scenario("openai_response", "POST", "/openai/response", lambda n: {"input": f"Question {n}", "cache": False}),
+    Scenario("openai_stream", "POST", "/openai/response",
+             lambda n: {"input": f"Question {n}", "stream": True}, stream=True),
+    # Server-side conversations persisted through the fake PostgREST (select + upsert per turn)
+    Scenario("openai_conversation", "POST", "/openai/response",
+             lambda n: {"input": f"Turn {n}", "conversation_id": f"bench-{n % 50}", "cache": False}),
+    Scenario("openai_batch", "POST", "/openai/batch",
+             lambda n: {"items": [{"input": f"Item {n}-{i}", "cache": False} for i in range(10)]}, stream=True),
+    Scenario("telegram_send", "POST", "/telegram/bot/send", lambda n: {"message": f"Message {n}", "wait": True}),
+)}
+
+
+def app_environment(fake_port: int) -> Dict[str, str]:
+    """Environment for the app under test: every upstream points at the fakes, client-side throttles are off"""
+    fake_url = f"http://127.0.0.1:{fake_port}"
+    return {
+        **os.environ,
+        "OPENAI_API_KEY": "bench",
+        "OPENAI_BASE_URL": f"{fake_url}/v1",
+        "SUPABASE_URL": fake_url,
+        "SUPABASE_SERVICE_KEY": "bench",
+        "TELEGRAM_API_URL": fake_url,
+        "TELEGRAM_BOT_TOKEN": "bench",
+        "GROUP_CHAT_ID": "1",
+        "TELEGRAM_CHAT_INTERVAL": "0",
+        "TELEGRAM_GROUP_INTERVAL": "0",
+        "TELEGRAM_GLOBAL_RATE": "1000000",
+        "OPENAI_CONVERSATION_TABLE": "conversations",
+        "OPENAI_CONVERSATION_CACHE_TTL": "0",
+    }
+
+
+@contextmanager
+def _process(args: List[str], port: int, env: Dict[str, str], log) -> Iterator[subprocess.Popen]:
+    process = subprocess.Popen(
+        [sys.executable, "-m", *args, "--port", str(port)],
+        cwd=BACKEND_DIR, env=env, stdout=log, stderr=subprocess.STDOUT,
+    )
+    try:
+        wait_for_port(port)
+        yield process
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+async def _drive(client: httpx.AsyncClient, scenario: Scenario, concurrency: int, duration: float) -> Dict[str, Any]:
+    """Run concurrent closed-loop clients for duration seconds"""
+    counter = itertools.count()
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+    deadline = time.perf_counter() + duration
+
+    async def client_loop():
+        while time.perf_counter() < deadline:
+            n = next(counter)
+            body = scenario.body(n) if scenario.body else None
+            started = time.perf_counter()
+            try:
+                if scenario.stream:
+                    async with client.stream(scenario.method, scenario.path, json=body) as response:
+                        async for _ in response.aiter_raw():
+                            pass
+                else:
+                    response = await client.request(scenario.method, scenario.path, json=body)
+                status = response.status_code
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            latencies.append(time.perf_counter() - started)
+            if not isinstance(status, int) or status >= 400:
+                errors[str(status)] = errors.get(str(status), 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 2),
+        "latency_ms": summarize_ms(latencies),
+    }
+
+
+async def _run_scenarios(port: int, scenarios: Sequence[Scenario], concurrency: int,
+                         duration: float, warmup: float) -> Dict[str, Any]:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=120) as client:
+        results = {}
+        for scenario in scenarios:
+            if warmup:
+                await _drive(client, scenario, concurrency, warmup)
+            await client.get("/__bench__/stats", params={"reset": "true"})
+            result = await _drive(client, scenario, concurrency, duration)
+            server = (await client.get("/__bench__/stats")).json()
+            result["loop_lag_ms"] = server["loop_lag_ms"]
+            result["rss_mb"] = server.get("rss_mb")
+            result["peak_rss_mb"] = server.get("peak_rss_mb")
+            results[scenario.name] = result
+            print(f"{scenario.name}: {result['throughput_rps']} req/s, "
+                  f"p99 {result['latency_ms']['p99']} ms, loop lag p99 {result['loop_lag_ms']['p99']} ms",
+                  file=sys.stderr)
+        return results
+
+
+def run_load(scenario_names: Optional[Sequence[str]] = None, concurrency: int = 32, duration: float = 10.0,
+             warmup: float = 2.0, fakes: Optional[FakeConfig] = None, app_log: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Run the load test.
+
+    Args:
+        scenario_names: Scenarios to run, in order (default: all)
+        concurrency: Concurrent closed-loop clients
+        duration: Seconds each scenario is measured
+        warmup: Seconds each scenario runs before measuring
+        fakes: Latency settings of the fake upstream APIs
+        app_log: File for the app's and fakes' output (default: discarded)
+
+    Returns:
+        {"config": ..., "scenarios": {name: results}}
+    """
+    names = list(scenario_names or SCENARIOS)
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        raise ValueError(f"Unknown scenarios: {', '.join(unknown)}")
+    fakes = fakes or FakeConfig()
+
+    fake_port, app_port = free_port(), free_port()
+    with open(app_log or os.devnull, "ab") as log, tempfile.TemporaryDirectory() as workdir:
+        env = app_environment(fake_port)
+        # Metrics in multiprocess mode, as under gunicorn
+        env["PROMETHEUS_MULTIPROC_DIR"] = workdir
+        with _process(["benchmarks.fakes", *config_to_argv(fakes)], fake_port, dict(os.environ), log), \
+                _process(["benchmarks.serve"], app_port, env, log):
+            scenarios = [SCENARIOS[name] for name in names]
+            results = asyncio.run(_run_scenarios(app_port, scenarios, concurrency, duration, warmup))
+
+    return {
+        "config": {"concurrency": concurrency, "duration_s": duration, "warmup_s": warmup, "fakes": vars(fakes)},
+        "scenarios": results,
+    }
@@ -0,0 +1,83 @@
+"""
+Micro-benchmarks of per-request helpers, timed in-process with timeit.
+"""
+import os
+import sys
+import timeit
+from typing import Any, Callable, Dict, Optional, Sequence
+
+# Repeats per benchmark; the best one is reported as the estimate least disturbed by noise
+REPEATS = 5
+
+
+def _time(func: Callable[[], Any], min_time: float = 0.2) -> Dict[str, float]:
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    number = max(1, int(number * min_time / 0.2))
+    runs = [seconds / number for seconds in timer.repeat(repeat=REPEATS, number=number)]
+    return {
+        "ns_per_op": round(min(runs) * 1e9, 1),
+        "ns_per_op_median": round(sorted(runs)[len(runs) // 2] * 1e9, 1),
+        "ops": number * REPEATS,
+    }
+
+
+def _benchmarks() -> Dict[str, Callable[[], Any]]:
+    """Build the benchmarked callables; imports happen here so the app's settings come from the environment"""
+    os.environ.setdefault("OPENAI_API_KEY", "bench")
+    os.environ.setdefault("SUPABASE_URL", "http://127.0.0.1:9")
+    os.environ.setdefault("SUPABASE_SERVICE_KEY", "bench")
+
+    from controller.tools import Tools
+    from controller.openai.response_cache import ResponseCache
+    from controller.supabase.filters import Col, apply_filters, select_columns
+    from controller.supabase.supabase_utils import SupabaseController, apply_order
+    from routes.openai_route import ResponseRequest, BatchRequest
+
+    tool_names = [definition["name"] for definition in Tools.get_all_tools_definitions()]
+    messages = [{"role": "user" if i % 2 == 0 else "assistant", "content": f"Message {i} " * 20} for i in range(20)]
+    batch = {"items": [{"input": f"Item {i}", "tools": tool_names} for i in range(100)]}
+    tool_definitions = Tools.get_tools_by_names(tool_names)
+
+    controller = SupabaseController()
+    filters = [{"status": "active", "org_id": 42}, Col("age").gte(18) & Col("age").lt(65) | Col("vip").is_(True)]
+
+    def build_select():
+        query = controller.client.table("profiles").select(select_columns(["id", "name", "email", "age"]))
+        query = apply_filters(query, filters)
+        query = apply_order(query, {"created_at": "desc"})
+        return query.range(100, 149)
+
+    return {
+        "tools.get_tools_by_names": lambda: Tools.get_tools_by_names(tool_names),
+        "tools.get_function_tools_by_names": lambda: Tools.get_function_tools_by_names(tool_names),
+        "tools.get_all_tools_definitions": Tools.get_all_tools_definitions,
+        "validate.response_request_text": lambda: ResponseRequest.model_validate(
+            {"input": "What is the weather in Paris?", "tools": tool_names}),
+        "validate.response_request_messages": lambda: ResponseRequest.model_validate({"input": messages}),
+        "validate.batch_request_100": lambda: BatchRequest.model_validate(batch),
+        "supabase.build_select": build_select,
+        "openai.response_cache_key": lambda: ResponseCache.key("gpt-4o", messages, tool_definitions, 0),
+    }
+
+
+def run_micro(names: Optional[Sequence[str]] = None, min_time: float = 0.2) -> Dict[str, Any]:
+    """
+    Run the micro-benchmarks.
+
+    Args:
+        names: Benchmarks to run (default: all)
+        min_time: Approximate seconds per repeat
+
+    Returns:
+        {name: {"ns_per_op", "ns_per_op_median", "ops"}}
+    """
+    benchmarks = _benchmarks()
+    unknown = [name for name in names or () if name not in benchmarks]
+    if unknown:
+        raise ValueError(f"Unknown benchmarks: {', '.join(unknown)}")
+    results = {}
+    for name in names or benchmarks:
+        results[name] = _time(benchmarks[name], min_time)
+        print(f"{name}: {results[name]['ns_per_op']} ns/op", file=sys.stderr)
+    return results
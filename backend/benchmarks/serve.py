@@ -0,0 +1,45 @@
+"""
+Serve the real app from main.py for load tests, with one extra route,
+GET /__bench__/stats, that reports event-loop lag and memory of the process.
+
+    python -m benchmarks.serve --port 8000
+"""
+import argparse
+
+import uvicorn
+
+from controller.observability import LoopMonitor
+
+from .common import memory_mb, reset_peak_memory, summarize_ms
+
+# How often the lag probe wakes up; its oversleep is the loop lag
+LAG_PROBE_INTERVAL = 0.01
+# Lag samples kept per window: ten minutes at LAG_PROBE_INTERVAL
+LAG_PROBE_HISTORY = 60_000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+
+    from main import app
+
+    # The diagnostics heartbeat at a finer interval, keeping every sample of a window
+    probe = LoopMonitor(interval=LAG_PROBE_INTERVAL, lag_history=LAG_PROBE_HISTORY)
+
+    async def bench_stats(reset: bool = False):
+        """Loop lag since the last reset and current memory; reset=true starts a new window"""
+        probe.start()
+        result = {"loop_lag_ms": summarize_ms(list(probe.lags)), "lag_samples": probe.lag_samples, **memory_mb()}
+        if reset:
+            probe.reset_lag()
+            reset_peak_memory()
+        return result
+
+    app.add_api_route("/__bench__/stats", bench_stats, methods=["GET"], include_in_schema=False)
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,10 @@
+"""
+Cache package.
+Contains in-process and on-disk caches and request coalescing helpers shared by the controllers.
+"""
+
+from .ttl_cache import TTLCache, MISSING
+from .sqlite_cache import SQLiteCache
+from .single_flight import SingleFlight, AsyncSingleFlight
+
+__all__ = ['TTLCache', 'SQLiteCache', 'SingleFlight', 'AsyncSingleFlight', 'MISSING']
@@ -0,0 +1,58 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key across threads.
+
+    The first caller runs the function; callers that arrive while it is running
+    wait for and share its result (or exception).
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, Future] = {}
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+
+        if not leader:
+            return future.result()
+
+        try:
+            future.set_result(fn())
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+        return future.result()
+
+
+class AsyncSingleFlight:
+    """
+    Coalesces concurrent awaits with the same key on one event loop.
+
+    The first caller runs the coroutine as a task; callers that arrive while it is
+    running await the same task. Cancelling a waiter does not cancel the shared call.
+    """
+    def __init__(self):
+        self._calls: Dict[Hashable, "asyncio.Task[Any]"] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._calls.pop(key) if self._calls.get(key) is done else None)
+        return await asyncio.shield(task)
+
+    def in_flight(self) -> int:
+        return len(self._calls)
@@ -0,0 +1,145 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from .ttl_cache import MISSING
+
+
+class SQLiteCache:
+    """
+    On-disk cache backed by a SQLite file.
+
+    Every gunicorn worker that opens the same path shares the same entries.
+    Values must be JSON serializable. Connections are kept per thread and the
+    database runs in WAL mode so readers do not block the writer.
+    Expired and least recently used entries are pruned every EVICT_EVERY writes.
+    A hit records its access time only when the stored one is older than
+    TOUCH_FRACTION of the ttl, so most reads do not take the write lock.
+    """
+    EVICT_EVERY = 64
+    TOUCH_FRACTION = 0.1
+    # Seconds between access time updates when entries never expire
+    TOUCH_INTERVAL = 60
+
+    def __init__(self, path: str, ttl: Optional[float] = 300, max_size: int = 100_000, namespace: str = "default"):
+        """
+        Args:
+            path: Path of the SQLite database file
+            ttl: Default time to live in seconds (None means entries never expire)
+            max_size: Maximum number of entries kept in this namespace
+            namespace: Prefix that separates caches stored in the same file
+        """
+        self.path = path
+        self.ttl = ttl
+        self.max_size = max_size
+        self.namespace = namespace
+        self._local = threading.local()
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._touch_after = ttl * self.TOUCH_FRACTION if ttl else self.TOUCH_INTERVAL
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        conn = self._connection()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, "
+            "expires_at REAL, accessed_at REAL NOT NULL, PRIMARY KEY (namespace, key))"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS cache_accessed ON cache (namespace, accessed_at)")
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        # Connections must not cross a fork, so reconnect in a new process
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key: str, default: Any = MISSING) -> Any:
+        """Get a value, or default if the key is missing or expired"""
+        now = time.time()
+        conn = self._connection()
+        row = conn.execute(
+            "SELECT value, expires_at, accessed_at FROM cache WHERE namespace = ? AND key = ?",
+            (self.namespace, key),
+        ).fetchone()
+        if row is None or (row[1] is not None and row[1] <= now):
+            self.misses += 1
+            return default
+        if now - row[2] >= self._touch_after:
+            conn.execute(
+                "UPDATE cache SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                (now, self.namespace, key),
+            )
+        self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = MISSING) -> None:
+        """
+        Store a value.
+
+        Args:
+            key: Cache key
+            value: JSON serializable value to store
+            ttl: Time to live in seconds for this entry (default: the cache ttl)
+        """
+        if ttl is MISSING:
+            ttl = self.ttl
+        now = time.time()
+        expires_at = now + ttl if ttl is not None else None
+        conn = self._connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache (namespace, key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+            (self.namespace, key, json.dumps(value, default=str), expires_at, now),
+        )
+        self._writes += 1
+        if self._writes % self.EVICT_EVERY == 0:
+            self._evict(conn, now)
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        conn.execute(
+            "DELETE FROM cache WHERE namespace = ? AND expires_at IS NOT NULL AND expires_at <= ?",
+            (self.namespace, now),
+        )
+        conn.execute(
+            "DELETE FROM cache WHERE namespace = ? AND key IN ("
+            "SELECT key FROM cache WHERE namespace = ? ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.namespace, self.namespace, self.max_size),
+        )
+
+    def delete(self, key: str) -> None:
+        self._connection().execute("DELETE FROM cache WHERE namespace = ? AND key = ?", (self.namespace, key))
+
+    def delete_prefix(self, prefix: str) -> int:
+        """Delete every entry whose key starts with prefix. Returns the number deleted."""
+        escaped = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        cursor = self._connection().execute(
+            "DELETE FROM cache WHERE namespace = ? AND key LIKE ? ESCAPE '\\'",
+            (self.namespace, escaped + "%"),
+        )
+        return cursor.rowcount
+
+    def clear(self) -> None:
+        self._connection().execute("DELETE FROM cache WHERE namespace = ?", (self.namespace,))
+
+    def stats(self) -> Dict[str, Any]:
+        """Get hit/miss statistics for this process"""
+        size = self._connection().execute(
+            "SELECT COUNT(*) FROM cache WHERE namespace = ?", (self.namespace,)
+        ).fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "size": size,
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
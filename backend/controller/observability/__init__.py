@@ -0,0 +1,28 @@
+"""
+Observability package.
+Contains structured, queue-based logging, lightweight request tracing and
+Prometheus metrics, plus opt-in event loop diagnostics and sampling profiling.
+"""
+
+from .tracing import span, start_trace, current_trace_id, add_span_observer, TraceMiddleware
+from .logging_setup import configure_logging, shutdown_logging, dropped_records
+from .metrics import MetricsMiddleware, generate_metrics, mark_process_dead
+from .diagnostics import LoopMonitor, SamplingProfiler, ProfileMiddleware, loop_monitor
+
+__all__ = [
+    'span',
+    'start_trace',
+    'current_trace_id',
+    'add_span_observer',
+    'TraceMiddleware',
+    'configure_logging',
+    'shutdown_logging',
+    'dropped_records',
+    'MetricsMiddleware',
+    'generate_metrics',
+    'mark_process_dead',
+    'LoopMonitor',
+    'SamplingProfiler',
+    'ProfileMiddleware',
+    'loop_monitor',
+]
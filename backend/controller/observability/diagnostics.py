@@ -0,0 +1,343 @@
+import asyncio
+import collections
+import logging
+import os
+import re
+import secrets
+import sys
+import threading
+import time
+import traceback
+import uuid
+from typing import Any, Deque, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+from .metrics import EVENT_LOOP_BLOCKS, EVENT_LOOP_LAG
+from .tracing import current_trace_id
+
+load_dotenv()
+
+# Opt-in: loop monitoring, blocked-loop stacks and the /diagnostics admin routes
+DIAGNOSTICS_ENABLED = os.getenv('DIAGNOSTICS_ENABLED', 'false').lower() == 'true'
+# Token the admin routes and per-request profiling require (X-Diagnostics-Token header)
+DIAGNOSTICS_ADMIN_TOKEN = os.getenv('DIAGNOSTICS_ADMIN_TOKEN')
+# Seconds between loop heartbeats; each heartbeat's oversleep is a lag sample
+DIAGNOSTICS_LAG_INTERVAL = float(os.getenv('DIAGNOSTICS_LAG_INTERVAL', 0.05))
+# A loop that has not run a heartbeat for this many seconds is reported as blocked
+DIAGNOSTICS_BLOCK_THRESHOLD = float(os.getenv('DIAGNOSTICS_BLOCK_THRESHOLD', 0.1))
+# Seconds between profiler samples
+DIAGNOSTICS_PROFILE_INTERVAL = float(os.getenv('DIAGNOSTICS_PROFILE_INTERVAL', 0.005))
+DIAGNOSTICS_PROFILE_MAX_SECONDS = float(os.getenv('DIAGNOSTICS_PROFILE_MAX_SECONDS', 60))
+# Profiles are written here as collapsed stacks, the input format of flamegraph.pl and speedscope
+DIAGNOSTICS_PROFILE_DIR = os.getenv('DIAGNOSTICS_PROFILE_DIR', '/tmp/backend_profiles')
+
+logger = logging.getLogger(__name__)
+
+# Characters allowed in profile names, which become file names
+_UNSAFE_NAME = re.compile(r'[^A-Za-z0-9_-]')
+
+_site_prefixes = sorted({os.path.dirname(os.__file__), *sys.path[1:]}, key=len, reverse=True)
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    filename = code.co_filename
+    for prefix in _site_prefixes:
+        if prefix and filename.startswith(prefix):
+            filename = filename[len(prefix):].lstrip(os.sep)
+            break
+    name = getattr(code, 'co_qualname', code.co_name)
+    return f"{name} ({filename}:{code.co_firstlineno})"
+
+
+def collapse_stack(frame) -> str:
+    """Render a stack root-first as 'a;b;c', the collapsed format"""
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    return ';'.join(reversed(labels))
+
+
+class LoopMonitor:
+    """
+    Watches an event loop for lag and for callbacks that block it.
+
+    A heartbeat task records how late each of its timers fires (the loop lag). A
+    watchdog thread checks that the heartbeat keeps running; when it has been
+    silent for longer than the threshold, the loop is blocked right now, so the
+    watchdog captures the loop thread's stack, which shows the offending code.
+    """
+    def __init__(
+        self,
+        interval: float = DIAGNOSTICS_LAG_INTERVAL,
+        threshold: float = DIAGNOSTICS_BLOCK_THRESHOLD,
+        history: int = 50,
+        lag_history: int = 1000,
+    ):
+        """
+        Args:
+            interval: Seconds between heartbeats
+            threshold: Seconds without a heartbeat after which the loop counts as blocked
+            history: Number of recent blocked-loop events kept
+            lag_history: Number of recent lag samples kept in lags
+        """
+        self.interval = interval
+        self.threshold = threshold
+        self.blocks: Deque[Dict[str, Any]] = collections.deque(maxlen=history)
+        self.lags: Deque[float] = collections.deque(maxlen=lag_history)
+        self.lag_max = 0.0
+        self.lag_samples = 0
+        self.lag_total = 0.0
+        self._last_beat = time.monotonic()
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def start(self) -> None:
+        """Start monitoring the running loop; call from inside it"""
+        if self._task is not None and not self._task.done():
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.get_running_loop().create_task(self._heartbeat())
+        self._watchdog = threading.Thread(target=self._watch, name='loop-watchdog', daemon=True)
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _heartbeat(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - started - self.interval)
+            self._last_beat = time.monotonic()
+            self.lag_samples += 1
+            self.lag_total += lag
+            self.lag_max = max(self.lag_max, lag)
+            self.lags.append(lag)
+            EVENT_LOOP_LAG.observe(lag)
+
+    def reset_lag(self) -> None:
+        """Start a new window for the lag statistics"""
+        self.lag_max = 0.0
+        self.lag_samples = 0
+        self.lag_total = 0.0
+        self.lags.clear()
+
+    def _watch(self) -> None:
+        current: Optional[Dict[str, Any]] = None
+        while not self._stop.wait(self.threshold / 2):
+            silent = time.monotonic() - self._last_beat - self.interval
+            if silent < self.threshold:
+                current = None
+                continue
+            if current is not None:
+                # Still the same stall; keep its duration up to date
+                current['blocked_ms'] = round(silent * 1000, 1)
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            current = {
+                'at': time.time(),
+                'blocked_ms': round(silent * 1000, 1),
+                'stack': ''.join(traceback.format_stack(frame)) if frame is not None else '',
+            }
+            self.blocks.append(current)
+            EVENT_LOOP_BLOCKS.inc()
+            logger.warning('Event loop blocked for %.0f ms', silent * 1000, extra={'stack': current['stack']})
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'running': self._task is not None and not self._task.done(),
+            'interval_s': self.interval,
+            'threshold_s': self.threshold,
+            'lag_mean_ms': round(self.lag_total / self.lag_samples * 1000, 3) if self.lag_samples else 0.0,
+            'lag_max_ms': round(self.lag_max * 1000, 3),
+            'lag_samples': self.lag_samples,
+            'blocked': list(self.blocks),
+        }
+
+
+class SamplingProfiler:
+    """
+    Samples thread stacks from a background thread and counts them as collapsed stacks.
+
+    While it runs, the cost is one sys._current_frames() call and stack walk per
+    interval; nothing is hooked into the profiled code, so there is none after.
+    """
+    def __init__(self, interval: float = DIAGNOSTICS_PROFILE_INTERVAL, thread_id: Optional[int] = None,
+                 root_frame=None):
+        """
+        Args:
+            interval: Seconds between samples
+            thread_id: Sample only this thread (default: every thread except the sampler)
+            root_frame: Keep only samples whose stack passes through this frame, and
+                drop the frames above it (used to profile a single request)
+        """
+        self.interval = interval
+        self.thread_id = thread_id
+        self.root_frame = root_frame
+        self.counts: collections.Counter = collections.Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "SamplingProfiler":
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> "SamplingProfiler":
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        while not self._stop.wait(self.interval):
+            self.samples += 1
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own or (self.thread_id is not None and thread_id != self.thread_id):
+                    continue
+                if self.root_frame is not None:
+                    stack = self._below_root(frame)
+                    if stack is None:
+                        continue
+                else:
+                    stack = collapse_stack(frame)
+                if thread_id not in names:
+                    names = {thread.ident: thread.name for thread in threading.enumerate()}
+                self.counts[f"{names.get(thread_id, thread_id)};{stack}"] += 1
+
+    def _below_root(self, frame) -> Optional[str]:
+        """The stack from root_frame down, or None if root_frame is not on it"""
+        labels = []
+        while frame is not None:
+            labels.append(_frame_label(frame))
+            if frame is self.root_frame:
+                return ';'.join(reversed(labels))
+            frame = frame.f_back
+        return None
+
+    def collapsed(self) -> str:
+        """One 'frame;frame;frame count' line per distinct stack"""
+        return ''.join(f"{stack} {count}\n" for stack, count in self.counts.most_common())
+
+    def write(self, name: str) -> str:
+        """Write the collapsed stacks to the profile directory and return the file path"""
+        if not name or _UNSAFE_NAME.search(name):
+            raise ValueError(f"Invalid profile name: {name!r}")
+        os.makedirs(DIAGNOSTICS_PROFILE_DIR, exist_ok=True)
+        path = os.path.join(DIAGNOSTICS_PROFILE_DIR, f"{name}.collapsed")
+        with open(path, 'w') as file:
+            file.write(self.collapsed())
+        return path
+
+
+async def profile_window(seconds: float, loop_only: bool = False) -> SamplingProfiler:
+    """
+    Profile the whole process for a time window.
+
+    Args:
+        seconds: Length of the window (capped at DIAGNOSTICS_PROFILE_MAX_SECONDS)
+        loop_only: Sample only the event loop thread
+
+    Returns:
+        The stopped profiler
+    """
+    seconds = min(seconds, DIAGNOSTICS_PROFILE_MAX_SECONDS)
+    profiler = SamplingProfiler(thread_id=threading.get_ident() if loop_only else None).start()
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        # Joining takes up to one sampling interval, so keep it off the loop
+        await asyncio.to_thread(profiler.stop)
+    return profiler
+
+
+def list_profiles() -> List[Dict[str, Any]]:
+    if not os.path.isdir(DIAGNOSTICS_PROFILE_DIR):
+        return []
+    profiles = []
+    for entry in sorted(os.scandir(DIAGNOSTICS_PROFILE_DIR), key=lambda entry: entry.stat().st_mtime, reverse=True):
+        if entry.name.endswith('.collapsed'):
+            profiles.append({'name': entry.name, 'bytes': entry.stat().st_size, 'modified': entry.stat().st_mtime})
+    return profiles
+
+
+def profile_path(name: str) -> Optional[str]:
+    """Path of a written profile, or None if there is none by that name"""
+    if os.path.basename(name) != name or not name.endswith('.collapsed'):
+        return None
+    path = os.path.join(DIAGNOSTICS_PROFILE_DIR, name)
+    return path if os.path.isfile(path) else None
+
+
+def is_admin(token: Optional[str]) -> bool:
+    if not DIAGNOSTICS_ADMIN_TOKEN or token is None:
+        return False
+    # Constant-time, so response timing does not reveal how much of a guess was right
+    return secrets.compare_digest(token.encode(), DIAGNOSTICS_ADMIN_TOKEN.encode())
+
+
+class ProfileMiddleware:
+    """
+    ASGI middleware that profiles single requests sent with an X-Profile header
+    and a valid X-Diagnostics-Token.
+
+    Only samples of this request's own code running on the event loop are kept,
+    so concurrent requests do not show up; work it hands to other threads is not
+    included. The profile is written to the profile directory and its file name
+    returned in the X-Profile header.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or not self._requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        # The trace id may come from the client's X-Request-ID, so keep only safe characters
+        trace_id = _UNSAFE_NAME.sub('', current_trace_id() or '')
+        name = f"request-{trace_id or uuid.uuid4().hex}"
+        profiler = SamplingProfiler(thread_id=threading.get_ident(), root_frame=sys._getframe())
+
+        async def send_with_profile_name(message):
+            if message['type'] == 'http.response.start':
+                message['headers'] = list(message.get('headers', [])) + [(b'x-profile', f"{name}.collapsed".encode())]
+            await send(message)
+
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_with_profile_name)
+        finally:
+            await asyncio.to_thread(profiler.stop)
+            await asyncio.to_thread(profiler.write, name)
+
+    @staticmethod
+    def _requested(scope) -> bool:
+        profile = token = None
+        for key, value in scope.get('headers') or ():
+            if key == b'x-profile':
+                profile = value
+            elif key == b'x-diagnostics-token':
+                token = value.decode('latin-1')
+        return profile is not None and is_admin(token)
+
+
+loop_monitor = LoopMonitor()
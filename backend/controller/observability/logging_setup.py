@@ -0,0 +1,139 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import sys
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+from dotenv import load_dotenv
+
+from .tracing import current_trace_id
+
+load_dotenv()
+
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+# json: one JSON object per line; text: human-readable lines for local development
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'json').lower()
+# Share of DEBUG and INFO records kept; warnings and errors are always kept
+LOG_SAMPLE_RATE = float(os.getenv('LOG_SAMPLE_RATE', 1.0))
+# Records buffered for the writer thread; when full, new records are dropped rather than blocking
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', 10000))
+
+# Loggers of this application; everything else (uvicorn, httpx, ...) keeps its own configuration
+APP_LOGGERS = ('controller', 'routes', 'main')
+
+# Attributes every LogRecord has; anything else on a record came from extra=
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'trace_id'}
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats records as single-line JSON, including fields passed through extra="""
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            'ts': record.created,
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        trace_id = getattr(record, 'trace_id', None)
+        if trace_id:
+            data['trace_id'] = trace_id
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith('_'):
+                data[key] = value
+        if record.exc_info:
+            data['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(data, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps a random share of records below WARNING"""
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno >= logging.WARNING or self.rate >= 1 or random.random() < self.rate
+
+
+class TraceContextFilter(logging.Filter):
+    """Stamps records with the current trace id. Runs in the logging thread, before the record is queued."""
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.trace_id = current_trace_id() or '-'
+        return True
+
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler that drops records instead of raising when the queue is full"""
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_listener: Optional[QueueListener] = None
+_handler: Optional[DroppingQueueHandler] = None
+
+
+def configure_logging(level: str = LOG_LEVEL, fmt: str = LOG_FORMAT, sample_rate: float = LOG_SAMPLE_RATE) -> None:
+    """
+    Route the application loggers through a bounded queue to a writer thread.
+
+    Callers only pay for the level check and, for records that pass it, message
+    formatting; writing to stdout happens on the listener thread. Call it once
+    per process after forking (the FastAPI lifespan does); later calls are no-ops.
+
+    Args:
+        level: Minimum level of application records
+        fmt: "json" or "text"
+        sample_rate: Share of DEBUG and INFO records kept
+    """
+    global _listener, _handler
+    if _listener is not None:
+        return
+
+    stream = logging.StreamHandler(sys.stdout)
+    if fmt == 'json':
+        stream.setFormatter(JsonFormatter())
+    else:
+        stream.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s [%(trace_id)s] %(message)s'))
+
+    _handler = DroppingQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+    _handler.addFilter(SamplingFilter(sample_rate))
+    _handler.addFilter(TraceContextFilter())
+
+    for name in APP_LOGGERS:
+        logger = logging.getLogger(name)
+        logger.setLevel(level)
+        logger.addHandler(_handler)
+        logger.propagate = False
+
+    _listener = QueueListener(_handler.queue, stream)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the writer thread"""
+    global _listener, _handler
+    if _listener is None:
+        return
+    _listener.stop()
+    for name in APP_LOGGERS:
+        logging.getLogger(name).removeHandler(_handler)
+        logging.getLogger(name).propagate = True
+    _listener = None
+    _handler = None
+
+
+def dropped_records() -> int:
+    """Number of records dropped because the queue was full"""
+    return _handler.dropped if _handler is not None else 0
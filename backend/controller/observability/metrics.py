@@ -0,0 +1,166 @@
+import os
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from dotenv import load_dotenv
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client import multiprocess
+
+from .tracing import add_span_observer
+
+load_dotenv()
+
+# Set by gunicorn_config.py before the app is imported; each worker then writes its
+# samples to files there and /metrics sums them across workers
+PROMETHEUS_MULTIPROC_DIR = os.getenv('PROMETHEUS_MULTIPROC_DIR')
+
+# Seconds; wide enough for both fast routes and long tool loops.
+# Percentiles come from histogram_quantile() over these buckets.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+# Span name prefixes that are calls to an upstream dependency
+DEPENDENCIES = ('openai', 'tool', 'supabase', 'telegram')
+# Spans under those prefixes that measure our own waiting rather than the dependency
+_NOT_DEPENDENCY_CALLS = {'openai.rate_limit.wait'}
+
+HTTP_REQUESTS = Counter(
+    'http_requests_total', 'HTTP requests', ['method', 'route', 'status'],
+)
+HTTP_LATENCY = Histogram(
+    'http_request_duration_seconds', 'HTTP request latency until the response is complete',
+    ['method', 'route'], buckets=LATENCY_BUCKETS,
+)
+HTTP_IN_FLIGHT = Gauge(
+    'http_requests_in_flight', 'HTTP requests being handled', multiprocess_mode='livesum',
+)
+DEPENDENCY_LATENCY = Histogram(
+    'dependency_duration_seconds', 'Latency of calls to upstream dependencies',
+    ['dependency', 'operation'], buckets=LATENCY_BUCKETS,
+)
+DEPENDENCY_ERRORS = Counter(
+    'dependency_errors_total', 'Failed calls to upstream dependencies', ['dependency', 'operation', 'error'],
+)
+DEPENDENCY_IN_FLIGHT = Gauge(
+    'dependency_calls_in_flight', 'Calls to upstream dependencies in progress', ['dependency'],
+    multiprocess_mode='livesum',
+)
+EVENT_LOOP_LAG = Histogram(
+    'event_loop_lag_seconds', 'How late event loop timers fire; recorded when diagnostics are enabled',
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+EVENT_LOOP_BLOCKS = Counter(
+    'event_loop_blocked_total', 'Times the event loop was blocked longer than the diagnostics threshold',
+)
+
+# Labelled children, looked up once per label set; .labels() takes a lock on every call
+_children: Dict[Tuple[Any, ...], Any] = {}
+
+
+def _child(metric, *labels: str):
+    key = (metric, *labels)
+    child = _children.get(key)
+    if child is None:
+        child = _children[key] = metric.labels(*labels)
+    return child
+
+
+def _dependency(name: str, attributes: Dict[str, Any]) -> Optional[Tuple[str, str]]:
+    """Map a span to (dependency, operation), or None if it is not an upstream call"""
+    dependency, _, operation = name.partition('.')
+    if dependency not in DEPENDENCIES or name in _NOT_DEPENDENCY_CALLS:
+        return None
+    if dependency == 'tool':
+        # One series per tool; tool names come from the registry, so the label set stays small
+        operation = attributes.get('tool') or operation
+    return dependency, operation
+
+
+def _span_started(name: str, attributes: Dict[str, Any]) -> None:
+    dependency = _dependency(name, attributes)
+    if dependency is not None:
+        _child(DEPENDENCY_IN_FLIGHT, dependency[0]).inc()
+
+
+def _span_finished(name: str, attributes: Dict[str, Any], seconds: float, error: Optional[str]) -> None:
+    dependency = _dependency(name, attributes)
+    if dependency is None:
+        return
+    _child(DEPENDENCY_IN_FLIGHT, dependency[0]).dec()
+    _child(DEPENDENCY_LATENCY, *dependency).observe(seconds)
+    if error is not None:
+        _child(DEPENDENCY_ERRORS, *dependency, error).inc()
+
+
+add_span_observer(_span_started, _span_finished)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware that counts and times HTTP requests.
+
+    Requests are labelled with the route template (e.g. /openai/batch/{batch_id}),
+    not the raw path, so path parameters do not create new series; requests that
+    match no route are labelled "unmatched". Latency runs until the last body
+    chunk is sent, so streamed responses are measured in full.
+    """
+    def __init__(self, app, exclude: Tuple[str, ...] = ('/metrics',)):
+        self.app = app
+        self.exclude = exclude
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope['path'] in self.exclude:
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            # The router stores the matched route in the scope
+            route = scope.get('route')
+            path = getattr(route, 'path', None) or 'unmatched'
+            method = scope['method']
+            _child(HTTP_LATENCY, method, path).observe(time.perf_counter() - started)
+            _child(HTTP_REQUESTS, method, path, str(status)).inc()
+
+
+def generate_metrics() -> Tuple[bytes, str]:
+    """
+    Render all metrics in the Prometheus text format.
+
+    With PROMETHEUS_MULTIPROC_DIR set, the samples of every worker are read from
+    their files and aggregated, so any worker can answer a scrape.
+
+    Returns:
+        The body and its content type
+    """
+    if PROMETHEUS_MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead(pid: int) -> None:
+    """Drop the live gauges of an exited worker; call from gunicorn's child_exit hook"""
+    if PROMETHEUS_MULTIPROC_DIR:
+        multiprocess.mark_process_dead(pid)
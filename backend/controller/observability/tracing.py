@@ -0,0 +1,166 @@
+import itertools
+import logging
+import os
+import random
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Share of requests whose spans are recorded and logged
+TRACE_SAMPLE_RATE = float(os.getenv('TRACE_SAMPLE_RATE', 0.1))
+
+logger = logging.getLogger(__name__)
+
+_span_ids = itertools.count(1)
+
+
+@dataclass
+class Trace:
+    """Spans recorded for one sampled request"""
+    trace_id: str
+    name: str
+    started: float = field(default_factory=time.perf_counter)
+    spans: List[Dict[str, Any]] = field(default_factory=list)
+
+
+_trace_id: ContextVar[Optional[str]] = ContextVar('trace_id', default=None)
+_trace: ContextVar[Optional[Trace]] = ContextVar('trace', default=None)
+_span_id: ContextVar[Optional[int]] = ContextVar('span_id', default=None)
+
+SpanStarted = Callable[[str, Dict[str, Any]], None]
+SpanFinished = Callable[[str, Dict[str, Any], float, Optional[str]], None]
+_span_observers: List[Tuple[SpanStarted, SpanFinished]] = []
+
+
+def current_trace_id() -> Optional[str]:
+    return _trace_id.get()
+
+
+def add_span_observer(on_start: SpanStarted, on_finish: SpanFinished) -> None:
+    """
+    Register callbacks that see every span, sampled or not, e.g. to feed metrics.
+
+    on_start gets (name, attributes); on_finish gets (name, attributes, seconds,
+    error type name or None).
+    """
+    _span_observers.append((on_start, on_finish))
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Optional[Dict[str, Any]]]:
+    """
+    Time a block as a span of the current trace.
+
+    Outside a sampled trace and without observers this costs one context variable
+    lookup. The yielded dict (None when not sampled) can be given more attributes
+    inside the block. Spans nest through context variables, so they follow
+    asyncio tasks and asyncio.to_thread calls.
+    """
+    trace = _trace.get()
+    if trace is None and not _span_observers:
+        yield None
+        return
+
+    for on_start, _ in _span_observers:
+        on_start(name, attributes)
+    record = None
+    token = None
+    if trace is not None:
+        record = {'id': next(_span_ids), 'parent': _span_id.get(), 'name': name, **attributes}
+        token = _span_id.set(record['id'])
+    error = None
+    started = time.perf_counter()
+    try:
+        yield record
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        seconds = time.perf_counter() - started
+        for _, on_finish in _span_observers:
+            on_finish(name, attributes, seconds, error)
+        if record is not None:
+            if error is not None:
+                record['error'] = error
+            record['start_ms'] = round((started - trace.started) * 1000, 3)
+            record['duration_ms'] = round(seconds * 1000, 3)
+            _span_id.reset(token)
+            trace.spans.append(record)
+
+
+@contextmanager
+def start_trace(name: str, trace_id: Optional[str] = None, sampled: Optional[bool] = None) -> Iterator[Optional[Trace]]:
+    """
+    Start a trace for a unit of work, such as an HTTP request or a background job.
+
+    When the trace is sampled, its spans are logged as one record at the end.
+
+    Args:
+        name: Name of the unit of work
+        trace_id: Id to use (default: a new random id)
+        sampled: Record spans (default: with probability TRACE_SAMPLE_RATE)
+    """
+    trace_id = trace_id or uuid.uuid4().hex
+    if sampled is None:
+        sampled = random.random() < TRACE_SAMPLE_RATE
+    trace = Trace(trace_id, name) if sampled else None
+
+    id_token = _trace_id.set(trace_id)
+    trace_token = _trace.set(trace)
+    span_token = _span_id.set(None)
+    try:
+        yield trace
+    finally:
+        if trace is not None:
+            logger.info('trace %s', name, extra={
+                'duration_ms': round((time.perf_counter() - trace.started) * 1000, 3),
+                'spans': trace.spans,
+            })
+        _span_id.reset(span_token)
+        _trace.reset(trace_token)
+        _trace_id.reset(id_token)
+
+
+class TraceMiddleware:
+    """
+    ASGI middleware that runs every HTTP request in its own trace.
+
+    The trace id comes from an incoming X-Request-ID header or is generated, is
+    attached to every log record of the request and is returned in X-Trace-ID.
+    """
+    def __init__(self, app, sample_rate: Optional[float] = None):
+        self.app = app
+        self.sample_rate = TRACE_SAMPLE_RATE if sample_rate is None else sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for key, value in scope.get('headers') or ():
+            if key == b'x-request-id':
+                request_id = value.decode('latin-1')[:64]
+                break
+        sampled = self.sample_rate >= 1 or random.random() < self.sample_rate
+
+        with start_trace(f"{scope['method']} {scope['path']}", trace_id=request_id, sampled=sampled) as trace:
+            trace_id = current_trace_id()
+
+            async def send_with_trace_id(message):
+                if message['type'] == 'http.response.start':
+                    message.setdefault('headers', [])
+                    message['headers'] = list(message['headers']) + [(b'x-trace-id', trace_id.encode())]
+                    if trace is not None:
+                        trace.spans.append({'name': 'response.start', 'status': message.get('status'),
+                                            'start_ms': round((time.perf_counter() - trace.started) * 1000, 3)})
+                await send(message)
+
+            await self.app(scope, receive, send_with_trace_id)
@@ -0,0 +1,219 @@
+import asyncio
+import json
+import math
+import os
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+import openai
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Upper bound on concurrent upstream calls for one online batch
+OPENAI_BATCH_CONCURRENCY = int(os.getenv('OPENAI_BATCH_CONCURRENCY', 16))
+# Retries of one item after a 429 before it is reported as failed
+OPENAI_BATCH_MAX_RETRIES = int(os.getenv('OPENAI_BATCH_MAX_RETRIES', 5))
+# Base delay in seconds after a 429 without a Retry-After header, doubled per attempt
+OPENAI_BATCH_BACKOFF = float(os.getenv('OPENAI_BATCH_BACKOFF', 1.0))
+# Maximum number of items accepted in one batch request
+OPENAI_BATCH_MAX_ITEMS = int(os.getenv('OPENAI_BATCH_MAX_ITEMS', 10000))
+# Expected seconds per item, used to turn away online batches that cannot finish in time
+OPENAI_BATCH_ITEM_SECONDS = float(os.getenv('OPENAI_BATCH_ITEM_SECONDS', 10))
+
+
+class AdaptiveLimiter:
+    """
+    Concurrency limit that adapts to rate limiting (additive increase, multiplicative decrease).
+
+    Each 429 halves the limit and pauses new calls until the backoff has passed;
+    every `limit` successful calls raise it by one again, up to max_concurrency.
+    """
+    def __init__(self, max_concurrency: int):
+        self.max_concurrency = max(1, max_concurrency)
+        self.limit = self.max_concurrency
+        self.in_flight = 0
+        self.rate_limited = 0
+        self._successes = 0
+        self._resume_at = 0.0
+        self._condition = asyncio.Condition()
+
+    async def acquire(self) -> None:
+        loop = asyncio.get_running_loop()
+        async with self._condition:
+            while True:
+                delay = self._resume_at - loop.time()
+                if delay > 0:
+                    # Wake early if another backoff changes the resume time
+                    try:
+                        await asyncio.wait_for(self._condition.wait(), timeout=delay)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                if self.in_flight < self.limit:
+                    self.in_flight += 1
+                    return
+                await self._condition.wait()
+
+    async def release(self, rate_limited: bool = False, retry_after: Optional[float] = None) -> None:
+        loop = asyncio.get_running_loop()
+        async with self._condition:
+            self.in_flight -= 1
+            if rate_limited:
+                self.rate_limited += 1
+                self._successes = 0
+                self.limit = max(1, self.limit // 2)
+                self._resume_at = max(self._resume_at, loop.time() + (retry_after or 0))
+            else:
+                self._successes += 1
+                if self._successes >= self.limit and self.limit < self.max_concurrency:
+                    self._successes = 0
+                    self.limit += 1
+            self._condition.notify_all()
+
+
+def estimated_seconds(items: int, concurrency: int) -> float:
+    """Rough time an online batch takes at full concurrency"""
+    return math.ceil(items / max(1, concurrency)) * OPENAI_BATCH_ITEM_SECONDS
+
+
+def _retry_after(error: openai.RateLimitError) -> Optional[float]:
+    """Seconds the API asked us to wait, from the Retry-After header"""
+    headers = getattr(getattr(error, 'response', None), 'headers', None) or {}
+    try:
+        return float(headers.get('retry-after'))
+    except (TypeError, ValueError):
+        return None
+
+
+async def run_batch(
+    items: List[Dict[str, Any]],
+    call: Callable[[Dict[str, Any]], Awaitable[Any]],
+    concurrency: int = OPENAI_BATCH_CONCURRENCY,
+    max_retries: int = OPENAI_BATCH_MAX_RETRIES,
+    timeout: Optional[float] = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Run call(item) for every item with bounded, 429-adaptive concurrency.
+
+    Yields {"index", "status": "ok", "response"} or {"index", "status": "error", "error"}
+    in completion order; index is the item's position in the input. At most
+    `concurrency` workers take items in order, so a large batch does not hold a
+    task per item. Closing the iterator early cancels the items that are still pending.
+    If the timeout passes first, a final {"status": "error", "error": "timeout"}
+    is yielded and the remaining items are cancelled.
+
+    Args:
+        items: Keyword arguments for each call
+        call: Coroutine function that runs one item
+        concurrency: Maximum number of calls in flight
+        max_retries: Retries of one item after a 429
+        timeout: Seconds from the first result requested until the batch gives up (None: no limit)
+    """
+    limiter = AdaptiveLimiter(concurrency)
+
+    async def run_one(index: int, item: Dict[str, Any]) -> Dict[str, Any]:
+        for attempt in range(max_retries + 1):
+            await limiter.acquire()
+            try:
+                response = await call(item)
+            except openai.RateLimitError as e:
+                retry_after = _retry_after(e)
+                if retry_after is None:
+                    retry_after = OPENAI_BATCH_BACKOFF * 2 ** attempt
+                await limiter.release(rate_limited=True, retry_after=retry_after)
+                if attempt == max_retries:
+                    return {"index": index, "status": "error", "error": str(e)}
+                continue
+            except Exception as e:
+                await limiter.release()
+                return {"index": index, "status": "error", "error": str(e)}
+            await limiter.release()
+            return {"index": index, "status": "ok", "response": response}
+
+    pending = iter(enumerate(items))
+    results: asyncio.Queue = asyncio.Queue()
+
+    async def worker() -> None:
+        # Items are taken one at a time; the limiter decides how many workers call at once
+        for index, item in pending:
+            await results.put(await run_one(index, item))
+
+    workers = [asyncio.ensure_future(worker()) for _ in range(min(limiter.max_concurrency, len(items)))]
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout if timeout is not None else None
+    try:
+        for _ in range(len(items)):
+            if deadline is None:
+                yield await results.get()
+                continue
+            try:
+                result = await asyncio.wait_for(results.get(), timeout=max(deadline - loop.time(), 0))
+            except asyncio.TimeoutError:
+                yield {"status": "error", "error": "timeout"}
+                return
+            yield result
+    finally:
+        for task in workers:
+            task.cancel()
+
+
+async def ndjson(results: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[str]:
+    """Serialize results as newline-delimited JSON"""
+    async for result in results:
+        yield json.dumps(result, default=str) + "\n"
+
+
+async def submit_offline_batch(client: openai.AsyncOpenAI, bodies: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Submit request bodies to the OpenAI Batch API against /v1/responses.
+
+    Each line's custom_id is the item's index, so results can be matched back to
+    the input. Batches complete within 24 hours at a lower price.
+
+    Returns:
+        The created batch
+    """
+    lines = "\n".join(
+        json.dumps({"custom_id": str(index), "method": "POST", "url": "/v1/responses", "body": body}, default=str)
+        for index, body in enumerate(bodies)
+    )
+    input_file = await client.files.create(file=("batch.jsonl", lines.encode()), purpose="batch")
+    batch = await client.batches.create(
+        input_file_id=input_file.id,
+        endpoint="/v1/responses",
+        completion_window="24h",
+    )
+    return batch.model_dump()
+
+
+async def get_offline_batch(client: openai.AsyncOpenAI, batch_id: str) -> Dict[str, Any]:
+    """
+    Get the status of an offline batch, with its results once it has finished.
+
+    Returns:
+        The batch, plus "results" sorted by index when output is available. Each
+        result has the same shape as the items streamed by run_batch.
+    """
+    batch = await client.batches.retrieve(batch_id)
+    data = batch.model_dump()
+    if batch.status not in ("completed", "expired", "cancelled", "failed"):
+        return data
+
+    results = []
+    for file_id in (batch.output_file_id, batch.error_file_id):
+        if not file_id:
+            continue
+        content = await client.files.content(file_id)
+        for line in content.text.splitlines():
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            result = {"index": int(row["custom_id"])}
+            response = row.get("response") or {}
+            if row.get("error") or response.get("status_code", 200) >= 400:
+                result.update(status="error", error=row.get("error") or response.get("body"))
+            else:
+                result.update(status="ok", response=response.get("body"))
+            results.append(result)
+    data["results"] = sorted(results, key=lambda result: result["index"])
+    return data
@@ -0,0 +1,205 @@
+import asyncio
+import dataclasses
+import json
+import os
+import time
+import weakref
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+from controller.cache import TTLCache, MISSING
+
+load_dotenv()
+
+# Supabase table conversations are persisted to (default: memory only). Expected columns:
+# id text primary key, previous_response_id text, messages jsonb, updated_at double precision
+OPENAI_CONVERSATION_TABLE = os.getenv('OPENAI_CONVERSATION_TABLE')
+OPENAI_CONVERSATION_CACHE_SIZE = int(os.getenv('OPENAI_CONVERSATION_CACHE_SIZE', 10000))
+# Seconds a conversation stays in worker memory. With a table, the default of 0 reads it on
+# every turn: a worker's cached copy goes stale as soon as another worker saves a turn, and
+# chaining from it would overwrite that turn. Raise it only with sticky routing.
+OPENAI_CONVERSATION_CACHE_TTL = float(os.getenv('OPENAI_CONVERSATION_CACHE_TTL', 0 if OPENAI_CONVERSATION_TABLE else 300))
+# Estimated tokens of stored history above which the oldest messages are dropped
+OPENAI_CONVERSATION_MAX_TOKENS = int(os.getenv('OPENAI_CONVERSATION_MAX_TOKENS', 8000))
+# "chain": send only the new message with previous_response_id (OpenAI keeps the context);
+# "history": resend the stored, truncated history every turn
+OPENAI_CONVERSATION_MODE = os.getenv('OPENAI_CONVERSATION_MODE', 'chain').lower()
+
+
+def estimate_message_tokens(messages: List[Dict[str, Any]]) -> int:
+    """Rough token count of messages, about four characters per token"""
+    return len(json.dumps(messages, default=str)) // 4
+
+
+@dataclass
+class Conversation:
+    """A conversation's server-side state"""
+    id: str
+    previous_response_id: Optional[str] = None
+    messages: List[Dict[str, Any]] = field(default_factory=list)
+    # Estimated tokens of the context OpenAI holds for previous_response_id
+    chained_tokens: int = 0
+    updated_at: float = 0.0
+
+    def to_row(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "previous_response_id": self.previous_response_id,
+            "messages": self.messages,
+            "updated_at": self.updated_at,
+        }
+
+    @classmethod
+    def from_row(cls, row: Dict[str, Any]) -> "Conversation":
+        messages = row.get("messages") or []
+        if isinstance(messages, str):
+            messages = json.loads(messages)
+        return cls(
+            id=row["id"],
+            previous_response_id=row.get("previous_response_id"),
+            messages=messages,
+            chained_tokens=estimate_message_tokens(messages),
+            updated_at=row.get("updated_at") or 0.0,
+        )
+
+
+class ConversationStore:
+    """
+    Server-side conversation state, so clients send only the new message each turn.
+
+    Conversations live in an in-process TTL/LRU cache and, when a Supabase table
+    is configured, are persisted there and read back on a cache miss. Turns of
+    the same conversation are serialized by a per-conversation lock.
+    """
+    def __init__(
+        self,
+        table: Optional[str] = OPENAI_CONVERSATION_TABLE,
+        max_tokens: int = OPENAI_CONVERSATION_MAX_TOKENS,
+        mode: str = OPENAI_CONVERSATION_MODE,
+    ):
+        """
+        Args:
+            table: Supabase table for persistence (default: memory only)
+            max_tokens: History budget in estimated tokens
+            mode: "chain" to rely on previous_response_id, "history" to resend stored messages
+        """
+        if mode not in ("chain", "history"):
+            raise ValueError(f"Unknown conversation mode: {mode}")
+        self.table = table
+        self.max_tokens = max_tokens
+        self.mode = mode
+        self._cache = TTLCache(max_size=OPENAI_CONVERSATION_CACHE_SIZE, ttl=OPENAI_CONVERSATION_CACHE_TTL)
+        # Locks disappear once no turn holds or waits on them
+        self._locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+        self._supabase = None
+
+    def _controller(self):
+        if self._supabase is None:
+            from controller.supabase.async_supabase_utils import AsyncSupabaseController
+            self._supabase = AsyncSupabaseController()
+        return self._supabase
+
+    def lock(self, conversation_id: str) -> asyncio.Lock:
+        lock = self._locks.get(conversation_id)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._locks[conversation_id] = lock
+        return lock
+
+    async def get(self, conversation_id: str) -> Conversation:
+        """
+        Get a conversation, or a new empty one if the id is unknown.
+
+        Returns a working copy: changes reach the cache only through save.
+        """
+        conversation = self._cache.get(conversation_id) if OPENAI_CONVERSATION_CACHE_TTL else MISSING
+        if conversation is not MISSING:
+            return dataclasses.replace(conversation)
+        conversation = None
+        if self.table:
+            rows = await self._controller().select(self.table, filters={"id": conversation_id}, limit=1)
+            if rows:
+                conversation = Conversation.from_row(rows[0])
+        if conversation is None:
+            conversation = Conversation(id=conversation_id)
+        self._cache.set(conversation_id, conversation)
+        return dataclasses.replace(conversation)
+
+    async def save(self, conversation: Conversation) -> None:
+        """Persist a conversation, then cache it; a failed save leaves the cached state unchanged"""
+        conversation.updated_at = time.time()
+        if self.table:
+            await self._controller().upsert(self.table, conversation.to_row(), on_conflict="id")
+        self._cache.set(conversation.id, dataclasses.replace(conversation))
+
+    async def delete(self, conversation_id: str) -> None:
+        self._cache.delete(conversation_id)
+        if self.table:
+            await self._controller().delete(self.table, filters={"id": conversation_id})
+
+    def truncate(self, messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Drop the oldest messages until the history fits the token budget, keeping at least the last one"""
+        messages = list(messages)
+        while len(messages) > 1 and estimate_message_tokens(messages) > self.max_tokens:
+            messages.pop(0)
+        # Context should open with a user turn, not a dangling reply
+        while len(messages) > 1 and messages[0].get("role") == "assistant":
+            messages.pop(0)
+        return messages
+
+    def context(self, conversation: Conversation, new_messages: List[Dict[str, Any]],
+                chain: bool = True) -> Dict[str, Any]:
+        """
+        Build the input for the next turn.
+
+        Args:
+            conversation: The conversation
+            new_messages: The turn's new messages
+            chain: Continue from the previous response if possible; False rebuilds from history
+
+        Returns:
+            {"input": items to send, "previous_response_id": id or None}
+        """
+        new_tokens = estimate_message_tokens(new_messages)
+        if (
+            chain
+            and self.mode == "chain"
+            and conversation.previous_response_id
+            and conversation.chained_tokens + new_tokens <= self.max_tokens
+        ):
+            return {"input": new_messages, "previous_response_id": conversation.previous_response_id}
+        # Start a fresh chain from the stored history, trimmed to the budget
+        return {"input": self.truncate(conversation.messages + new_messages), "previous_response_id": None}
+
+    def record_turn(
+        self,
+        conversation: Conversation,
+        new_messages: List[Dict[str, Any]],
+        sent: Dict[str, Any],
+        response_id: Optional[str],
+        output_text: str,
+    ) -> None:
+        """Update a conversation with a completed turn"""
+        reply = [{"role": "assistant", "content": output_text}] if output_text else []
+        conversation.messages = self.truncate(conversation.messages + new_messages + reply)
+        if sent["previous_response_id"] is None:
+            conversation.chained_tokens = estimate_message_tokens(sent["input"] + reply)
+        else:
+            conversation.chained_tokens += estimate_message_tokens(new_messages + reply)
+        conversation.previous_response_id = response_id
+
+    def stats(self) -> Dict[str, Any]:
+        return {"mode": self.mode, "persisted": bool(self.table), "cache": self._cache.stats()}
+
+
+def response_text(response_data: Dict[str, Any]) -> str:
+    """Concatenate the output_text parts of a Responses API result"""
+    parts = []
+    for item in response_data.get("output") or []:
+        if item.get("type") == "message":
+            for content in item.get("content") or []:
+                if content.get("type") == "output_text":
+                    parts.append(content.get("text", ""))
+    return "".join(parts)
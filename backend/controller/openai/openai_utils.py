@@ -1,16 +1,77 @@
 import os
 import json
-from typing import List, Dict, Any, Optional, Union
-from openai import OpenAI
+import time
+import concurrent.futures
+import contextvars
+import logging
+from typing import List, Dict, Any, Optional, Union, AsyncIterator
+import httpx
+import openai
+from openai import OpenAI, AsyncOpenAI, DefaultAsyncHttpxClient
 from dotenv import load_dotenv
-from agents import Agent, Runner,function_tool
+from agents import Agent, Runner, ModelSettings, OpenAIResponsesModel, function_tool
 import asyncio
+from controller.cache import TTLCache, MISSING
+from controller.observability import span
 from controller.tools.tools import Tools
+from .response_cache import ResponseCache
+from .batch import run_batch, submit_offline_batch, get_offline_batch, OPENAI_BATCH_CONCURRENCY
+from .rate_limiter import RateLimiter, estimate_tokens, OPENAI_RATE_LIMIT_BATCH_PRIORITY
+from .conversation_store import ConversationStore, response_text
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Connection pool limits for the shared async HTTP client (per worker process)
+OPENAI_MAX_CONNECTIONS = int(os.getenv('OPENAI_MAX_CONNECTIONS', 500))
+OPENAI_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv('OPENAI_MAX_KEEPALIVE_CONNECTIONS', 100))
+OPENAI_KEEPALIVE_EXPIRY = float(os.getenv('OPENAI_KEEPALIVE_EXPIRY', 30))
+
+# Budgets for the tool-call loop in create_response
+OPENAI_MAX_TOOL_ITERATIONS = int(os.getenv('OPENAI_MAX_TOOL_ITERATIONS', 5))
+OPENAI_TOOL_LOOP_TIMEOUT = float(os.getenv('OPENAI_TOOL_LOOP_TIMEOUT', 120))
+
+# Maximum number of prebuilt Agents kept for reuse (per worker process)
+OPENAI_AGENT_CACHE_SIZE = int(os.getenv('OPENAI_AGENT_CACHE_SIZE', 256))
+
+# Threads that wait on concurrent tool calls of the sync create_response; the tools
+# themselves run in the tool executor's pools
+_tool_executor = concurrent.futures.ThreadPoolExecutor(
+    max_workers=int(os.getenv('OPENAI_TOOL_THREADS', 16)), thread_name_prefix='openai-tool'
+)
+
+# Error code of a request whose previous_response_id has expired or was deleted
+PREVIOUS_RESPONSE_NOT_FOUND = 'previous_response_not_found'
+
 
 class OpenAIUtils:
     """Utility class for OpenAI API interactions"""
+
+    # One pooled HTTP client shared by every AsyncOpenAI client in this process
+    _async_http_client: Optional[httpx.AsyncClient] = None
+    # Response cache configured by OPENAI_RESPONSE_CACHE, shared like the HTTP client
+    _default_response_cache: Optional[ResponseCache] = None
+    _default_response_cache_loaded = False
+    # Rate limiter configured by OPENAI_RATE_LIMIT_RPM/TPM, shared by every instance
+    _default_rate_limiter: Optional[RateLimiter] = None
+    _default_rate_limiter_loaded = False
     
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self,
+                 api_key: Optional[str] = None,
+                 response_cache: Optional[ResponseCache] = None,
+                 rate_limiter: Optional[RateLimiter] = None,
+                 conversations: Optional[ConversationStore] = None):
+        """
+        Args:
+            api_key: OpenAI API key (default: OPENAI_API_KEY)
+            response_cache: Cache for deterministic responses (default: the one configured
+                by OPENAI_RESPONSE_CACHE, which is off unless set)
+            rate_limiter: Scheduler that keeps calls under the account limits (default: the
+                one configured by OPENAI_RATE_LIMIT_RPM/TPM, which is off unless set)
+            conversations: Server-side conversation store (default: one configured by the
+                OPENAI_CONVERSATION_* settings)
+        """
         if not api_key:
             load_dotenv()
             api_key = os.getenv('OPENAI_API_KEY')
@@ -19,71 +80,661 @@ class OpenAIUtils:
             raise ValueError("OpenAI API key is required. Set OPENAI_API_KEY environment variable or pass directly.")
             
         self.client = OpenAI(api_key=api_key)
+        self.async_client = AsyncOpenAI(api_key=api_key, http_client=self.get_async_http_client())
         self.tools = Tools()
+        self.response_cache = response_cache if response_cache is not None else self.get_default_response_cache()
+        self.rate_limiter = rate_limiter if rate_limiter is not None else self.get_default_rate_limiter()
+        self.conversations = conversations if conversations is not None else ConversationStore()
+        # Prebuilt Agents keyed by their configuration, evicted least recently used first
+        self._agents = TTLCache(max_size=OPENAI_AGENT_CACHE_SIZE, ttl=None)
+
+    @classmethod
+    def get_default_response_cache(cls) -> Optional[ResponseCache]:
+        """Get the process-wide response cache configured by the environment, if any"""
+        if not cls._default_response_cache_loaded:
+            cls._default_response_cache = ResponseCache.from_env()
+            cls._default_response_cache_loaded = True
+        return cls._default_response_cache
+
+    @classmethod
+    def get_default_rate_limiter(cls) -> Optional[RateLimiter]:
+        """Get the process-wide rate limiter configured by the environment, if any"""
+        if not cls._default_rate_limiter_loaded:
+            cls._default_rate_limiter = RateLimiter.from_env()
+            cls._default_rate_limiter_loaded = True
+        return cls._default_rate_limiter
+
+    async def _acquire_rate_limit(self, params: Dict[str, Any], priority: int = 0) -> int:
+        """Wait for rate limit capacity for a call. Returns the tokens reserved."""
+        if self.rate_limiter is None:
+            return 0
+        with span("openai.rate_limit.wait", priority=priority):
+            return await self.rate_limiter.acquire(estimate_tokens(params), priority)
+
+    def _record_usage(self, reserved: int, usage: Any) -> None:
+        if self.rate_limiter is not None:
+            self.rate_limiter.record_usage(reserved, usage)
+
+    async def _arecord_usage(self, reserved: int, usage: Any) -> None:
+        if self.rate_limiter is not None:
+            await self.rate_limiter.arecord_usage(reserved, usage)
+
+    def _response_cache_key(self, cache: bool, stream: bool, input_items, model, tools, temperature,
+                            max_tool_iterations, previous_response_id=None) -> Optional[str]:
+        """Cache key for a request, or None if the request must go upstream"""
+        if self.response_cache is None or stream:
+            return None
+        if not cache or not self.response_cache.cacheable(temperature):
+            self.response_cache.record_bypass()
+            return None
+        return self.response_cache.key(
+            model, input_items, tools, temperature,
+            max_tool_iterations=max_tool_iterations, previous_response_id=previous_response_id,
+        )
+
+    @classmethod
+    def get_async_http_client(cls) -> httpx.AsyncClient:
+        """Get the process-wide pooled HTTP client used by the async OpenAI client"""
+        if cls._async_http_client is None or cls._async_http_client.is_closed:
+            cls._async_http_client = DefaultAsyncHttpxClient(
+                limits=httpx.Limits(
+                    max_connections=OPENAI_MAX_CONNECTIONS,
+                    max_keepalive_connections=OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=OPENAI_KEEPALIVE_EXPIRY,
+                ),
+            )
+        return cls._async_http_client
+
+    @classmethod
+    async def aclose(cls) -> None:
+        """Close the shared async HTTP client. Call on application shutdown."""
+        if cls._async_http_client is not None and not cls._async_http_client.is_closed:
+            await cls._async_http_client.aclose()
+        cls._async_http_client = None
+
+    @staticmethod
+    def _format_input(input_text: Union[str, List[Dict[str, str]]]) -> List[Dict[str, str]]:
+        """Format the input correctly based on its type"""
+        if isinstance(input_text, str):
+            return [{"role": "user", "content": input_text}]
+        elif isinstance(input_text, list):
+            return input_text
+        else:
+            raise ValueError("input_text must be either a string or a list of message objects")
+
+    @staticmethod
+    def _build_params(formatted_input: List[Dict[str, str]],
+                      model: str,
+                      stream: bool,
+                      tools: List[Dict[str, Any]],
+                      temperature: float,
+                      previous_response_id: Optional[str] = None) -> Dict[str, Any]:
+        params = {
+            "model": model,
+            "input": formatted_input,
+            "temperature": temperature,
+            "stream": stream,
+        }
+
+        # Only add tools if there are any
+        if tools:
+            params["tools"] = tools
+
+        # Continue from a stored response instead of resending its context
+        if previous_response_id:
+            params["previous_response_id"] = previous_response_id
+
+        return params
+    @staticmethod
+    def _function_calls(response_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Get every function call item from a response's output"""
+        return [item for item in response_data.get("output") or [] if item.get("type") == "function_call"]
+
+    @staticmethod
+    def _function_call_output(call: Dict[str, Any], result: Any) -> Dict[str, Any]:
+        """Build the function_call_output input item that feeds a tool result back to the model"""
+        output = result if isinstance(result, str) else json.dumps(result, default=str)
+        return {"type": "function_call_output", "call_id": call["call_id"], "output": output}
+
+    def _call_tool_safely(self, call: Dict[str, Any]) -> Any:
+        """Run one tool call, returning the error message instead of raising so the model can recover"""
+        try:
+            tool_args = json.loads(call["arguments"] or "{}")
+            return self.tools.call_tool(call["name"], tool_args)
+        except Exception as e:
+            logger.warning("Error calling tool %s: %s", call["name"], e)
+            return f"Error: {str(e)}"
+
+    async def _acall_tool_safely(self, call: Dict[str, Any]) -> Any:
+        """Async version of _call_tool_safely"""
+        try:
+            tool_args = json.loads(call["arguments"] or "{}")
+            return await self.tools.acall_tool(call["name"], tool_args)
+        except Exception as e:
+            logger.warning("Error calling tool %s: %s", call["name"], e)
+            return f"Error: {str(e)}"
+
+    async def _run_tool_calls(self, calls: List[Dict[str, Any]], deadline: float) -> List[Any]:
+        """Run independent tool calls concurrently, bounded by the loop deadline"""
+        loop = asyncio.get_running_loop()
+        # The tool executor keeps blocking and CPU-bound tools off the event loop
+        tasks = [self._acall_tool_safely(call) for call in calls]
+        return await asyncio.wait_for(asyncio.gather(*tasks), timeout=max(deadline - loop.time(), 0))
+
     def create_response(self, 
                        input_text: Union[str, List[Dict[str, str]]], 
                        model: str = "gpt-4o", 
                        stream: bool = False,
                        tools: Optional[List[Dict[str, Any]]] = None,
-                       temperature: float = 0.7) -> Dict[str, Any]:
-        """Create a response using the OpenAI Chat Completions API
+                       temperature: float = 0.7,
+                       max_tool_iterations: Optional[int] = None,
+                       tool_loop_timeout: Optional[float] = None,
+                       cache: bool = True) -> Dict[str, Any]:
+        """Create a response using the OpenAI Responses API
+        
+        Every function call the model makes is executed (concurrently, in a thread
+        pool) and fed back as a function_call_output item until the model stops
+        calling tools or a budget runs out.
         
         Args:
             input_text: Either a string message or a list of message objects with role and content
             model: The model to use (default: gpt-4o)
             tools: Optional list of tools to enable
             temperature: Sampling temperature, between 0 and 2
+            max_tool_iterations: Maximum number of tool-call rounds (default: OPENAI_MAX_TOOL_ITERATIONS)
+            tool_loop_timeout: Wall-clock budget in seconds for the whole loop (default: OPENAI_TOOL_LOOP_TIMEOUT)
+            cache: Use the response cache, if one is configured and the temperature is low enough
             
         Returns:
-            The complete response from the OpenAI API
+            The final response from the OpenAI API. If the iteration budget runs out,
+            the last response, which still contains the unanswered function calls.
+
+        Raises:
+            TimeoutError: If the wall-clock budget runs out
         """
         if tools is None:
             tools = []
+        if max_tool_iterations is None:
+            max_tool_iterations = OPENAI_MAX_TOOL_ITERATIONS
+        if tool_loop_timeout is None:
+            tool_loop_timeout = OPENAI_TOOL_LOOP_TIMEOUT
         
-        # Format the input correctly based on its type
-        if isinstance(input_text, str):
-            formatted_input = [{"role": "user", "content": input_text}]
-        elif isinstance(input_text, list):
-            formatted_input = input_text
-        else:
-            raise ValueError("input_text must be either a string or a list of message objects")
+        input_items = list(self._format_input(input_text))
+        key = self._response_cache_key(cache, stream, input_items, model, tools, temperature, max_tool_iterations)
+        if key is not None:
+            return self.response_cache.get_or_create(key, lambda: self._create_response(
+                input_items, model, stream, tools, temperature, max_tool_iterations, tool_loop_timeout
+            ))
+        return self._create_response(
+            input_items, model, stream, tools, temperature, max_tool_iterations, tool_loop_timeout
+        )
+
+    def _create_response(self, input_items, model, stream, tools, temperature,
+                         max_tool_iterations, tool_loop_timeout) -> Dict[str, Any]:
+        deadline = time.monotonic() + tool_loop_timeout
         
         try:
-            params = {
-                "model": model,
-                "input": formatted_input,
-                "temperature": temperature,
-                "stream": stream,
-            }
-            
-            # Only add tools if there are any
-            if tools:
-                params["tools"] = tools
+            for iteration in range(max_tool_iterations + 1):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f"Tool loop exceeded {tool_loop_timeout}s")
 
-            print('PARAMS', params)
-            
-            # Make the API request
-            response = self.client.responses.create(**params)
+                params = self._build_params(input_items, model, stream, tools, temperature)
+
+                logger.debug("Responses API request: model=%s items=%d tools=%d",
+                             model, len(input_items), len(tools))
+
+                reserved = self.rate_limiter.acquire_sync(estimate_tokens(params)) if self.rate_limiter else 0
+                
+                # Make the API request
+                with span("openai.responses.create", model=model, round=iteration):
+                    response = self.client.responses.create(**params, timeout=max(deadline - time.monotonic(), 0))
+                self._record_usage(reserved, response.usage)
 
-            response_data = response.model_dump()
+                response_data = response.model_dump()
 
-            call = response_data["output"][0]
+                calls = self._function_calls(response_data)
+                if not calls or iteration == max_tool_iterations:
+                    return response_data
 
-            if call["type"] == "function_call":
-                tool_name = call["name"]
-                tool_args = json.loads(call["arguments"])
-                tool_response = self.tools.call_tool(tool_name, tool_args)
+                # Copy the context so tool spans land in this request's trace
+                futures = [
+                    _tool_executor.submit(contextvars.copy_context().run, self._call_tool_safely, call)
+                    for call in calls
+                ]
+                done, pending = concurrent.futures.wait(futures, timeout=max(deadline - time.monotonic(), 0))
+                if pending:
+                    raise TimeoutError(f"Tool loop exceeded {tool_loop_timeout}s")
 
-                return tool_response
-            else:
-                return response_data
+                input_items.extend(response.model_dump(exclude_none=True)["output"])
+                input_items.extend(
+                    self._function_call_output(call, future.result()) for call, future in zip(calls, futures)
+                )
+
+            return response_data
             
         except Exception as e:
-            print(f"Error making OpenAI API request: {str(e)}")
-            if hasattr(e, 'response') and hasattr(e.response, 'text'):
-                print(f"Response details: {e.response.text}")
+            logger.error("Error making OpenAI API request: %s", e, extra={
+                "response_details": e.response.text if hasattr(e, 'response') and hasattr(e.response, 'text') else None,
+            })
+            raise
+
+    async def acreate_response(self,
+                               input_text: Union[str, List[Dict[str, str]]],
+                               model: str = "gpt-4o",
+                               stream: bool = False,
+                               tools: Optional[List[Dict[str, Any]]] = None,
+                               temperature: float = 0.7,
+                               max_tool_iterations: Optional[int] = None,
+                               tool_loop_timeout: Optional[float] = None,
+                               cache: bool = True,
+                               priority: int = 0,
+                               previous_response_id: Optional[str] = None) -> Dict[str, Any]:
+        """Async version of create_response that does not block the event loop
+
+        Uses the AsyncOpenAI client backed by the shared connection pool, so a
+        single worker can keep many model calls in flight at once. All function
+        calls in a round run concurrently, so a round costs the slowest tool plus
+        one model round-trip.
+
+        Args:
+            input_text: Either a string message or a list of message objects with role and content
+            model: The model to use (default: gpt-4o)
+            tools: Optional list of tools to enable
+            temperature: Sampling temperature, between 0 and 2
+            max_tool_iterations: Maximum number of tool-call rounds (default: OPENAI_MAX_TOOL_ITERATIONS)
+            tool_loop_timeout: Wall-clock budget in seconds for the whole loop (default: OPENAI_TOOL_LOOP_TIMEOUT)
+            cache: Use the response cache, if one is configured and the temperature is low enough.
+                Concurrent identical requests then share a single upstream call.
+            priority: Queue priority when the rate limiter is saturated; lower values go first
+            previous_response_id: Stored response to continue from; input then holds only the new items
+
+        Returns:
+            The final response from the OpenAI API. If the iteration budget runs out,
+            the last response, which still contains the unanswered function calls.
+
+        Raises:
+            asyncio.TimeoutError: If the wall-clock budget runs out
+        """
+        if tools is None:
+            tools = []
+        if max_tool_iterations is None:
+            max_tool_iterations = OPENAI_MAX_TOOL_ITERATIONS
+        if tool_loop_timeout is None:
+            tool_loop_timeout = OPENAI_TOOL_LOOP_TIMEOUT
+
+        input_items = list(self._format_input(input_text))
+        key = self._response_cache_key(
+            cache, stream, input_items, model, tools, temperature, max_tool_iterations, previous_response_id
+        )
+        if key is not None:
+            return await self.response_cache.aget_or_create(key, lambda: self._acreate_response(
+                input_items, model, stream, tools, temperature, max_tool_iterations, tool_loop_timeout,
+                priority, previous_response_id,
+            ))
+        return await self._acreate_response(
+            input_items, model, stream, tools, temperature, max_tool_iterations, tool_loop_timeout,
+            priority, previous_response_id,
+        )
+
+    async def _acreate_response(self, input_items, model, stream, tools, temperature,
+                                max_tool_iterations, tool_loop_timeout, priority=0,
+                                previous_response_id=None) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + tool_loop_timeout
+
+        try:
+            for iteration in range(max_tool_iterations + 1):
+                params = self._build_params(input_items, model, stream, tools, temperature, previous_response_id)
+
+                logger.debug("Responses API request: model=%s items=%d tools=%d",
+                             model, len(input_items), len(tools))
+
+                reserved = await self._acquire_rate_limit(params, priority)
+
+                # Make the API request
+                with span("openai.responses.create", model=model, round=iteration):
+                    response = await asyncio.wait_for(
+                        self.async_client.responses.create(**params),
+                        timeout=max(deadline - loop.time(), 0),
+                    )
+                await self._arecord_usage(reserved, response.usage)
+
+                response_data = response.model_dump()
+
+                calls = self._function_calls(response_data)
+                if not calls or iteration == max_tool_iterations:
+                    return response_data
+
+                results = await self._run_tool_calls(calls, deadline)
+
+                input_items.extend(response.model_dump(exclude_none=True)["output"])
+                input_items.extend(self._function_call_output(call, result) for call, result in zip(calls, results))
+
+            return response_data
+
+        except Exception as e:
+            logger.error("Error making OpenAI API request: %s", e, extra={
+                "response_details": e.response.text if hasattr(e, 'response') and hasattr(e.response, 'text') else None,
+            })
             raise
 
+    def batch_responses(self,
+                        items: List[Dict[str, Any]],
+                        concurrency: Optional[int] = None,
+                        timeout: Optional[float] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Run many acreate_response calls with bounded concurrency
+
+        Concurrency backs off when OpenAI answers 429 and recovers as calls succeed.
+        Results are yielded as they complete, not in input order.
+
+        Args:
+            items: Keyword arguments for acreate_response, one dict per request
+            concurrency: Maximum number of requests in flight, capped at OPENAI_BATCH_CONCURRENCY
+                (default: OPENAI_BATCH_CONCURRENCY)
+            timeout: Seconds until the batch ends with a {"status": "error", "error": "timeout"} result
+
+        Returns:
+            Async iterator of {"index", "status", "response" | "error"} results,
+            where index is the item's position in items
+        """
+        for item in items:
+            self._format_input(item["input_text"])
+
+        return run_batch(
+            items,
+            # Batch work yields to interactive requests when the rate limiter is saturated
+            lambda item: self.acreate_response(**{"priority": OPENAI_RATE_LIMIT_BATCH_PRIORITY, **item}),
+            concurrency=min(concurrency or OPENAI_BATCH_CONCURRENCY, OPENAI_BATCH_CONCURRENCY),
+            timeout=timeout,
+        )
+
+    async def submit_batch(self, items: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Submit requests to the OpenAI Batch API for asynchronous, lower-cost processing
+
+        Offline requests get a single model round: tool definitions are sent, but
+        function calls are returned rather than executed.
+
+        Args:
+            items: Dicts with input_text and optionally model, tools and temperature
+
+        Returns:
+            The created batch; poll it with get_batch
+        """
+        bodies = [
+            self._build_params(
+                self._format_input(item["input_text"]),
+                item.get("model", "gpt-4o"),
+                False,
+                item.get("tools") or [],
+                item.get("temperature", 0.7),
+            )
+            for item in items
+        ]
+        return await submit_offline_batch(self.async_client, bodies)
+
+    async def get_batch(self, batch_id: str) -> Dict[str, Any]:
+        """Get the status of a batch from submit_batch, including its results once it has finished"""
+        return await get_offline_batch(self.async_client, batch_id)
+
+    def stream_response(self,
+                        input_text: Union[str, List[Dict[str, str]]],
+                        model: str = "gpt-4o",
+                        tools: Optional[List[Dict[str, Any]]] = None,
+                        temperature: float = 0.7,
+                        max_tool_iterations: Optional[int] = None,
+                        tool_loop_timeout: Optional[float] = None,
+                        previous_response_id: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Stream a response from the OpenAI Responses API as it is generated
+
+        The input is validated eagerly so errors surface before the stream starts.
+        Tool calls run the same loop as acreate_response, streaming each round.
+        The returned iterator yields events of the form {"event": name, "data": payload}:
+            - delta: {"delta": text} for each output text token chunk
+            - tool_call: {"call_id", "name", "arguments"} once a function call is complete
+            - tool_result: {"call_id", "name", "output"} after the tool has run
+            - done: {"response_id", "usage"} when the model has finished
+            - error: {"detail", "code"} if the upstream call fails; code is OpenAI's error code, if any
+
+        Args:
+            input_text: Either a string message or a list of message objects with role and content
+            model: The model to use (default: gpt-4o)
+            tools: Optional list of tools to enable
+            temperature: Sampling temperature, between 0 and 2
+            max_tool_iterations: Maximum number of tool-call rounds (default: OPENAI_MAX_TOOL_ITERATIONS)
+            tool_loop_timeout: Wall-clock budget in seconds for the whole loop (default: OPENAI_TOOL_LOOP_TIMEOUT)
+            previous_response_id: Stored response to continue from; input then holds only the new items
+
+        Returns:
+            Async iterator of stream events
+        """
+        if tools is None:
+            tools = []
+        if max_tool_iterations is None:
+            max_tool_iterations = OPENAI_MAX_TOOL_ITERATIONS
+        if tool_loop_timeout is None:
+            tool_loop_timeout = OPENAI_TOOL_LOOP_TIMEOUT
+
+        formatted_input = self._format_input(input_text)
+        params = self._build_params(formatted_input, model, True, tools, temperature, previous_response_id)
+
+        return self._stream_events(params, max_tool_iterations, tool_loop_timeout)
+
+    @staticmethod
+    async def _events_until(stream, deadline: float) -> AsyncIterator[Any]:
+        """Yield the stream's events, bounding each read by the deadline so a stalled stream times out"""
+        loop = asyncio.get_running_loop()
+        events = stream.__aiter__()
+        try:
+            while True:
+                try:
+                    event = await asyncio.wait_for(events.__anext__(), timeout=max(deadline - loop.time(), 0))
+                except StopAsyncIteration:
+                    return
+                yield event
+        finally:
+            # Release the upstream connection when the stream ends early or times out
+            await stream.close()
+
+    async def _stream_events(self,
+                             params: Dict[str, Any],
+                             max_tool_iterations: int,
+                             tool_loop_timeout: float) -> AsyncIterator[Dict[str, Any]]:
+        input_items = list(params["input"])
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + tool_loop_timeout
+
+        try:
+            for iteration in range(max_tool_iterations + 1):
+                round_params = {**params, "input": input_items}
+                reserved = await self._acquire_rate_limit(round_params)
+                with span("openai.responses.create", model=params["model"], round=iteration, stream=True):
+                    stream = await asyncio.wait_for(
+                        self.async_client.responses.create(**round_params),
+                        timeout=max(deadline - loop.time(), 0),
+                    )
+                completed = None
+
+                async for event in self._events_until(stream, deadline):
+                    if event.type == "response.output_text.delta":
+                        yield {"event": "delta", "data": {"delta": event.delta}}
+
+                    elif event.type == "response.output_item.done" and event.item.type == "function_call":
+                        call = event.item
+                        yield {"event": "tool_call", "data": {
+                            "call_id": call.call_id,
+                            "name": call.name,
+                            "arguments": call.arguments,
+                        }}
+
+                    elif event.type == "response.completed":
+                        completed = event.response
+
+                    elif event.type == "response.failed":
+                        error = event.response.error
+                        yield {"event": "error", "data": {"detail": error.message if error else "Response failed"}}
+                        return
+
+                    elif event.type == "error":
+                        yield {"event": "error", "data": {"detail": event.message}}
+                        return
+
+                if completed is None:
+                    return
+
+                await self._arecord_usage(reserved, completed.usage)
+                output_items = completed.model_dump(exclude_none=True)["output"]
+                calls = self._function_calls({"output": output_items})
+                if not calls or iteration == max_tool_iterations:
+                    usage = completed.usage
+                    yield {"event": "done", "data": {
+                        "response_id": completed.id,
+                        "usage": usage.model_dump() if usage else None,
+                    }}
+                    return
+
+                results = await self._run_tool_calls(calls, deadline)
+                for call, result in zip(calls, results):
+                    yield {"event": "tool_result", "data": {
+                        "call_id": call["call_id"],
+                        "name": call["name"],
+                        "output": result,
+                    }}
+
+                input_items.extend(output_items)
+                input_items.extend(self._function_call_output(call, result) for call, result in zip(calls, results))
+
+        except asyncio.TimeoutError:
+            yield {"event": "error", "data": {"detail": f"Tool loop exceeded {tool_loop_timeout}s"}}
+
+        except Exception as e:
+            logger.error("Error streaming OpenAI API response: %s", e)
+            yield {"event": "error", "data": {"detail": str(e), "code": getattr(e, "code", None)}}
+
+    async def aconverse(self,
+                        conversation_id: str,
+                        input_text: Union[str, List[Dict[str, str]]],
+                        model: str = "gpt-4o",
+                        tools: Optional[List[Dict[str, Any]]] = None,
+                        temperature: float = 0.7,
+                        cache: bool = True) -> Dict[str, Any]:
+        """Run one turn of a server-side conversation
+
+        The client sends only the new message(s). Context comes from the
+        conversation store: the previous response id when chaining, or the stored
+        history trimmed to the token budget. Unknown ids start a new conversation.
+
+        Args:
+            conversation_id: Id chosen by the client for the conversation
+            input_text: The new message, or list of new messages
+            model: The model to use (default: gpt-4o)
+            tools: Optional list of tools to enable
+            temperature: Sampling temperature, between 0 and 2
+            cache: Use the response cache (see acreate_response)
+
+        Returns:
+            The response from the OpenAI API, with the conversation_id added
+        """
+        new_messages = self._format_input(input_text)
+        store = self.conversations
+
+        async with store.lock(conversation_id):
+            conversation = await store.get(conversation_id)
+            sent = store.context(conversation, new_messages)
+            try:
+                response = await self.acreate_response(
+                    sent["input"], model=model, tools=tools, temperature=temperature, cache=cache,
+                    previous_response_id=sent["previous_response_id"],
+                )
+            except openai.APIStatusError as e:
+                if sent["previous_response_id"] is None or e.code != PREVIOUS_RESPONSE_NOT_FOUND:
+                    raise
+                # The stored response expired or was deleted, rebuild from history
+                sent = store.context(conversation, new_messages, chain=False)
+                response = await self.acreate_response(
+                    sent["input"], model=model, tools=tools, temperature=temperature, cache=cache,
+                )
+
+            store.record_turn(conversation, new_messages, sent, response.get("id"), response_text(response))
+            await store.save(conversation)
+
+        response["conversation_id"] = conversation_id
+        return response
+
+    def stream_conversation(self,
+                            conversation_id: str,
+                            input_text: Union[str, List[Dict[str, str]]],
+                            model: str = "gpt-4o",
+                            tools: Optional[List[Dict[str, Any]]] = None,
+                            temperature: float = 0.7) -> AsyncIterator[Dict[str, Any]]:
+        """Streaming version of aconverse
+
+        Yields the same events as stream_response. The conversation is updated
+        before the done event, which also carries the conversation_id.
+        """
+        new_messages = self._format_input(input_text)
+        return self._stream_conversation_events(conversation_id, new_messages, model, tools, temperature)
+
+    async def _stream_conversation_events(self, conversation_id, new_messages, model, tools,
+                                          temperature) -> AsyncIterator[Dict[str, Any]]:
+        store = self.conversations
+        async with store.lock(conversation_id):
+            conversation = await store.get(conversation_id)
+            for chain in (True, False):
+                sent = store.context(conversation, new_messages, chain=chain)
+                events = self.stream_response(
+                    sent["input"], model=model, tools=tools, temperature=temperature,
+                    previous_response_id=sent["previous_response_id"],
+                )
+                text = []
+                first = True
+                async for event in events:
+                    if (
+                        first and sent["previous_response_id"] is not None and event["event"] == "error"
+                        and event["data"].get("code") == PREVIOUS_RESPONSE_NOT_FOUND
+                    ):
+                        # The stored response expired or was deleted; nothing was sent to
+                        # the client yet, so rebuild from history and stream that instead
+                        await events.aclose()
+                        break
+                    first = False
+                    if event["event"] == "delta":
+                        text.append(event["data"]["delta"])
+                    elif event["event"] == "tool_result":
+                        # Only the text after the last tool round is the reply
+                        text = []
+                    elif event["event"] == "done":
+                        store.record_turn(conversation, new_messages, sent, event["data"]["response_id"], "".join(text))
+                        await store.save(conversation)
+                        event = {"event": "done", "data": {**event["data"], "conversation_id": conversation_id}}
+                    yield event
+                else:
+                    return
+
+    def _get_agent(self,
+                   name: str,
+                   instructions: str,
+                   model: str,
+                   tools: List[Any],
+                   temperature: Optional[float]) -> Agent:
+        """Get a prebuilt Agent for this configuration, building it on first use
+
+        Agents are immutable during a run, so one instance can serve concurrent
+        requests. The agent's model uses the shared async client and its pool.
+        """
+        key = (name, instructions, model, tuple(getattr(tool, "name", tool) for tool in tools), temperature)
+        agent = self._agents.get(key)
+        if agent is MISSING:
+            agent = Agent(
+                name,
+                instructions=instructions,
+                tools=list(tools),
+                model=OpenAIResponsesModel(model, openai_client=self.async_client),
+                model_settings=ModelSettings(temperature=temperature),
+            )
+            self._agents.set(key, agent)
+        return agent
+
     async def create_single_agent_response(self, 
                              name: str,
                              instructions: str,
@@ -94,10 +745,12 @@ class OpenAIUtils:
                              temperature: float = 0.7) -> Dict[str, Any]:
         """Create a response using the OpenAI Agent API
         
+        Agents are cached per configuration, so repeated requests reuse the same Agent.
+        
         Args:
             input_text: Either a string message or a list of message objects with role and content
             model: The model to use (default: gpt-4o)
-            tools: Optional list of tools to enable
+            tools: Optional list of function tools to enable
             temperature: Sampling temperature, between 0 and 2
             
         Returns:
@@ -106,24 +759,82 @@ class OpenAIUtils:
         if tools is None:
             tools = []
         
-        # Format the input correctly based on its type
-        if isinstance(input_text, str):
-            formatted_input = [{"role": "user", "content": input_text}]
-        elif isinstance(input_text, list):
-            formatted_input = input_text
-        else:
-            raise ValueError("input_text must be either a string or a list of message objects")
+        formatted_input = self._format_input(input_text)
         
         try:
-            agent = Agent(name, instructions=instructions, tools=tools)
+            agent = self._get_agent(name, instructions, model, tools, temperature)
             
-            response = await Runner.run(agent, input_text)
+            with span("openai.agent.run", agent=name, model=model):
+                response = await Runner.run(agent, formatted_input)
             
             return response
             
         except Exception as e:
-            print(f"Error making OpenAI API request: {str(e)}")
-            if hasattr(e, 'response') and hasattr(e.response, 'text'):
-                print(f"Response details: {e.response.text}")
+            logger.error("Error making OpenAI API request: %s", e, extra={
+                "response_details": e.response.text if hasattr(e, 'response') and hasattr(e.response, 'text') else None,
+            })
             raise
-            
\ No newline at end of file
+
+    def stream_single_agent_response(self,
+                                     name: str,
+                                     instructions: str,
+                                     input_text: Union[str, List[Dict[str, str]]],
+                                     model: str = "gpt-4o",
+                                     tools: Optional[List[Dict[str, Any]]] = None,
+                                     temperature: float = 0.7) -> AsyncIterator[Dict[str, Any]]:
+        """Stream an agent run using Runner.run_streamed
+
+        Yields the same event shapes as stream_response, plus agent_updated
+        ({"name"}) on handoffs. The done event carries the agent's final_output.
+
+        Args:
+            name: Name of the agent
+            instructions: System instructions for the agent
+            input_text: Either a string message or a list of message objects with role and content
+            model: The model to use (default: gpt-4o)
+            tools: Optional list of function tools to enable
+            temperature: Sampling temperature, between 0 and 2
+
+        Returns:
+            Async iterator of stream events
+        """
+        if tools is None:
+            tools = []
+
+        self._format_input(input_text)
+        agent = self._get_agent(name, instructions, model, tools, temperature)
+
+        return self._stream_agent_events(agent, input_text)
+
+    async def _stream_agent_events(self, agent: Agent, input_text) -> AsyncIterator[Dict[str, Any]]:
+        try:
+            result = Runner.run_streamed(agent, input_text)
+
+            async for event in result.stream_events():
+                if event.type == "raw_response_event":
+                    if event.data.type == "response.output_text.delta":
+                        yield {"event": "delta", "data": {"delta": event.data.delta}}
+
+                elif event.type == "run_item_stream_event":
+                    if event.name == "tool_called":
+                        call = event.item.raw_item
+                        yield {"event": "tool_call", "data": {
+                            "call_id": getattr(call, "call_id", None),
+                            "name": getattr(call, "name", None),
+                            "arguments": getattr(call, "arguments", None),
+                        }}
+                    elif event.name == "tool_output":
+                        raw_item = event.item.raw_item
+                        yield {"event": "tool_result", "data": {
+                            "call_id": raw_item.get("call_id") if isinstance(raw_item, dict) else None,
+                            "output": event.item.output,
+                        }}
+
+                elif event.type == "agent_updated_stream_event":
+                    yield {"event": "agent_updated", "data": {"name": event.new_agent.name}}
+
+            yield {"event": "done", "data": {"final_output": result.final_output}}
+
+        except Exception as e:
+            logger.error("Error streaming OpenAI agent response: %s", e)
+            yield {"event": "error", "data": {"detail": str(e)}}
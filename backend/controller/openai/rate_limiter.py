@@ -0,0 +1,359 @@
+import asyncio
+import heapq
+import itertools
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Account limits to stay under; 0 disables that bucket, both 0 disables the limiter
+OPENAI_RATE_LIMIT_RPM = float(os.getenv('OPENAI_RATE_LIMIT_RPM', 0))
+OPENAI_RATE_LIMIT_TPM = float(os.getenv('OPENAI_RATE_LIMIT_TPM', 0))
+# SQLite file that makes every worker draw from the same buckets (default: per process)
+OPENAI_RATE_LIMIT_PATH = os.getenv('OPENAI_RATE_LIMIT_PATH')
+# Longest a call waits in the queue before failing with a timeout
+OPENAI_RATE_LIMIT_MAX_WAIT = float(os.getenv('OPENAI_RATE_LIMIT_MAX_WAIT', 60))
+# Output tokens assumed per call until usage reports the real number
+OPENAI_RATE_LIMIT_OUTPUT_TOKENS = int(os.getenv('OPENAI_RATE_LIMIT_OUTPUT_TOKENS', 512))
+# Priority of /openai/batch items; lower values are served first, interactive calls use 0
+OPENAI_RATE_LIMIT_BATCH_PRIORITY = int(os.getenv('OPENAI_RATE_LIMIT_BATCH_PRIORITY', 10))
+
+# (requests available, tokens available, last refill time)
+BucketState = Tuple[float, float, float]
+
+
+def estimate_tokens(params: Dict[str, Any]) -> int:
+    """Rough token count of a request: about four characters per token, plus the expected output"""
+    size = len(json.dumps(params.get("input"), default=str)) + len(json.dumps(params.get("tools"), default=str))
+    return size // 4 + OPENAI_RATE_LIMIT_OUTPUT_TOKENS
+
+
+def _take(state: BucketState, now: float, rpm: float, tpm: float, tokens: float) -> Tuple[BucketState, float]:
+    """
+    Refill both buckets and take one request and `tokens` tokens if both allow it.
+
+    Returns:
+        The new state and 0, or the refilled state and the seconds to wait before retrying
+    """
+    requests_left, tokens_left, updated_at = state
+    elapsed = max(now - updated_at, 0)
+    requests_left = min(rpm, requests_left + elapsed * rpm / 60) if rpm else 0
+    tokens_left = min(tpm, tokens_left + elapsed * tpm / 60) if tpm else 0
+
+    wait = 0.0
+    if rpm and requests_left < 1:
+        wait = (1 - requests_left) * 60 / rpm
+    if tpm and tokens_left < tokens:
+        wait = max(wait, (tokens - tokens_left) * 60 / tpm)
+    if wait == 0:
+        requests_left -= 1 if rpm else 0
+        tokens_left -= tokens if tpm else 0
+    return (requests_left, tokens_left, now), wait
+
+
+class MemoryBucketStore:
+    """Bucket state for a single process"""
+    blocking = False
+
+    def __init__(self, rpm: float, tpm: float):
+        self.rpm = rpm
+        self.tpm = tpm
+        self._state: BucketState = (rpm, tpm, time.time())
+        self._lock = threading.Lock()
+
+    def try_take(self, tokens: float) -> float:
+        with self._lock:
+            self._state, wait = _take(self._state, time.time(), self.rpm, self.tpm, tokens)
+        return wait
+
+    def adjust(self, tokens: float) -> None:
+        """Return (or, if negative, charge) tokens after the real usage is known"""
+        with self._lock:
+            requests_left, tokens_left, updated_at = self._state
+            self._state = (requests_left, min(self.tpm, tokens_left + tokens), updated_at)
+
+    def levels(self) -> Dict[str, float]:
+        requests_left, tokens_left, _ = self._state
+        return {"requests_available": requests_left, "tokens_available": tokens_left}
+
+
+class SQLiteBucketStore:
+    """
+    Bucket state in a SQLite file, shared by every process that opens it.
+
+    Each take runs in a BEGIN IMMEDIATE transaction, so concurrent workers
+    serialize on the file lock and never overspend the buckets.
+    """
+    blocking = True
+
+    def __init__(self, path: str, rpm: float, tpm: float, name: str = "openai"):
+        self.path = path
+        self.rpm = rpm
+        self.tpm = tpm
+        self.name = name
+        self._local = threading.local()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        conn = self._connection()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS rate_limit ("
+            "name TEXT PRIMARY KEY, requests REAL NOT NULL, tokens REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+        conn.execute(
+            "INSERT OR IGNORE INTO rate_limit (name, requests, tokens, updated_at) VALUES (?, ?, ?, ?)",
+            (name, rpm, tpm, time.time()),
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        # Connections must not cross a fork, so reconnect in a new process
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _update(self, change) -> Any:
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT requests, tokens, updated_at FROM rate_limit WHERE name = ?", (self.name,)
+            ).fetchone()
+            state, result = change(tuple(row))
+            conn.execute(
+                "UPDATE rate_limit SET requests = ?, tokens = ?, updated_at = ? WHERE name = ?",
+                (*state, self.name),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return result
+
+    def try_take(self, tokens: float) -> float:
+        return self._update(lambda state: _take(state, time.time(), self.rpm, self.tpm, tokens))
+
+    def adjust(self, tokens: float) -> None:
+        def change(state):
+            requests_left, tokens_left, updated_at = state
+            return (requests_left, min(self.tpm, tokens_left + tokens), updated_at), None
+        self._update(change)
+
+    def levels(self) -> Dict[str, float]:
+        row = self._connection().execute(
+            "SELECT requests, tokens FROM rate_limit WHERE name = ?", (self.name,)
+        ).fetchone()
+        return {"requests_available": row[0], "tokens_available": row[1]}
+
+
+class RateLimiter:
+    """
+    Client-side scheduler that keeps OpenAI calls under requests/min and tokens/min limits.
+
+    Calls reserve one request and their estimated tokens from two token buckets
+    before they are sent. When the buckets are empty, calls wait in a priority
+    queue (lower priority values first, FIFO within a priority) instead of
+    failing upstream with 429. Once a response reports its usage, the difference
+    from the estimate is returned to or charged from the token bucket.
+    """
+    def __init__(
+        self,
+        rpm: float = OPENAI_RATE_LIMIT_RPM,
+        tpm: float = OPENAI_RATE_LIMIT_TPM,
+        path: Optional[str] = OPENAI_RATE_LIMIT_PATH,
+        max_wait: float = OPENAI_RATE_LIMIT_MAX_WAIT,
+    ):
+        """
+        Args:
+            rpm: Requests per minute (0 for no request limit)
+            tpm: Tokens per minute (0 for no token limit)
+            path: SQLite file shared across processes (default: limits apply per process)
+            max_wait: Seconds a call may wait before acquire raises TimeoutError
+        """
+        self.rpm = rpm
+        self.tpm = tpm
+        self.max_wait = max_wait
+        self.store = SQLiteBucketStore(path, rpm, tpm) if path else MemoryBucketStore(rpm, tpm)
+        self._queue: List[Tuple[int, int, float, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._sync_lock = threading.Lock()
+        self.granted = 0
+        self.delayed = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_observed_wait = 0.0
+        self.tokens_estimated = 0
+        self.tokens_used = 0
+
+    @classmethod
+    def from_env(cls) -> Optional["RateLimiter"]:
+        """Build the limiter configured by OPENAI_RATE_LIMIT_RPM/TPM, or None when both are 0"""
+        if not OPENAI_RATE_LIMIT_RPM and not OPENAI_RATE_LIMIT_TPM:
+            return None
+        return cls()
+
+    def _clamp(self, tokens: int) -> int:
+        # A call larger than the whole bucket could never be scheduled otherwise
+        return min(tokens, int(self.tpm)) if self.tpm else tokens
+
+    def _record_wait(self, waited: float) -> None:
+        self.granted += 1
+        if waited > 0.001:
+            self.delayed += 1
+        self.total_wait += waited
+        self.max_observed_wait = max(self.max_observed_wait, waited)
+
+    async def _try_take(self, tokens: float) -> float:
+        if self.store.blocking:
+            return await asyncio.to_thread(self.store.try_take, tokens)
+        return self.store.try_take(tokens)
+
+    async def _adjust(self, tokens: float) -> None:
+        if self.store.blocking:
+            await asyncio.to_thread(self.store.adjust, tokens)
+        else:
+            self.store.adjust(tokens)
+
+    async def _dispatch(self) -> None:
+        """Grant queued calls in priority order as the buckets allow"""
+        queue = self._queue
+        while True:
+            # Drop callers that timed out or were cancelled
+            while queue and queue[0][3].done():
+                heapq.heappop(queue)
+            if not queue:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            tokens, future = queue[0][2], queue[0][3]
+            wait = await self._try_take(tokens)
+            if wait <= 0:
+                heapq.heappop(queue)
+                if future.done():
+                    # The caller left while the tokens were being taken
+                    await self._adjust(tokens)
+                else:
+                    future.set_result(None)
+                continue
+
+            # Sleep until the head fits, or until a higher-priority call arrives
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=wait)
+            except asyncio.TimeoutError:
+                pass
+
+    def _ensure_dispatcher(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._dispatcher is None or self._dispatcher.done():
+            self._loop = loop
+            self._wakeup = asyncio.Event()
+            self._dispatcher = loop.create_task(self._dispatch())
+
+    async def acquire(self, tokens: int, priority: int = 0) -> int:
+        """
+        Wait until a call with this many estimated tokens may be sent.
+
+        Args:
+            tokens: Estimated tokens of the call (see estimate_tokens)
+            priority: Lower values are served first
+
+        Returns:
+            The tokens reserved, to pass to record_usage
+
+        Raises:
+            TimeoutError: If the call waited longer than max_wait
+        """
+        tokens = self._clamp(tokens)
+        self._ensure_dispatcher()
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        heapq.heappush(self._queue, (priority, next(self._sequence), tokens, future))
+        self._wakeup.set()
+
+        started = loop.time()
+        try:
+            await asyncio.wait_for(future, timeout=self.max_wait)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise TimeoutError(f"Waited more than {self.max_wait}s for OpenAI rate limit capacity")
+        self._record_wait(loop.time() - started)
+        self.tokens_estimated += tokens
+        return tokens
+
+    def acquire_sync(self, tokens: int) -> int:
+        """Blocking version of acquire for synchronous callers, served in arrival order"""
+        tokens = self._clamp(tokens)
+        started = time.monotonic()
+        with self._sync_lock:
+            while True:
+                wait = self.store.try_take(tokens)
+                if wait <= 0:
+                    break
+                if time.monotonic() - started + wait > self.max_wait:
+                    self.timeouts += 1
+                    raise TimeoutError(f"Waited more than {self.max_wait}s for OpenAI rate limit capacity")
+                time.sleep(wait)
+        self._record_wait(time.monotonic() - started)
+        self.tokens_estimated += tokens
+        return tokens
+
+    def _correction(self, reserved: int, usage: Any) -> Optional[int]:
+        """Tokens to return to the bucket (negative to charge) once usage is known, or None"""
+        total = getattr(usage, "total_tokens", None)
+        if total is None:
+            return None
+        self.tokens_used += total
+        if self.tpm and total != reserved:
+            return reserved - total
+        return None
+
+    def record_usage(self, reserved: int, usage: Any) -> None:
+        """Correct the token bucket with the usage a response reported"""
+        correction = self._correction(reserved, usage)
+        if correction is not None:
+            self.store.adjust(correction)
+
+    async def arecord_usage(self, reserved: int, usage: Any) -> None:
+        """Async version of record_usage; keeps a shared store's file lock off the event loop"""
+        correction = self._correction(reserved, usage)
+        if correction is not None:
+            await self._adjust(correction)
+
+    def _stats(self, levels: Dict[str, float]) -> Dict[str, Any]:
+        return {
+            "rpm": self.rpm,
+            "tpm": self.tpm,
+            "queue_depth": sum(1 for item in self._queue if not item[3].done()),
+            "granted": self.granted,
+            "delayed": self.delayed,
+            "timeouts": self.timeouts,
+            "avg_wait": self.total_wait / self.granted if self.granted else 0.0,
+            "max_wait": self.max_observed_wait,
+            "tokens_estimated": self.tokens_estimated,
+            "tokens_used": self.tokens_used,
+            **levels,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth, wait times and token estimate accuracy for this process"""
+        return self._stats(self.store.levels())
+
+    async def astats(self) -> Dict[str, Any]:
+        """Async version of stats"""
+        if self.store.blocking:
+            return self._stats(await asyncio.to_thread(self.store.levels))
+        return self._stats(self.store.levels())
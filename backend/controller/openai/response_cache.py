@@ -0,0 +1,173 @@
+import asyncio
+import copy
+import hashlib
+import json
+import os
+from typing import Any, Awaitable, Callable, Dict, Optional, Union
+
+from dotenv import load_dotenv
+
+from controller.cache import TTLCache, SQLiteCache, SingleFlight, AsyncSingleFlight, MISSING
+
+load_dotenv()
+
+# Response cache backend: "off" (default), "memory" or "sqlite"
+OPENAI_RESPONSE_CACHE = os.getenv('OPENAI_RESPONSE_CACHE', 'off').lower()
+OPENAI_RESPONSE_CACHE_TTL = float(os.getenv('OPENAI_RESPONSE_CACHE_TTL', 600))
+OPENAI_RESPONSE_CACHE_SIZE = int(os.getenv('OPENAI_RESPONSE_CACHE_SIZE', 1024))
+# SQLite file shared by all gunicorn workers, used by the "sqlite" backend
+OPENAI_RESPONSE_CACHE_PATH = os.getenv('OPENAI_RESPONSE_CACHE_PATH', '/tmp/openai_response_cache.sqlite3')
+# Only calls at or below this temperature are cached; sampled output is not reusable
+OPENAI_RESPONSE_CACHE_MAX_TEMPERATURE = float(os.getenv('OPENAI_RESPONSE_CACHE_MAX_TEMPERATURE', 0))
+
+
+class ResponseCache:
+    """
+    Cache for Responses API results keyed on a canonical hash of the request.
+
+    Identical concurrent requests are coalesced, so only one of them reaches
+    OpenAI and the rest wait for its result. Failed calls are never cached.
+    The backend is anything with TTLCache's get/set interface: a TTLCache for
+    a per-process LRU or a SQLiteCache shared by every worker. On the async path,
+    SQLite reads and writes run on a worker thread.
+    """
+    def __init__(
+        self,
+        backend: Union[TTLCache, SQLiteCache],
+        ttl: Optional[float] = OPENAI_RESPONSE_CACHE_TTL,
+        max_temperature: float = OPENAI_RESPONSE_CACHE_MAX_TEMPERATURE,
+    ):
+        """
+        Args:
+            backend: Storage for cached responses
+            ttl: Time to live in seconds for cached responses
+            max_temperature: Highest temperature whose responses are cached
+        """
+        self.backend = backend
+        # File-backed lookups can wait on another worker's lock, keep them off the event loop
+        self.blocking = isinstance(backend, SQLiteCache)
+        self.ttl = ttl
+        self.max_temperature = max_temperature
+        self._flight = SingleFlight()
+        self._async_flight = AsyncSingleFlight()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.bypassed = 0
+
+    @classmethod
+    def from_env(cls) -> Optional["ResponseCache"]:
+        """Build the cache configured by OPENAI_RESPONSE_CACHE, or None when it is off"""
+        if OPENAI_RESPONSE_CACHE == 'memory':
+            return cls(TTLCache(max_size=OPENAI_RESPONSE_CACHE_SIZE, ttl=OPENAI_RESPONSE_CACHE_TTL))
+        if OPENAI_RESPONSE_CACHE == 'sqlite':
+            return cls(SQLiteCache(
+                OPENAI_RESPONSE_CACHE_PATH,
+                ttl=OPENAI_RESPONSE_CACHE_TTL,
+                max_size=OPENAI_RESPONSE_CACHE_SIZE,
+                namespace='openai_responses',
+            ))
+        if OPENAI_RESPONSE_CACHE != 'off':
+            raise ValueError(f"Unknown OPENAI_RESPONSE_CACHE backend: {OPENAI_RESPONSE_CACHE}")
+        return None
+
+    def cacheable(self, temperature: Optional[float]) -> bool:
+        return temperature is not None and temperature <= self.max_temperature
+
+    @staticmethod
+    def key(model: str, input_items: Any, tools: Any, temperature: Optional[float], **extra: Any) -> str:
+        """Hash the request into a key that is stable across processes and dict ordering"""
+        canonical = json.dumps(
+            {"model": model, "input": input_items, "tools": tools, "temperature": temperature, **extra},
+            sort_keys=True,
+            separators=(',', ':'),
+            default=str,
+        )
+        return hashlib.sha256(canonical.encode()).hexdigest()
+
+    def _lookup(self, key: str) -> Any:
+        value = self.backend.get(key)
+        if value is MISSING:
+            return MISSING
+        self.hits += 1
+        # Callers may mutate the response, never hand out the cached object itself
+        return copy.deepcopy(value)
+
+    def _store(self, key: str, value: Any) -> Any:
+        self.backend.set(key, copy.deepcopy(value), ttl=self.ttl)
+        return value
+
+    async def _alookup(self, key: str) -> Any:
+        if self.blocking:
+            return await asyncio.to_thread(self._lookup, key)
+        return self._lookup(key)
+
+    async def _astore(self, key: str, value: Any) -> Any:
+        if self.blocking:
+            return await asyncio.to_thread(self._store, key, value)
+        return self._store(key, value)
+
+    def get_or_create(self, key: str, create: Callable[[], Any]) -> Any:
+        """Return the cached response for key, or call create once for all concurrent callers"""
+        value = self._lookup(key)
+        if value is not MISSING:
+            return value
+
+        leader = []
+
+        def fetch():
+            leader.append(True)
+            self.misses += 1
+            return self._store(key, create())
+
+        value = self._flight.do(key, fetch)
+        if not leader:
+            self.coalesced += 1
+            return copy.deepcopy(value)
+        return value
+
+    async def aget_or_create(self, key: str, create: Callable[[], Awaitable[Any]]) -> Any:
+        """Async version of get_or_create; concurrent callers share one task"""
+        value = await self._alookup(key)
+        if value is not MISSING:
+            return value
+
+        leader = []
+
+        async def fetch():
+            leader.append(True)
+            self.misses += 1
+            return await self._astore(key, await create())
+
+        value = await self._async_flight.do(key, fetch)
+        if not leader:
+            self.coalesced += 1
+        # Every waiter of the shared task gets its own copy
+        return copy.deepcopy(value)
+
+    def record_bypass(self) -> None:
+        self.bypassed += 1
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+    def _stats(self, backend_stats: Dict[str, Any]) -> Dict[str, Any]:
+        served = self.hits + self.misses + self.coalesced
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "bypassed": self.bypassed,
+            "hit_rate": (self.hits + self.coalesced) / served if served else 0.0,
+            "backend": backend_stats,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit-rate metrics. Coalesced requests count as saved upstream calls, like hits."""
+        return self._stats(self.backend.stats())
+
+    async def astats(self) -> Dict[str, Any]:
+        """Async version of stats"""
+        if self.blocking:
+            return self._stats(await asyncio.to_thread(self.backend.stats))
+        return self._stats(self.backend.stats())
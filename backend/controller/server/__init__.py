@@ -0,0 +1,19 @@
+"""
+Server package.
+Contains production server settings: worker sizing from the container's CPU and
+memory limits, per-request timeouts and optional listen-queue-driven autoscaling.
+"""
+
+from .resources import cpu_limit, memory_limit, max_workers_for_memory, worker_count
+from .request_timeout import RequestTimeoutMiddleware
+from .autoscaler import BacklogAutoscaler, listen_backlog
+
+__all__ = [
+    'cpu_limit',
+    'memory_limit',
+    'max_workers_for_memory',
+    'worker_count',
+    'RequestTimeoutMiddleware',
+    'BacklogAutoscaler',
+    'listen_backlog',
+]
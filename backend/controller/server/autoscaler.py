@@ -0,0 +1,134 @@
+import os
+import signal
+import threading
+from typing import Iterable, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Opt-in: let the gunicorn master add and remove workers from the listen queue depth
+AUTOSCALE_ENABLED = os.getenv('AUTOSCALE_ENABLED', 'false').lower() == 'true'
+# Seconds between listen queue samples
+AUTOSCALE_INTERVAL = float(os.getenv('AUTOSCALE_INTERVAL', 1.0))
+# Connections waiting to be accepted at which the workers count as saturated
+AUTOSCALE_BACKLOG_HIGH = int(os.getenv('AUTOSCALE_BACKLOG_HIGH', 8))
+# Consecutive saturated samples before a worker is added
+AUTOSCALE_UP_SAMPLES = int(os.getenv('AUTOSCALE_UP_SAMPLES', 3))
+# Consecutive samples with an empty queue before a worker is removed
+AUTOSCALE_DOWN_SAMPLES = int(os.getenv('AUTOSCALE_DOWN_SAMPLES', 60))
+
+_TCP_LISTEN = '0A'
+
+
+def listen_backlog(ports: Iterable[int]) -> int:
+    """
+    Connections waiting in the accept queues of the listening sockets on these ports.
+
+    For a listening socket, the rx_queue column of /proc/net/tcp is the number of
+    connections the kernel has accepted that no worker has picked up yet.
+    """
+    ports = set(ports)
+    backlog = 0
+    for path in ('/proc/net/tcp', '/proc/net/tcp6'):
+        try:
+            with open(path) as file:
+                next(file)
+                for line in file:
+                    fields = line.split()
+                    if fields[3] != _TCP_LISTEN or int(fields[1].rsplit(':', 1)[1], 16) not in ports:
+                        continue
+                    backlog += int(fields[4].split(':')[1], 16)
+        except (OSError, StopIteration):
+            continue
+    return backlog
+
+
+class BacklogAutoscaler:
+    """
+    Adds and removes gunicorn workers from the depth of the listen queue.
+
+    Async workers accept connections as fast as they arrive until their event
+    loops are saturated, so a queue that stays above the threshold means the
+    workers cannot keep up: a worker is added with SIGTTIN. A queue that stays
+    empty for a while removes one with SIGTTOU, which stops the oldest worker
+    gracefully. Runs as a thread in the gunicorn master; start it from when_ready.
+    """
+    def __init__(
+        self,
+        server,
+        ports: Iterable[int],
+        min_workers: int,
+        max_workers: int,
+        interval: float = AUTOSCALE_INTERVAL,
+        backlog_high: int = AUTOSCALE_BACKLOG_HIGH,
+        up_samples: int = AUTOSCALE_UP_SAMPLES,
+        down_samples: int = AUTOSCALE_DOWN_SAMPLES,
+    ):
+        """
+        Args:
+            server: The gunicorn Arbiter
+            ports: TCP ports gunicorn listens on
+            min_workers: Workers never go below this
+            max_workers: Workers never go above this; keep it within the memory limit
+            interval: Seconds between samples
+            backlog_high: Queue depth at which the workers count as saturated
+            up_samples: Consecutive saturated samples before a worker is added
+            down_samples: Consecutive empty samples before a worker is removed
+        """
+        self.server = server
+        self.ports = list(ports)
+        self.min_workers = min_workers
+        self.max_workers = max(min_workers, max_workers)
+        self.interval = interval
+        self.backlog_high = backlog_high
+        self.up_samples = up_samples
+        self.down_samples = down_samples
+        self._saturated = 0
+        self._idle = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if not self.ports:
+            self.server.log.warning("Autoscaling disabled: no TCP listeners")
+            return
+        self._thread = threading.Thread(target=self._run, name='autoscaler', daemon=True)
+        self._thread.start()
+        self.server.log.info("Autoscaling between %d and %d workers", self.min_workers, self.max_workers)
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.step(listen_backlog(self.ports))
+            except Exception:
+                self.server.log.exception("Autoscaler sample failed")
+
+    def step(self, backlog: int) -> Optional[int]:
+        """
+        Record one queue sample and resize if it completes a run of samples.
+
+        Returns:
+            The signal sent to the master, or None
+        """
+        workers = self.server.num_workers
+        self._saturated = self._saturated + 1 if backlog >= self.backlog_high else 0
+        self._idle = self._idle + 1 if backlog == 0 else 0
+
+        if self._saturated >= self.up_samples and workers < self.max_workers:
+            self.server.log.info("Listen queue at %d, adding a worker (%d -> %d)", backlog, workers, workers + 1)
+            return self._resize(signal.SIGTTIN)
+        if self._idle >= self.down_samples and workers > self.min_workers:
+            self.server.log.info("Listen queue empty, removing a worker (%d -> %d)", workers, workers - 1)
+            return self._resize(signal.SIGTTOU)
+        return None
+
+    def _resize(self, signum: int) -> int:
+        # The master handles these signals in its main loop; the counters restart so the
+        # new worker count is observed for a full run of samples before the next change
+        self._saturated = self._idle = 0
+        os.kill(self.server.pid, signum)
+        return signum
@@ -0,0 +1,71 @@
+import logging
+import os
+from typing import Tuple
+
+import anyio
+from dotenv import load_dotenv
+from starlette.responses import JSONResponse
+
+load_dotenv()
+
+# Seconds a request may take until its response starts; above OPENAI_TOOL_LOOP_TIMEOUT
+# so a tool loop ends with its own error first (0 disables)
+REQUEST_TIMEOUT = float(os.getenv('REQUEST_TIMEOUT', 150))
+# Seconds a streamed response may run in total once it has started (0 disables)
+REQUEST_STREAM_TIMEOUT = float(os.getenv('REQUEST_STREAM_TIMEOUT', 600))
+
+logger = logging.getLogger(__name__)
+
+
+class RequestTimeoutMiddleware:
+    """
+    ASGI middleware that bounds how long a request may run.
+
+    A request whose response has not started within the timeout is cancelled and
+    answered with a 504. Once the response has started, the longer stream timeout
+    applies instead; a stream that exceeds it is cancelled and its connection
+    closed. The handler is cancelled in its own task, so only that request is
+    affected and the worker keeps serving. Code running in a thread (sync
+    endpoints) cannot be interrupted; its request ends when the thread returns.
+    """
+    def __init__(self, app, timeout: float = REQUEST_TIMEOUT, stream_timeout: float = REQUEST_STREAM_TIMEOUT,
+                 exclude: Tuple[str, ...] = ('/metrics',)):
+        """
+        Args:
+            app: The ASGI app to wrap
+            timeout: Seconds until the response must start (0 disables)
+            stream_timeout: Seconds a started response may run in total (0 disables)
+            exclude: Paths that are not bounded
+        """
+        self.app = app
+        self.timeout = timeout
+        self.stream_timeout = stream_timeout
+        self.exclude = exclude
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or not self.timeout or scope['path'] in self.exclude:
+            await self.app(scope, receive, send)
+            return
+
+        started = anyio.current_time()
+        response_started = False
+
+        async def send_with_deadline(message):
+            nonlocal response_started
+            if message['type'] == 'http.response.start' and not response_started:
+                response_started = True
+                cancel_scope.deadline = started + self.stream_timeout if self.stream_timeout else float('inf')
+            await send(message)
+
+        with anyio.CancelScope(deadline=started + self.timeout) as cancel_scope:
+            await self.app(scope, receive, send_with_deadline)
+        if not cancel_scope.cancelled_caught:
+            return
+
+        elapsed = anyio.current_time() - started
+        logger.warning('Request timed out after %.1fs', elapsed,
+                       extra={'method': scope['method'], 'path': scope['path'], 'streaming': response_started})
+        if not response_started:
+            response = JSONResponse({'detail': 'Request timed out'}, status_code=504)
+            await response(scope, receive, send)
+        # A started response is left incomplete; the server closes the connection
@@ -0,0 +1,101 @@
+import math
+import os
+from typing import Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Estimated resident memory of one worker, including the processes it starts for cpu tools
+WORKER_MEMORY_MB = int(os.getenv('WORKER_MEMORY_MB', 300))
+# Memory kept free for the gunicorn master, the forkserver and the page cache
+SERVER_RESERVED_MEMORY_MB = int(os.getenv('SERVER_RESERVED_MEMORY_MB', 150))
+# Async workers per CPU; one keeps every core busy without the workers competing for it
+WORKERS_PER_CPU = float(os.getenv('WORKERS_PER_CPU', 1))
+
+# Values cgroup v1 uses for "no limit" are close to the largest page-aligned 64-bit number
+_UNLIMITED = 1 << 60
+
+
+def _read(path: str) -> Optional[str]:
+    try:
+        with open(path) as file:
+            return file.read().strip()
+    except OSError:
+        return None
+
+
+def cpu_limit() -> float:
+    """
+    CPUs this process may use: the container's CPU quota if there is one,
+    otherwise the CPUs it is allowed to run on.
+    """
+    try:
+        cpus = float(len(os.sched_getaffinity(0)))
+    except AttributeError:
+        cpus = float(os.cpu_count() or 1)
+
+    quota = period = None
+    # cgroup v2: "<quota> <period>" or "max <period>"
+    cpu_max = _read('/sys/fs/cgroup/cpu.max')
+    if cpu_max:
+        value, _, interval = cpu_max.partition(' ')
+        if value != 'max' and interval:
+            quota, period = int(value), int(interval)
+    else:
+        # cgroup v1: a quota of -1 means unlimited
+        value, interval = _read('/sys/fs/cgroup/cpu/cpu.cfs_quota_us'), _read('/sys/fs/cgroup/cpu/cpu.cfs_period_us')
+        if value and interval and int(value) > 0:
+            quota, period = int(value), int(interval)
+
+    if quota and period:
+        cpus = min(cpus, quota / period)
+    return cpus
+
+
+def memory_limit() -> Optional[int]:
+    """
+    Bytes of memory this process may use: the container's memory limit if there
+    is one, otherwise the machine's memory. None if neither can be read.
+    """
+    limits = []
+    for path in ('/sys/fs/cgroup/memory.max', '/sys/fs/cgroup/memory/memory.limit_in_bytes'):
+        value = _read(path)
+        if value and value != 'max' and int(value) < _UNLIMITED:
+            limits.append(int(value))
+            break
+    try:
+        limits.append(os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES'))
+    except (ValueError, OSError, AttributeError):
+        pass
+    return min(limits) if limits else None
+
+
+def max_workers_for_memory(memory: Optional[int] = None) -> Optional[int]:
+    """Workers that fit in the memory limit, or None if the limit is unknown"""
+    memory = memory_limit() if memory is None else memory
+    if memory is None:
+        return None
+    available_mb = memory / (1024 * 1024) - SERVER_RESERVED_MEMORY_MB
+    return max(1, int(available_mb // WORKER_MEMORY_MB))
+
+
+def worker_count(cpus: Optional[float] = None, memory: Optional[int] = None) -> int:
+    """
+    Workers to start: WORKERS_PER_CPU per CPU of the container's quota, at least two
+    so a worker restarting after max_requests does not leave none serving, and no
+    more than fit in its memory limit.
+
+    Args:
+        cpus: CPUs available (default: read from the cgroup)
+        memory: Bytes of memory available (default: read from the cgroup)
+
+    Returns:
+        The number of workers
+    """
+    cpus = cpu_limit() if cpus is None else cpus
+    workers = max(2, math.ceil(cpus * WORKERS_PER_CPU))
+    memory_workers = max_workers_for_memory(memory)
+    if memory_workers is not None:
+        workers = min(workers, memory_workers)
+    return workers
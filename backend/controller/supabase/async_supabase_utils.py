@@ -0,0 +1,867 @@
+import asyncio
+import mmap
+import os
+import httpx
+from postgrest.types import ReturnMethod
+from supabase import acreate_client, AsyncClient, AsyncClientOptions
+from dotenv import load_dotenv
+from typing import Dict, List, Any, Optional, Union, Iterable, AsyncIterable, AsyncIterator, Sequence, BinaryIO
+
+from controller.observability import span
+from controller.cache import MISSING, AsyncSingleFlight
+from .filters import Filters, apply_filters, select_columns
+from .supabase_utils import apply_order
+from .query_cache import SelectCache
+from .url_cache import StorageURLCache
+from .schema_catalog import schema_catalog, CATALOG_QUERY
+from .storage_stream import (
+    AsyncStorageStream,
+    StorageDownload,
+    aiter_file,
+    aiter_mmap,
+    aread_chunks,
+    askip_bytes,
+    read_chunks,
+    skip_bytes,
+    STORAGE_DOWNLOAD_CHUNK_SIZE,
+    STORAGE_UPLOAD_CHUNK_SIZE,
+    STORAGE_RESUMABLE_CHUNK_SIZE,
+    STORAGE_RESUMABLE_THRESHOLD,
+)
+from .bulk import (
+    BulkInsertResult,
+    ChunkResult,
+    aiter_chunks,
+    BULK_CHUNK_SIZE,
+    BULK_CONCURRENCY,
+    BULK_RETRY_BACKOFF,
+    is_retryable,
+)
+
+# Load environment variables
+load_dotenv()
+
+# Connection pool limits for the shared HTTP client (per worker process)
+SUPABASE_MAX_CONNECTIONS = int(os.getenv("SUPABASE_MAX_CONNECTIONS", 100))
+SUPABASE_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("SUPABASE_MAX_KEEPALIVE_CONNECTIONS", 20))
+SUPABASE_TIMEOUT = float(os.getenv("SUPABASE_TIMEOUT", 30))
+
+_schema_flight = AsyncSingleFlight()
+
+
+class AsyncSupabaseController:
+    """
+    Async counterpart of SupabaseController with the same API.
+
+    All instances in a worker process share one AsyncClient and one pooled
+    httpx connection, so independent queries can be fanned out concurrently:
+
+        users, orders = await asyncio.gather(
+            controller.select("users", filters={"id": user_id}),
+            controller.select("orders", filters={"user_id": user_id}),
+        )
+    """
+
+    _client: Optional[AsyncClient] = None
+    _http_client: Optional[httpx.AsyncClient] = None
+    _client_lock: Optional[asyncio.Lock] = None
+
+    def __init__(
+        self,
+        cache: Optional[SelectCache] = None,
+        url_cache: Optional[StorageURLCache] = None,
+    ):
+        """
+        Args:
+            cache: Optional read-through cache for select results. Writes through
+                this controller invalidate the cached results of the written table.
+            url_cache: Cache for public and signed storage URLs. A private one is
+                created when not given; pass a shared instance to reuse URLs across
+                controllers.
+        """
+        self.cache = cache
+        self.url_cache = url_cache if url_cache is not None else StorageURLCache()
+        self.supabase_url = os.getenv("SUPABASE_URL")
+        self.supabase_key = os.getenv("SUPABASE_SERVICE_KEY")
+
+        if not self.supabase_url or not self.supabase_key:
+            raise ValueError(
+                "Supabase URL and key must be provided in environment variables"
+            )
+
+    async def get_client(self) -> AsyncClient:
+        """Get the process-wide async Supabase client, creating it on first use"""
+        cls = AsyncSupabaseController
+        if cls._client is not None:
+            return cls._client
+
+        if cls._client_lock is None:
+            cls._client_lock = asyncio.Lock()
+        async with cls._client_lock:
+            if cls._client is None:
+                cls._http_client = httpx.AsyncClient(
+                    timeout=SUPABASE_TIMEOUT,
+                    follow_redirects=True,
+                    limits=httpx.Limits(
+                        max_connections=SUPABASE_MAX_CONNECTIONS,
+                        max_keepalive_connections=SUPABASE_MAX_KEEPALIVE_CONNECTIONS,
+                    ),
+                )
+                cls._client = await acreate_client(
+                    self.supabase_url,
+                    self.supabase_key,
+                    options=AsyncClientOptions(httpx_client=cls._http_client),
+                )
+        return cls._client
+
+    @classmethod
+    async def aclose(cls) -> None:
+        """Close the shared HTTP client. Call on application shutdown."""
+        if cls._http_client is not None:
+            await cls._http_client.aclose()
+        cls._http_client = None
+        cls._client = None
+        cls._client_lock = None
+
+    def _invalidate(self, table_name: str) -> None:
+        if self.cache is not None:
+            self.cache.invalidate(table_name)
+
+    async def select(
+        self,
+        table_name: str,
+        columns: Union[str, Sequence[str]] = "*",
+        filters: Optional[Filters] = None,
+        order_by: Optional[Dict[str, str]] = None,
+        limit: Optional[int] = None,
+        offset: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Select data from a table with optional filtering, ordering, and limiting.
+
+        Args:
+            table_name: Name of the table to query
+            columns: Columns to select, as a comma-separated string or a list (default "*" for all columns)
+            filters: Dictionary of column-value pairs, Predicate (see filters.py), or a list of both
+            order_by: Dictionary with column name as key and "asc" or "desc" as value
+            limit: Maximum number of rows to return
+            offset: Number of rows to skip; combined with limit this becomes a range() request
+
+        Returns:
+            List of dictionaries representing the selected rows
+        """
+        columns = select_columns(columns)
+        if self.cache is not None:
+            cache_key = self.cache.key(table_name, columns, filters, order_by, limit, offset=offset)
+            cached = self.cache.get(cache_key)
+            if cached is not MISSING:
+                return cached
+
+        client = await self.get_client()
+        query = client.table(table_name).select(columns)
+
+        # Apply filters and ordering if provided
+        query = apply_filters(query, filters)
+        query = apply_order(query, order_by)
+
+        # Apply limit and offset if provided
+        if offset and limit:
+            query = query.range(offset, offset + limit - 1)
+        elif offset:
+            query = query.offset(offset)
+        elif limit:
+            query = query.limit(limit)
+
+        # Execute the query
+        with span("supabase.select", table=table_name):
+            response = await query.execute()
+
+        # Check for errors
+        if hasattr(response, "error") and response.error:
+            raise Exception(f"Supabase query error: {response.error.message}")
+
+        if self.cache is not None:
+            self.cache.set(cache_key, response.data)
+
+        return response.data
+
+    async def iter_rows(
+        self,
+        table_name: str,
+        columns: Union[str, Sequence[str]] = "*",
+        filters: Optional[Filters] = None,
+        page_size: int = 1000,
+        key_column: Optional[str] = "id",
+        descending: bool = False,
+        order_by: Optional[Dict[str, str]] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Lazily iterate over every matching row of a table, one page at a time.
+
+        By default pages are fetched with keyset pagination: each page asks for rows
+        whose key_column is greater (or less, when descending) than the last key
+        seen, so every page costs the same no matter how deep into the table it is.
+        key_column must be unique and sortable, and is added to columns if missing.
+        With key_column=None, pages are fetched with range() offsets in order_by order
+        instead. Rows are yielded as soon as their page arrives, and at most one page
+        is held in memory. The select cache is bypassed.
+
+        Args:
+            table_name: Name of the table to read
+            columns: Columns to select, as a comma-separated string or a list (default "*" for all columns)
+            filters: Dictionary of column-value pairs, Predicate, or a list of both
+            page_size: Number of rows requested per page (the server may return fewer)
+            key_column: Unique column used for keyset pagination, or None for range pagination
+            descending: Iterate in descending key order (keyset pagination only)
+            order_by: Ordering used with range pagination
+
+        Yields:
+            Row dictionaries
+        """
+        columns = select_columns(columns)
+        if key_column and columns != "*" and key_column not in [c.strip() for c in columns.split(",")]:
+            columns = f"{columns},{key_column}"
+
+        client = await self.get_client()
+        last_key = None
+        offset = 0
+        while True:
+            query = client.table(table_name).select(columns)
+            query = apply_filters(query, filters)
+
+            if key_column:
+                if last_key is not None:
+                    query = query.lt(key_column, last_key) if descending else query.gt(key_column, last_key)
+                query = query.order(key_column, desc=descending).limit(page_size)
+            else:
+                query = apply_order(query, order_by).range(offset, offset + page_size - 1)
+
+            with span("supabase.select", table=table_name):
+                response = await query.execute()
+
+            # Check for errors
+            if hasattr(response, "error") and response.error:
+                raise Exception(f"Supabase query error: {response.error.message}")
+
+            rows = response.data
+            for row in rows:
+                yield row
+
+            # A short page is not the end: PostgREST caps pages at its max-rows setting
+            # (1000 on Supabase) whatever page_size asks for, so only an empty page is
+            if not rows:
+                return
+            if key_column:
+                last_key = rows[-1][key_column]
+            offset += len(rows)
+
+    async def insert(
+        self, table_name: str, data: Union[Dict[str, Any], List[Dict[str, Any]]]
+    ) -> Dict[str, Any]:
+        """
+        Insert one or more rows into a table.
+
+        Args:
+            table_name: Name of the table to insert into
+            data: Dictionary or list of dictionaries containing the data to insert
+
+        Returns:
+            Dictionary containing the inserted data
+        """
+        client = await self.get_client()
+        with span("supabase.insert", table=table_name):
+            response = await client.table(table_name).insert(data).execute()
+
+        # Check for errors
+        if hasattr(response, "error") and response.error:
+            raise Exception(f"Supabase insert error: {response.error.message}")
+
+        self._invalidate(table_name)
+
+        return response.data
+
+    async def upsert(
+        self, table_name: str, data: Union[Dict[str, Any], List[Dict[str, Any]]], on_conflict: Optional[str] = None
+    ) -> None:
+        """
+        Insert rows, or update them where they conflict with an existing row.
+
+        Args:
+            table_name: Name of the table to upsert into
+            data: Dictionary or list of dictionaries containing the rows
+            on_conflict: Comma-separated columns of the unique constraint (default: primary key)
+        """
+        client = await self.get_client()
+        query = client.table(table_name).upsert(data, returning=ReturnMethod.minimal, on_conflict=on_conflict or "")
+        with span("supabase.upsert", table=table_name):
+            response = await query.execute()
+
+        # Check for errors
+        if hasattr(response, "error") and response.error:
+            raise Exception(f"Supabase upsert error: {response.error.message}")
+
+        self._invalidate(table_name)
+
+    async def _insert_chunk(
+        self,
+        table_name: str,
+        index: int,
+        chunk: List[Dict[str, Any]],
+        upsert: bool,
+        on_conflict: Optional[str],
+        return_rows: bool,
+        max_retries: int,
+    ) -> ChunkResult:
+        """Insert one chunk, retrying transient failures with exponential backoff. Never raises."""
+        client = await self.get_client()
+        returning = ReturnMethod.representation if return_rows else ReturnMethod.minimal
+        result = ChunkResult(index=index, rows=len(chunk))
+        for attempt in range(max_retries + 1):
+            result.attempts = attempt + 1
+            try:
+                table = client.table(table_name)
+                if upsert:
+                    query = table.upsert(chunk, returning=returning, on_conflict=on_conflict or "")
+                else:
+                    query = table.insert(chunk, returning=returning)
+                with span("supabase.insert", table=table_name, rows=len(chunk)):
+                    response = await query.execute()
+                result.data = response.data if return_rows else None
+                result.error = None
+                return result
+            except Exception as e:
+                result.error = str(e)
+                if attempt == max_retries or not is_retryable(e, idempotent=upsert):
+                    return result
+                await asyncio.sleep(BULK_RETRY_BACKOFF * 2 ** attempt)
+        return result
+
+    async def bulk_insert(
+        self,
+        table_name: str,
+        rows: Union[Iterable[Dict[str, Any]], AsyncIterable[Dict[str, Any]]],
+        chunk_size: int = BULK_CHUNK_SIZE,
+        concurrency: int = BULK_CONCURRENCY,
+        upsert: bool = False,
+        on_conflict: Optional[str] = None,
+        return_rows: bool = False,
+        max_retries: int = 3,
+    ) -> BulkInsertResult:
+        """
+        Insert or upsert a large number of rows in chunks, several chunks at a time.
+
+        Same behaviour as SupabaseController.bulk_insert, and also accepts an async
+        iterable of rows.
+
+        Args:
+            table_name: Name of the table to insert into
+            rows: Iterable, generator or async iterable of row dictionaries
+            chunk_size: Number of rows per request
+            concurrency: Maximum number of chunk requests in flight
+            upsert: Upsert instead of insert
+            on_conflict: Comma-separated columns of the unique constraint used by upsert
+            return_rows: Keep the inserted rows in each ChunkResult (costs memory)
+            max_retries: Retries per failed chunk. Inserts are only retried when the chunk was
+                not written; use upsert=True to also retry timeouts and 5xx responses
+
+        Returns:
+            BulkInsertResult with one ChunkResult per chunk, in input order
+        """
+        results = []
+        in_flight = set()
+        try:
+            index = 0
+            async for chunk in aiter_chunks(rows, chunk_size):
+                if len(in_flight) >= concurrency:
+                    done, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                    results.extend(task.result() for task in done)
+                in_flight.add(asyncio.create_task(self._insert_chunk(
+                    table_name, index, chunk, upsert, on_conflict, return_rows, max_retries
+                )))
+                index += 1
+            if in_flight:
+                results.extend(await asyncio.gather(*in_flight))
+        finally:
+            for task in in_flight:
+                task.cancel()
+
+        self._invalidate(table_name)
+
+        return BulkInsertResult(chunks=sorted(results, key=lambda result: result.index))
+
+    async def update(
+        self, table_name: str, data: Dict[str, Any], filters: Filters
+    ) -> Dict[str, Any]:
+        """
+        Update rows in a table that match the given filters.
+
+        Args:
+            table_name: Name of the table to update
+            data: Dictionary containing the columns and values to update
+            filters: Dictionary of column-value pairs, Predicate, or a list of both selecting the rows to update
+
+        Returns:
+            Dictionary containing the updated data
+        """
+        client = await self.get_client()
+        query = client.table(table_name).update(data)
+
+        # Apply filters
+        query = apply_filters(query, filters)
+
+        with span("supabase.update", table=table_name):
+            response = await query.execute()
+
+        # Check for errors
+        if hasattr(response, "error") and response.error:
+            raise Exception(f"Supabase update error: {response.error.message}")
+
+        self._invalidate(table_name)
+
+        return response.data
+
+    async def delete(self, table_name: str, filters: Filters) -> Dict[str, Any]:
+        """
+        Delete rows from a table that match the given filters.
+
+        Args:
+            table_name: Name of the table to delete from
+            filters: Dictionary of column-value pairs, Predicate, or a list of both selecting the rows to delete
+
+        Returns:
+            Dictionary containing the deleted data
+        """
+        client = await self.get_client()
+        query = client.table(table_name).delete()
+
+        # Apply filters
+        query = apply_filters(query, filters)
+
+        with span("supabase.delete", table=table_name):
+            response = await query.execute()
+
+        # Check for errors
+        if hasattr(response, "error") and response.error:
+            raise Exception(f"Supabase delete error: {response.error.message}")
+
+        self._invalidate(table_name)
+
+        return response.data
+
+    async def execute_rpc(
+        self, function_name: str, params: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Execute a stored procedure (RPC function) in the Supabase database.
+
+        Args:
+            function_name: Name of the function to execute
+            params: Dictionary of parameters to pass to the function
+
+        Returns:
+            Dictionary containing the result of the function call
+        """
+        client = await self.get_client()
+        with span("supabase.rpc", function=function_name):
+            response = await client.rpc(function_name, params or {}).execute()
+
+        # Check for errors
+        if hasattr(response, "error") and response.error:
+            raise Exception(f"Supabase RPC error: {response.error.message}")
+
+        return response.data
+
+    async def raw_query(
+        self, query: str, params: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Execute a raw SQL query.
+        Note: This requires the service role key and proper permissions.
+
+        Args:
+            query: SQL query string
+            params: Dictionary of parameters to pass to the query
+
+        Returns:
+            Dictionary containing the query results
+        """
+        client = await self.get_client()
+        # This requires the service role key
+        with span("supabase.rpc", function="exec_sql"):
+            response = await client.rpc(
+                "exec_sql", {"query": query, "params": params or {}}
+            ).execute()
+
+        # Check for errors
+        if hasattr(response, "error") and response.error:
+            raise Exception(f"Supabase raw query error: {response.error.message}")
+
+        return response.data
+
+    async def refresh_schema(self) -> None:
+        """
+        Reload the shared schema catalog from the database and update its snapshot file.
+        Concurrent refreshes in this process share a single query.
+        """
+        async def load():
+            schema_catalog.load_rows(await self.raw_query(CATALOG_QUERY))
+            schema_catalog.write_snapshot()
+
+        await _schema_flight.do("catalog", load)
+
+    async def _ensure_schema(self, table_name: Optional[str] = None) -> None:
+        if not schema_catalog.needs_refresh(table_name):
+            return
+        # Another worker may have refreshed the snapshot file already
+        if schema_catalog.read_snapshot() and not schema_catalog.needs_refresh(table_name):
+            return
+        if schema_catalog.is_fresh():
+            schema_catalog.mark_miss_refresh()
+        await self.refresh_schema()
+
+    async def get_table_schema(self, table_name: str, refresh: bool = False) -> List[Dict[str, Any]]:
+        """
+        Get the schema information for a specific table from the schema catalog.
+
+        Args:
+            table_name: Name of the table to get schema for
+            refresh: Reload the catalog from the database first
+
+        Returns:
+            List of column_name, data_type and is_nullable dictionaries in ordinal
+            order, or an empty list if the table does not exist
+        """
+        if refresh:
+            await self.refresh_schema()
+        else:
+            await self._ensure_schema(table_name)
+        return schema_catalog.columns(table_name)
+
+    async def list_tables(self, refresh: bool = False) -> List[str]:
+        """
+        Get a list of all tables in the public schema from the schema catalog.
+
+        Args:
+            refresh: Reload the catalog from the database first
+
+        Returns:
+            List of table names
+        """
+        if refresh:
+            await self.refresh_schema()
+        else:
+            await self._ensure_schema()
+        return schema_catalog.tables()
+
+    async def get_storage_url(self, bucket: str, path: str) -> str:
+        """
+        Get a public URL for a file in Supabase Storage.
+
+        Args:
+            bucket: Storage bucket name
+            path: Path to the file within the bucket
+
+        Returns:
+            Public URL for the file
+        """
+        # The public URL is a pure function of bucket and path, no need to rebuild it
+        url = self.url_cache.get_public(bucket, path)
+        if url is MISSING:
+            client = await self.get_client()
+            url = await client.storage.from_(bucket).get_public_url(path)
+            self.url_cache.set_public(bucket, path, url)
+        return url
+
+    async def upload_file(
+        self,
+        bucket: str,
+        path: str,
+        file_data: bytes,
+        content_type: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Upload a file to Supabase Storage.
+
+        Args:
+            bucket: Storage bucket name
+            path: Path where the file should be stored
+            file_data: Binary data of the file
+            content_type: MIME type of the file
+
+        Returns:
+            Dictionary containing the upload result
+        """
+        options = {}
+        if content_type:
+            options["content_type"] = content_type
+
+        client = await self.get_client()
+        response = await client.storage.from_(bucket).upload(path, file_data, options)
+
+        # Check for errors
+        if hasattr(response, "error") and response.error:
+            raise Exception(f"Supabase storage upload error: {response.error.message}")
+
+        return response
+
+    async def download_file(self, bucket: str, path: str) -> bytes:
+        """
+        Download a file from Supabase Storage.
+
+        Args:
+            bucket: Storage bucket name
+            path: Path to the file within the bucket
+
+        Returns:
+            Binary data of the file
+        """
+        client = await self.get_client()
+        response = await client.storage.from_(bucket).download(path)
+
+        # Check for errors
+        if hasattr(response, "error") and response.error:
+            raise Exception(
+                f"Supabase storage download error: {response.error.message}"
+            )
+
+        return response
+
+    async def get_signed_url(
+        self, bucket: str, path: str, expires_in: int = 3600
+    ) -> Dict[str, Any]:
+        """
+        Generate a signed URL for temporary access to a file in Supabase Storage.
+
+        Args:
+            bucket: Storage bucket name
+            path: Path to the file within the bucket
+            expires_in: Expiration time in seconds (default: 1 hour)
+
+        Returns:
+            Dictionary containing the signed URL information. A URL signed earlier
+            with the same expires_in is reused while enough of its lifetime is left.
+        """
+        cached = self.url_cache.get_signed(bucket, path, expires_in)
+        if cached is not MISSING:
+            return dict(cached)
+
+        client = await self.get_client()
+        response = await client.storage.from_(bucket).create_signed_url(path, expires_in)
+
+        # Check for errors
+        if hasattr(response, "error") and response.error:
+            raise Exception(
+                f"Supabase signed URL generation error: {response.error.message}"
+            )
+
+        self.url_cache.set_signed(bucket, path, expires_in, dict(response))
+        return response
+
+    async def get_signed_urls(
+        self, bucket: str, paths: Iterable[str], expires_in: int = 3600
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Generate signed URLs for many files, signing every uncached path in one request.
+
+        Args:
+            bucket: Storage bucket name
+            paths: Paths to the files within the bucket
+            expires_in: Expiration time in seconds (default: 1 hour)
+
+        Returns:
+            Dictionary mapping each path to its signed URL information, shaped like
+            the result of get_signed_url. Paths that could not be signed map to
+            {"error": message} instead.
+        """
+        results, missing = self.url_cache.get_signed_many(bucket, paths, expires_in)
+        if missing:
+            client = await self.get_client()
+            response = await client.storage.from_(bucket).create_signed_urls(missing, expires_in)
+            results.update(self.url_cache.set_signed_many(bucket, expires_in, response))
+        return results
+
+    async def delete_file(self, bucket: str, path: str) -> Dict[str, Any]:
+        """
+        Delete a file from Supabase Storage.
+
+        Args:
+            bucket: Storage bucket name
+            path: Path to the file within the bucket
+
+        Returns:
+            Dictionary containing the deletion result
+        """
+        client = await self.get_client()
+        response = await client.storage.from_(bucket).remove([path])
+        self.url_cache.forget(bucket, path)
+
+        # Check for errors
+        if hasattr(response, "error") and response.error:
+            raise Exception(f"Supabase storage delete error: {response.error.message}")
+
+        return response
+
+    async def storage_stream(self) -> AsyncStorageStream:
+        """Streaming storage client on the shared connection pool"""
+        await self.get_client()
+        return AsyncStorageStream(self.supabase_url, self.supabase_key, AsyncSupabaseController._http_client)
+
+    async def open_download(
+        self,
+        bucket: str,
+        path: str,
+        range_header: Optional[str] = None,
+        chunk_size: int = STORAGE_DOWNLOAD_CHUNK_SIZE,
+    ) -> StorageDownload:
+        """
+        Open a streaming download of a file in Supabase Storage.
+
+        Only one chunk is held in memory at a time. Pass the client's Range header
+        through to serve partial content (206) for seeking and resumed downloads:
+
+            download = await controller.open_download(bucket, path, request.headers.get("range"))
+            return StreamingResponse(download.chunks, status_code=download.status_code, headers=download.headers)
+
+        Args:
+            bucket: Storage bucket name
+            path: Path to the file within the bucket
+            range_header: Optional HTTP Range header value, e.g. "bytes=0-1023"
+            chunk_size: Size of the yielded chunks in bytes
+
+        Returns:
+            StorageDownload with the status code, headers to forward, and an async chunk iterator
+        """
+        stream = await self.storage_stream()
+        return await stream.open_download(bucket, path, range_header=range_header, chunk_size=chunk_size)
+
+    async def upload_stream(
+        self,
+        bucket: str,
+        path: str,
+        data: Union[BinaryIO, Iterable[bytes], AsyncIterable[bytes]],
+        content_type: Optional[str] = None,
+        content_length: Optional[int] = None,
+        upsert: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        Upload a file to Supabase Storage from a file-like object, an iterable or an async iterable of chunks.
+
+        Args:
+            bucket: Storage bucket name
+            path: Path where the file should be stored
+            data: File-like object opened in binary mode, iterable of bytes, or async iterable of bytes
+            content_type: MIME type of the file
+            content_length: Size in bytes, if known (otherwise chunked transfer encoding is used)
+            upsert: Overwrite an existing file
+
+        Returns:
+            Dictionary containing the upload result
+        """
+        stream = await self.storage_stream()
+        return await stream.upload(
+            bucket, path, data, content_type=content_type, content_length=content_length, upsert=upsert
+        )
+
+    async def upload_resumable(
+        self,
+        bucket: str,
+        path: str,
+        data: Union[BinaryIO, Iterable[bytes], AsyncIterable[bytes]],
+        size: int,
+        content_type: Optional[str] = None,
+        upsert: bool = False,
+        upload_url: Optional[str] = None,
+    ) -> str:
+        """
+        Upload a large file with the resumable (TUS) protocol, 6 MB at a time.
+
+        Failed chunks are retried from the offset the server reports. To resume an
+        interrupted upload, pass the upload_url returned by the first attempt; sources
+        are then advanced past the bytes the server already has.
+
+        Args:
+            bucket: Storage bucket name
+            path: Path where the file should be stored
+            data: File-like object opened in binary mode, iterable of bytes, or async iterable of bytes
+            size: Total size of the file in bytes
+            content_type: MIME type of the file
+            upsert: Overwrite an existing file
+            upload_url: URL of an earlier, interrupted upload to resume
+
+        Returns:
+            The upload URL, which can be used to resume the upload
+        """
+        stream = await self.storage_stream()
+        offset = 0
+        if upload_url is None:
+            upload_url = await stream.create_resumable_upload(
+                bucket, path, size, content_type=content_type, upsert=upsert
+            )
+        else:
+            offset = await stream.resumable_offset(upload_url)
+
+        if hasattr(data, "read"):
+            # File reads run on a worker thread, off the event loop
+            if offset and not hasattr(data, "seek"):
+                chunks = aread_chunks(askip_bytes(aiter_file(data), offset), STORAGE_RESUMABLE_CHUNK_SIZE)
+            else:
+                if offset:
+                    data.seek(offset)
+                chunks = aiter_file(data, STORAGE_RESUMABLE_CHUNK_SIZE)
+        elif hasattr(data, "__aiter__"):
+            source = askip_bytes(data, offset) if offset else data
+            chunks = aread_chunks(source, STORAGE_RESUMABLE_CHUNK_SIZE)
+        else:
+            source = skip_bytes(data, offset) if offset else data
+            chunks = read_chunks(source, STORAGE_RESUMABLE_CHUNK_SIZE)
+
+        await stream.upload_resumable(upload_url, chunks, offset=offset)
+        return upload_url
+
+    async def upload_file_mmap(
+        self,
+        bucket: str,
+        path: str,
+        local_path: str,
+        content_type: Optional[str] = None,
+        upsert: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        Upload a local file by memory-mapping it instead of reading it into memory.
+
+        Chunks are paged in on a worker thread so disk reads do not block the event loop.
+        Files of STORAGE_RESUMABLE_THRESHOLD bytes or more use the resumable protocol.
+
+        Args:
+            bucket: Storage bucket name
+            path: Path where the file should be stored
+            local_path: Path of the local file to upload
+            content_type: MIME type of the file
+            upsert: Overwrite an existing file
+
+        Returns:
+            Dictionary containing the upload result
+        """
+        size = os.path.getsize(local_path)
+        if size == 0:
+            return await self.upload_stream(
+                bucket, path, [b""], content_type=content_type, content_length=0, upsert=upsert
+            )
+
+        stream = await self.storage_stream()
+        with open(local_path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            if size >= STORAGE_RESUMABLE_THRESHOLD:
+                upload_url = await stream.create_resumable_upload(
+                    bucket, path, size, content_type=content_type, upsert=upsert
+                )
+                await stream.upload_resumable(upload_url, aiter_mmap(mapped, chunk_size=STORAGE_RESUMABLE_CHUNK_SIZE))
+                return {"path": path, "upload_url": upload_url, "size": size}
+
+            return await stream.upload(
+                bucket,
+                path,
+                aiter_mmap(mapped, chunk_size=STORAGE_UPLOAD_CHUNK_SIZE),
+                content_type=content_type,
+                content_length=size,
+                upsert=upsert,
+            )
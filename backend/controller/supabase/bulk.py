@@ -0,0 +1,101 @@
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Any, AsyncIterable, AsyncIterator, Dict, Iterable, Iterator, List, Optional, Union
+
+import httpx
+from postgrest.exceptions import APIError
+
+# Default size of each insert request, in rows
+BULK_CHUNK_SIZE = 500
+# Default number of chunk requests in flight at once
+BULK_CONCURRENCY = 4
+# Base delay in seconds between retries of a failed chunk, doubled per attempt
+BULK_RETRY_BACKOFF = 0.5
+
+# Raised before the request was sent
+_NOT_SENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+# PostgREST codes for failures that wrote nothing: no database connection (PGRST000-003),
+# and SQLSTATE classes for rolled back transactions, exhausted resources and cancelled statements
+_TRANSIENT_CODES = ("PGRST000", "PGRST001", "PGRST002", "PGRST003", "08", "40", "53", "57014")
+
+
+@dataclass
+class ChunkResult:
+    """Outcome of one chunk of a bulk insert"""
+    index: int
+    rows: int
+    attempts: int = 0
+    data: Optional[List[Dict[str, Any]]] = None
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+@dataclass
+class BulkInsertResult:
+    """Outcome of a bulk insert, with one ChunkResult per chunk in input order"""
+    chunks: List[ChunkResult] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return all(chunk.ok for chunk in self.chunks)
+
+    @property
+    def rows_written(self) -> int:
+        return sum(chunk.rows for chunk in self.chunks if chunk.ok)
+
+    @property
+    def errors(self) -> List[ChunkResult]:
+        return [chunk for chunk in self.chunks if not chunk.ok]
+
+
+def is_retryable(error: Exception, idempotent: bool) -> bool:
+    """
+    Whether a failed chunk should be sent again.
+
+    Errors the database reports for the rows themselves (constraint violations,
+    unknown columns, bad types) fail the same way every time and are not retried.
+    A plain insert is only retried when the chunk cannot have been written; a
+    timed out or dropped request may have committed, and sending it again would
+    insert the rows twice. Upserts are idempotent, so those are retried as well.
+    """
+    if isinstance(error, _NOT_SENT_ERRORS):
+        return True
+    if isinstance(error, APIError):
+        code = error.code
+        if isinstance(code, int):
+            # Not a PostgREST error body, so the HTTP status of a gateway or rate limiter
+            return code == 429 or (idempotent and code >= 500)
+        return bool(code) and str(code).startswith(_TRANSIENT_CODES)
+    return idempotent and isinstance(error, httpx.TransportError)
+
+
+def iter_chunks(rows: Iterable[Dict[str, Any]], chunk_size: int) -> Iterator[List[Dict[str, Any]]]:
+    """Lazily split an iterable of rows into lists of at most chunk_size rows"""
+    iterator = iter(rows)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+async def aiter_chunks(
+    rows: Union[Iterable[Dict[str, Any]], AsyncIterable[Dict[str, Any]]], chunk_size: int
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """Lazily split an iterable or async iterable of rows into lists of at most chunk_size rows"""
+    if not hasattr(rows, "__aiter__"):
+        for chunk in iter_chunks(rows, chunk_size):
+            yield chunk
+        return
+
+    chunk = []
+    async for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
@@ -0,0 +1,203 @@
+import abc
+from typing import Any, Dict, Iterable, Optional, Sequence, Union
+
+
+def _format_value(value: Any) -> str:
+    if value is None:
+        return "null"
+    if value is True:
+        return "true"
+    if value is False:
+        return "false"
+    return str(value)
+
+
+def _quote(value: Any) -> str:
+    """Quote a value for use inside an or/and/in expression when it contains reserved characters"""
+    text = _format_value(value)
+    if any(char in text for char in ',.:()"\\'):
+        return '"' + text.replace("\\", "\\\\").replace('"', '\\"') + '"'
+    return text
+
+
+class Predicate(abc.ABC):
+    """
+    A filter that compiles down to PostgREST operators.
+
+    Predicates compose with | (or), & (and) and ~ (not):
+
+        (Col("age").gte(18) & Col("age").lt(65)) | Col("vip").is_(True)
+    """
+    @abc.abstractmethod
+    def apply(self, query):
+        """Apply this predicate to a query builder"""
+
+    @abc.abstractmethod
+    def to_postgrest(self) -> str:
+        """Render this predicate as a PostgREST logical-tree expression"""
+
+    def __or__(self, other: "Predicate") -> "Or":
+        left = self.predicates if isinstance(self, Or) else (self,)
+        right = other.predicates if isinstance(other, Or) else (other,)
+        return Or(*left, *right)
+
+    def __and__(self, other: "Predicate") -> "And":
+        left = self.predicates if isinstance(self, And) else (self,)
+        right = other.predicates if isinstance(other, And) else (other,)
+        return And(*left, *right)
+
+    def __invert__(self) -> "Not":
+        return Not(self)
+
+    def __repr__(self) -> str:
+        return self.to_postgrest()
+
+
+class Condition(Predicate):
+    """A single column comparison, e.g. age=gt.18"""
+    def __init__(self, column: str, operator: str, value: Any):
+        self.column = column
+        self.operator = operator
+        self.value = value
+
+    def criteria(self, nested: bool) -> str:
+        if self.operator == "in":
+            return "(" + ",".join(_quote(value) for value in self.value) + ")"
+        return _quote(self.value) if nested else _format_value(self.value)
+
+    def apply(self, query):
+        return query.filter(self.column, self.operator, self.criteria(nested=False))
+
+    def to_postgrest(self) -> str:
+        return f"{self.column}.{self.operator}.{self.criteria(nested=True)}"
+
+
+class Or(Predicate):
+    """Matches rows that satisfy any of the predicates"""
+    def __init__(self, *predicates: Predicate):
+        self.predicates = predicates
+
+    def apply(self, query):
+        return query.or_(",".join(predicate.to_postgrest() for predicate in self.predicates))
+
+    def to_postgrest(self) -> str:
+        return "or(" + ",".join(predicate.to_postgrest() for predicate in self.predicates) + ")"
+
+
+class And(Predicate):
+    """Matches rows that satisfy all of the predicates"""
+    def __init__(self, *predicates: Predicate):
+        self.predicates = predicates
+
+    def apply(self, query):
+        # Top-level filters are already combined with AND
+        for predicate in self.predicates:
+            query = predicate.apply(query)
+        return query
+
+    def to_postgrest(self) -> str:
+        return "and(" + ",".join(predicate.to_postgrest() for predicate in self.predicates) + ")"
+
+
+class Not(Predicate):
+    """Negates a condition or an or/and group; a negated Not cancels out"""
+    def __init__(self, predicate: Predicate):
+        self.negated = True
+        if isinstance(predicate, Not):
+            # Unwrap so the wrapped predicate is never itself a Not
+            self.negated = not predicate.negated
+            predicate = predicate.predicate
+        self.predicate = predicate
+
+    def apply(self, query):
+        predicate = self.predicate
+        if not self.negated:
+            return predicate.apply(query)
+        if isinstance(predicate, Condition):
+            return query.filter(predicate.column, f"not.{predicate.operator}", predicate.criteria(nested=False))
+        if isinstance(predicate, Or):
+            return query.not_.or_(",".join(item.to_postgrest() for item in predicate.predicates))
+        # not(a and b) == (not a) or (not b)
+        return Or(*(Not(item) for item in predicate.predicates)).apply(query)
+
+    def to_postgrest(self) -> str:
+        predicate = self.predicate
+        if not self.negated:
+            return predicate.to_postgrest()
+        if isinstance(predicate, Condition):
+            return f"{predicate.column}.not.{predicate.operator}.{predicate.criteria(nested=True)}"
+        return f"not.{predicate.to_postgrest()}"
+
+
+class Col:
+    """
+    Builds conditions on a column:
+
+        Col("status").in_(["open", "pending"])
+        Col("email").ilike("%@example.com")
+        Col("deleted_at").is_(None)
+    """
+    def __init__(self, name: str):
+        self.name = name
+
+    def eq(self, value: Any) -> Condition:
+        return Condition(self.name, "eq", value)
+
+    def neq(self, value: Any) -> Condition:
+        return Condition(self.name, "neq", value)
+
+    def gt(self, value: Any) -> Condition:
+        return Condition(self.name, "gt", value)
+
+    def gte(self, value: Any) -> Condition:
+        return Condition(self.name, "gte", value)
+
+    def lt(self, value: Any) -> Condition:
+        return Condition(self.name, "lt", value)
+
+    def lte(self, value: Any) -> Condition:
+        return Condition(self.name, "lte", value)
+
+    def between(self, low: Any, high: Any) -> And:
+        """Inclusive range, low <= column <= high"""
+        return And(self.gte(low), self.lte(high))
+
+    def like(self, pattern: str) -> Condition:
+        return Condition(self.name, "like", pattern)
+
+    def ilike(self, pattern: str) -> Condition:
+        return Condition(self.name, "ilike", pattern)
+
+    def in_(self, values: Iterable[Any]) -> Condition:
+        return Condition(self.name, "in", list(values))
+
+    def is_(self, value: Optional[bool]) -> Condition:
+        """IS NULL / IS TRUE / IS FALSE"""
+        return Condition(self.name, "is", value)
+
+
+# Filters accepted by the controllers: a dict of column-value equality pairs,
+# a Predicate, or a sequence mixing both (combined with AND)
+Filters = Union[Dict[str, Any], Predicate, Sequence[Union[Dict[str, Any], Predicate]]]
+
+
+def apply_filters(query, filters: Optional[Filters]):
+    """Apply equality dicts and predicates to a query builder"""
+    if not filters:
+        return query
+    if isinstance(filters, Predicate):
+        return filters.apply(query)
+    if isinstance(filters, dict):
+        for column, value in filters.items():
+            query = query.eq(column, value)
+        return query
+    for item in filters:
+        query = apply_filters(query, item)
+    return query
+
+
+def select_columns(columns: Union[str, Sequence[str]]) -> str:
+    """Normalize a column projection given as a string or a list of column names"""
+    if isinstance(columns, str):
+        return columns
+    return ",".join(columns)
@@ -0,0 +1,86 @@
+import json
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from controller.cache import TTLCache, MISSING
+
+
+class SelectCache:
+    """
+    Read-through cache for SupabaseController.select results.
+
+    Entries are keyed on the normalized select arguments plus a per-table
+    generation number. Writing to a table bumps its generation, which makes every
+    cached result for that table unreachable in O(1); the stale entries then age
+    out through TTL and LRU eviction. A select that started before a write stores
+    its result under the old generation, so it can never be served afterwards.
+    """
+    def __init__(
+        self,
+        max_size: int = 1024,
+        default_ttl: float = 30,
+        table_ttls: Optional[Dict[str, float]] = None,
+    ):
+        """
+        Args:
+            max_size: Maximum number of cached results
+            default_ttl: Time to live in seconds for tables without an entry in table_ttls
+            table_ttls: Per-table time to live in seconds; 0 disables caching for that table
+        """
+        self._cache = TTLCache(max_size=max_size, ttl=default_ttl)
+        self.default_ttl = default_ttl
+        self.table_ttls = dict(table_ttls or {})
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.invalidations = 0
+
+    def ttl_for(self, table_name: str) -> float:
+        return self.table_ttls.get(table_name, self.default_ttl)
+
+    def key(
+        self,
+        table_name: str,
+        columns: Any = "*",
+        filters: Optional[Dict[str, Any]] = None,
+        order_by: Optional[Dict[str, str]] = None,
+        limit: Optional[int] = None,
+        **extra: Any,
+    ) -> Tuple[Any, ...]:
+        """Build the cache key for a select call"""
+        arguments = json.dumps(
+            {"columns": columns, "filters": filters, "order_by": order_by, "limit": limit, **extra},
+            sort_keys=True,
+            default=repr,
+        )
+        return (table_name, self._generations.get(table_name, 0), arguments)
+
+    def get(self, key: Tuple[Any, ...]) -> Any:
+        """Get cached rows for a key, or MISSING"""
+        if not self.ttl_for(key[0]):
+            return MISSING
+        rows = self._cache.get(key)
+        if rows is MISSING:
+            return MISSING
+        # Copy the rows so callers cannot mutate the cached result
+        return [dict(row) for row in rows]
+
+    def set(self, key: Tuple[Any, ...], rows: List[Dict[str, Any]]) -> None:
+        ttl = self.ttl_for(key[0])
+        if ttl:
+            self._cache.set(key, [dict(row) for row in rows], ttl=ttl)
+
+    def invalidate(self, table_name: str) -> None:
+        """Drop every cached result for a table"""
+        with self._lock:
+            self._generations[table_name] = self._generations.get(table_name, 0) + 1
+            self.invalidations += 1
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get hit/miss statistics. Every hit is a database round-trip saved."""
+        stats = self._cache.stats()
+        stats["round_trips_saved"] = stats["hits"]
+        stats["invalidations"] = self.invalidations
+        return stats
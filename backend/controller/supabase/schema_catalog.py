@@ -0,0 +1,154 @@
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Seconds before the catalog is reloaded from the database
+SUPABASE_SCHEMA_TTL = float(os.getenv("SUPABASE_SCHEMA_TTL", 600))
+# Minimum seconds between reloads triggered by lookups of unknown tables
+SUPABASE_SCHEMA_MISS_REFRESH = float(os.getenv("SUPABASE_SCHEMA_MISS_REFRESH", 30))
+# Optional JSON file the catalog is written to and read from, shared by all workers
+SUPABASE_SCHEMA_SNAPSHOT = os.getenv("SUPABASE_SCHEMA_SNAPSHOT")
+
+# Every table and view in the public schema with its columns, in one round-trip.
+# The statement is constant, so no caller input is ever interpolated into SQL.
+CATALOG_QUERY = """
+SELECT t.table_name, c.column_name, c.data_type, c.is_nullable
+FROM information_schema.tables t
+LEFT JOIN information_schema.columns c
+    ON c.table_schema = t.table_schema AND c.table_name = t.table_name
+WHERE t.table_schema = 'public'
+ORDER BY t.table_name, c.ordinal_position
+"""
+
+
+class SchemaCatalog:
+    """
+    Process-wide snapshot of the public schema: tables and their columns.
+
+    The catalog is loaded with a single query and reloaded after SUPABASE_SCHEMA_TTL
+    seconds or on refresh. Lookups of a table the catalog does not know trigger a
+    reload at most every SUPABASE_SCHEMA_MISS_REFRESH seconds, so new tables show up
+    without letting typos hammer the database.
+
+    With gunicorn's preload_app the catalog can be loaded in the master (see
+    gunicorn_config.on_starting) and is inherited by every forked worker. Setting
+    SUPABASE_SCHEMA_SNAPSHOT shares it through a JSON file instead, so only one
+    worker per TTL has to query the database.
+    """
+    def __init__(
+        self,
+        ttl: float = SUPABASE_SCHEMA_TTL,
+        snapshot_path: Optional[str] = SUPABASE_SCHEMA_SNAPSHOT,
+    ):
+        self.ttl = ttl
+        self.snapshot_path = snapshot_path
+        self._tables: Optional[Dict[str, List[Dict[str, Any]]]] = None
+        self._loaded_at = 0.0
+        self._last_miss_refresh = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._tables is not None
+
+    def is_fresh(self) -> bool:
+        return self._tables is not None and time.time() - self._loaded_at < self.ttl
+
+    def needs_refresh(self, table_name: Optional[str] = None) -> bool:
+        """Whether a lookup (of table_name, if given) should reload the catalog first"""
+        if not self.is_fresh():
+            return True
+        if table_name is None or table_name in self._tables:
+            return False
+        return time.time() - self._last_miss_refresh >= SUPABASE_SCHEMA_MISS_REFRESH
+
+    def load_rows(self, rows: List[Dict[str, Any]], loaded_at: Optional[float] = None) -> None:
+        """Replace the catalog with the rows of CATALOG_QUERY"""
+        tables: Dict[str, List[Dict[str, Any]]] = {}
+        for row in rows:
+            columns = tables.setdefault(row["table_name"], [])
+            if row.get("column_name") is not None:
+                columns.append({
+                    "column_name": row["column_name"],
+                    "data_type": row["data_type"],
+                    "is_nullable": row["is_nullable"],
+                })
+        with self._lock:
+            self._tables = tables
+            self._loaded_at = loaded_at if loaded_at is not None else time.time()
+
+    def mark_miss_refresh(self) -> None:
+        self._last_miss_refresh = time.time()
+
+    def read_snapshot(self) -> bool:
+        """Load the catalog from the snapshot file if it exists and is within the TTL"""
+        if not self.snapshot_path:
+            return False
+        try:
+            with open(self.snapshot_path) as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if time.time() - snapshot.get("loaded_at", 0) >= self.ttl:
+            return False
+        if self._tables is not None and snapshot["loaded_at"] <= self._loaded_at:
+            return False
+        with self._lock:
+            self._tables = snapshot["tables"]
+            self._loaded_at = snapshot["loaded_at"]
+        return True
+
+    def write_snapshot(self) -> None:
+        """Atomically write the catalog to the snapshot file"""
+        if not self.snapshot_path or self._tables is None:
+            return
+        directory = os.path.dirname(os.path.abspath(self.snapshot_path))
+        os.makedirs(directory, exist_ok=True)
+        temp_path = f"{self.snapshot_path}.{os.getpid()}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump({"loaded_at": self._loaded_at, "tables": self._tables}, f)
+        os.replace(temp_path, self.snapshot_path)
+
+    def invalidate(self) -> None:
+        """Force the next lookup to reload the catalog"""
+        with self._lock:
+            self._loaded_at = 0.0
+
+    def tables(self) -> List[str]:
+        return sorted(self._tables or {})
+
+    def columns(self, table_name: str) -> List[Dict[str, Any]]:
+        """Columns of a table in ordinal order, or an empty list for unknown tables"""
+        return [dict(column) for column in (self._tables or {}).get(table_name, [])]
+
+    def column_names(self, table_name: str) -> List[str]:
+        return [column["column_name"] for column in (self._tables or {}).get(table_name, [])]
+
+    def has_table(self, table_name: str) -> bool:
+        return table_name in (self._tables or {})
+
+    def has_column(self, table_name: str, column_name: str) -> bool:
+        return column_name in self.column_names(table_name)
+
+
+# Shared by every controller in the process
+schema_catalog = SchemaCatalog()
+
+
+def preload_schema_catalog() -> None:
+    """
+    Load the schema catalog before gunicorn forks its workers.
+
+    Called from gunicorn_config.on_starting when SUPABASE_SCHEMA_PRELOAD is set;
+    every worker then starts with the catalog already in memory.
+    """
+    from .supabase_utils import SupabaseController
+
+    SupabaseController().refresh_schema()
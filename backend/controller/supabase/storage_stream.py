@@ -0,0 +1,336 @@
+import asyncio
+import base64
+import mmap
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterable, AsyncIterator, BinaryIO, Dict, Iterable, Iterator, Optional, Union
+from urllib.parse import quote
+
+import httpx
+
+# Size of the chunks yielded by streaming downloads
+STORAGE_DOWNLOAD_CHUNK_SIZE = 64 * 1024
+# Size of the chunks read from files for streaming uploads
+STORAGE_UPLOAD_CHUNK_SIZE = 1024 * 1024
+# Supabase's resumable (TUS) endpoint requires 6 MB chunks
+STORAGE_RESUMABLE_CHUNK_SIZE = 6 * 1024 * 1024
+# Files at least this large are uploaded with the resumable protocol by upload_file_mmap
+STORAGE_RESUMABLE_THRESHOLD = int(os.getenv("STORAGE_RESUMABLE_THRESHOLD", 50 * 1024 * 1024))
+# Downloads ask Storage for the bytes as stored: httpx would otherwise request gzip and
+# decode it, so the body would no longer match the forwarded content-length/content-range
+IDENTITY_ENCODING = {"Accept-Encoding": "identity"}
+# Response headers forwarded from Storage to the client of a download
+FORWARDED_HEADERS = ("content-type", "content-length", "content-range", "accept-ranges", "etag", "last-modified", "cache-control")
+
+
+@dataclass
+class StorageDownload:
+    """
+    An open streaming download. Use it as the body of a FastAPI StreamingResponse:
+
+        download = await controller.open_download(bucket, path, range_header=request.headers.get("range"))
+        return StreamingResponse(download.chunks, status_code=download.status_code, headers=download.headers)
+
+    The underlying HTTP response is closed once the chunks are exhausted.
+    """
+    status_code: int
+    headers: Dict[str, str]
+    chunks: Union[Iterator[bytes], AsyncIterator[bytes]] = field(repr=False)
+
+
+def _object_url(supabase_url: str, bucket: str, path: str) -> str:
+    return f"{supabase_url.rstrip('/')}/storage/v1/object/{quote(bucket)}/{quote(path.lstrip('/'))}"
+
+
+def _resumable_url(supabase_url: str) -> str:
+    return f"{supabase_url.rstrip('/')}/storage/v1/upload/resumable"
+
+
+def _auth_headers(supabase_key: str) -> Dict[str, str]:
+    return {"Authorization": f"Bearer {supabase_key}", "apikey": supabase_key}
+
+
+def _tus_metadata(bucket: str, path: str, content_type: Optional[str]) -> str:
+    items = {"bucketName": bucket, "objectName": path, "contentType": content_type or "application/octet-stream"}
+    return ",".join(f"{key} {base64.b64encode(value.encode()).decode()}" for key, value in items.items())
+
+
+def _forwarded(headers: httpx.Headers) -> Dict[str, str]:
+    return {name: headers[name] for name in FORWARDED_HEADERS if name in headers}
+
+
+def _raise_for_status(response: httpx.Response, what: str) -> None:
+    if response.status_code >= 400:
+        raise Exception(f"Supabase storage {what} error: {response.status_code} {response.text}")
+
+
+def iter_file(fileobj: BinaryIO, chunk_size: int = STORAGE_UPLOAD_CHUNK_SIZE) -> Iterator[bytes]:
+    """Read a file-like object in chunks"""
+    while True:
+        chunk = fileobj.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+
+async def aiter_file(fileobj: BinaryIO, chunk_size: int = STORAGE_UPLOAD_CHUNK_SIZE) -> AsyncIterator[bytes]:
+    """Like iter_file, but reads each chunk on a worker thread"""
+    while True:
+        chunk = await asyncio.to_thread(fileobj.read, chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+
+def iter_mmap(mapped: mmap.mmap, start: int = 0, chunk_size: int = STORAGE_UPLOAD_CHUNK_SIZE) -> Iterator[bytes]:
+    """Slice a memory-mapped file into chunks; only the current chunk is copied into memory"""
+    for offset in range(start, len(mapped), chunk_size):
+        yield mapped[offset:offset + chunk_size]
+
+
+async def aiter_mmap(mapped: mmap.mmap, start: int = 0, chunk_size: int = STORAGE_UPLOAD_CHUNK_SIZE) -> AsyncIterator[bytes]:
+    """Like iter_mmap, but pages each chunk in from disk on a worker thread"""
+    for offset in range(start, len(mapped), chunk_size):
+        yield await asyncio.to_thread(mapped.__getitem__, slice(offset, offset + chunk_size))
+
+
+class StorageStream:
+    """Streaming Supabase Storage transfers over a synchronous httpx client"""
+
+    def __init__(self, supabase_url: str, supabase_key: str, http_client: Optional[httpx.Client] = None):
+        self.supabase_url = supabase_url
+        self.headers = _auth_headers(supabase_key)
+        self.http_client = http_client or httpx.Client(timeout=httpx.Timeout(60.0, connect=10.0))
+
+    def open_download(self, bucket: str, path: str, range_header: Optional[str] = None,
+                      chunk_size: int = STORAGE_DOWNLOAD_CHUNK_SIZE) -> StorageDownload:
+        headers = {**self.headers, **IDENTITY_ENCODING}
+        if range_header:
+            headers["Range"] = range_header
+
+        request = self.http_client.build_request("GET", _object_url(self.supabase_url, bucket, path), headers=headers)
+        response = self.http_client.send(request, stream=True)
+        if response.status_code >= 400:
+            response.read()
+            response.close()
+            _raise_for_status(response, "download")
+
+        def chunks() -> Iterator[bytes]:
+            try:
+                yield from response.iter_bytes(chunk_size)
+            finally:
+                response.close()
+
+        return StorageDownload(response.status_code, _forwarded(response.headers), chunks())
+
+    def upload(self, bucket: str, path: str, data: Union[BinaryIO, Iterable[bytes]],
+               content_type: Optional[str] = None, content_length: Optional[int] = None,
+               upsert: bool = False) -> Dict[str, Any]:
+        headers = dict(self.headers)
+        headers["Content-Type"] = content_type or "application/octet-stream"
+        headers["x-upsert"] = "true" if upsert else "false"
+        if content_length is not None:
+            headers["Content-Length"] = str(content_length)
+
+        content = iter_file(data) if hasattr(data, "read") else data
+        response = self.http_client.post(_object_url(self.supabase_url, bucket, path), content=content, headers=headers)
+        _raise_for_status(response, "upload")
+        return response.json()
+
+    def create_resumable_upload(self, bucket: str, path: str, size: int,
+                                content_type: Optional[str] = None, upsert: bool = False) -> str:
+        headers = dict(self.headers)
+        headers.update({
+            "Tus-Resumable": "1.0.0",
+            "Upload-Length": str(size),
+            "Upload-Metadata": _tus_metadata(bucket, path, content_type),
+            "x-upsert": "true" if upsert else "false",
+        })
+        response = self.http_client.post(_resumable_url(self.supabase_url), headers=headers)
+        _raise_for_status(response, "resumable upload")
+        return response.headers["Location"]
+
+    def resumable_offset(self, upload_url: str) -> int:
+        headers = dict(self.headers)
+        headers["Tus-Resumable"] = "1.0.0"
+        response = self.http_client.head(upload_url, headers=headers)
+        _raise_for_status(response, "resumable upload")
+        return int(response.headers["Upload-Offset"])
+
+    def upload_resumable(self, upload_url: str, chunks: Iterator[bytes], offset: int = 0, max_retries: int = 3) -> int:
+        """Send chunks to an open TUS upload starting at offset. Returns the final offset."""
+        for chunk in chunks:
+            for attempt in range(max_retries + 1):
+                headers = dict(self.headers)
+                headers.update({
+                    "Tus-Resumable": "1.0.0",
+                    "Upload-Offset": str(offset),
+                    "Content-Type": "application/offset+octet-stream",
+                })
+                try:
+                    response = self.http_client.patch(upload_url, content=chunk, headers=headers)
+                    _raise_for_status(response, "resumable upload")
+                    offset = int(response.headers["Upload-Offset"])
+                    break
+                except Exception:
+                    if attempt == max_retries:
+                        raise
+                    time.sleep(2 ** attempt)
+                    # The server may have stored part of the chunk; resume from its offset
+                    server_offset = self.resumable_offset(upload_url)
+                    chunk = chunk[server_offset - offset:]
+                    offset = server_offset
+        return offset
+
+    def close(self) -> None:
+        self.http_client.close()
+
+
+class AsyncStorageStream:
+    """Streaming Supabase Storage transfers over an async httpx client"""
+
+    def __init__(self, supabase_url: str, supabase_key: str, http_client: httpx.AsyncClient):
+        self.supabase_url = supabase_url
+        self.headers = _auth_headers(supabase_key)
+        self.http_client = http_client
+
+    async def open_download(self, bucket: str, path: str, range_header: Optional[str] = None,
+                            chunk_size: int = STORAGE_DOWNLOAD_CHUNK_SIZE) -> StorageDownload:
+        headers = {**self.headers, **IDENTITY_ENCODING}
+        if range_header:
+            headers["Range"] = range_header
+
+        request = self.http_client.build_request("GET", _object_url(self.supabase_url, bucket, path), headers=headers)
+        response = await self.http_client.send(request, stream=True)
+        if response.status_code >= 400:
+            await response.aread()
+            await response.aclose()
+            _raise_for_status(response, "download")
+
+        async def chunks() -> AsyncIterator[bytes]:
+            try:
+                async for chunk in response.aiter_bytes(chunk_size):
+                    yield chunk
+            finally:
+                await response.aclose()
+
+        return StorageDownload(response.status_code, _forwarded(response.headers), chunks())
+
+    async def upload(self, bucket: str, path: str, data: Union[BinaryIO, Iterable[bytes], AsyncIterable[bytes]],
+                     content_type: Optional[str] = None, content_length: Optional[int] = None,
+                     upsert: bool = False) -> Dict[str, Any]:
+        headers = dict(self.headers)
+        headers["Content-Type"] = content_type or "application/octet-stream"
+        headers["x-upsert"] = "true" if upsert else "false"
+        if content_length is not None:
+            headers["Content-Length"] = str(content_length)
+
+        if hasattr(data, "read"):
+            content = aiter_file(data)
+        elif hasattr(data, "__aiter__"):
+            content = data
+        else:
+            content = _aiter_sync(iter(data))
+        response = await self.http_client.post(_object_url(self.supabase_url, bucket, path), content=content, headers=headers)
+        _raise_for_status(response, "upload")
+        return response.json()
+
+    async def create_resumable_upload(self, bucket: str, path: str, size: int,
+                                      content_type: Optional[str] = None, upsert: bool = False) -> str:
+        headers = dict(self.headers)
+        headers.update({
+            "Tus-Resumable": "1.0.0",
+            "Upload-Length": str(size),
+            "Upload-Metadata": _tus_metadata(bucket, path, content_type),
+            "x-upsert": "true" if upsert else "false",
+        })
+        response = await self.http_client.post(_resumable_url(self.supabase_url), headers=headers)
+        _raise_for_status(response, "resumable upload")
+        return response.headers["Location"]
+
+    async def resumable_offset(self, upload_url: str) -> int:
+        headers = dict(self.headers)
+        headers["Tus-Resumable"] = "1.0.0"
+        response = await self.http_client.head(upload_url, headers=headers)
+        _raise_for_status(response, "resumable upload")
+        return int(response.headers["Upload-Offset"])
+
+    async def upload_resumable(self, upload_url: str, chunks: Union[Iterable[bytes], AsyncIterable[bytes]],
+                               offset: int = 0, max_retries: int = 3) -> int:
+        """Send chunks to an open TUS upload starting at offset. Returns the final offset."""
+        source = chunks if hasattr(chunks, "__aiter__") else _aiter_sync(iter(chunks))
+        async for chunk in source:
+            for attempt in range(max_retries + 1):
+                headers = dict(self.headers)
+                headers.update({
+                    "Tus-Resumable": "1.0.0",
+                    "Upload-Offset": str(offset),
+                    "Content-Type": "application/offset+octet-stream",
+                })
+                try:
+                    response = await self.http_client.patch(upload_url, content=chunk, headers=headers)
+                    _raise_for_status(response, "resumable upload")
+                    offset = int(response.headers["Upload-Offset"])
+                    break
+                except Exception:
+                    if attempt == max_retries:
+                        raise
+                    await asyncio.sleep(2 ** attempt)
+                    # The server may have stored part of the chunk; resume from its offset
+                    server_offset = await self.resumable_offset(upload_url)
+                    chunk = chunk[server_offset - offset:]
+                    offset = server_offset
+        return offset
+
+
+async def _aiter_sync(iterator: Iterator[bytes]) -> AsyncIterator[bytes]:
+    for chunk in iterator:
+        yield chunk
+
+
+def read_chunks(source: Union[BinaryIO, Iterable[bytes]], chunk_size: int) -> Iterator[bytes]:
+    """Re-chunk a file-like object or an iterable of bytes into exactly chunk_size pieces (the last may be shorter)"""
+    if hasattr(source, "read"):
+        yield from iter_file(source, chunk_size)
+        return
+    buffer = bytearray()
+    for piece in source:
+        buffer += piece
+        while len(buffer) >= chunk_size:
+            yield bytes(buffer[:chunk_size])
+            del buffer[:chunk_size]
+    if buffer:
+        yield bytes(buffer)
+
+
+def skip_bytes(chunks: Iterable[bytes], count: int) -> Iterator[bytes]:
+    """Drop the first count bytes of a chunk stream, e.g. the part of a resumed upload the server already has"""
+    for chunk in chunks:
+        if count >= len(chunk):
+            count -= len(chunk)
+            continue
+        yield chunk[count:]
+        count = 0
+
+
+async def askip_bytes(chunks: AsyncIterable[bytes], count: int) -> AsyncIterator[bytes]:
+    """Async version of skip_bytes"""
+    async for chunk in chunks:
+        if count >= len(chunk):
+            count -= len(chunk)
+            continue
+        yield chunk[count:]
+        count = 0
+
+
+async def aread_chunks(source: AsyncIterable[bytes], chunk_size: int) -> AsyncIterator[bytes]:
+    """Re-chunk an async iterable of bytes into exactly chunk_size pieces (the last may be shorter)"""
+    buffer = bytearray()
+    async for piece in source:
+        buffer += piece
+        while len(buffer) >= chunk_size:
+            yield bytes(buffer[:chunk_size])
+            del buffer[:chunk_size]
+    if buffer:
+        yield bytes(buffer)
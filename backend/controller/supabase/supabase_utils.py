@@ -1,14 +1,73 @@
 import os
+import contextvars
+import mmap
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from postgrest.types import ReturnMethod
 from supabase import create_client, Client
 from dotenv import load_dotenv
-from typing import Dict, List, Any, Optional, Union
+from typing import Dict, List, Any, Optional, Union, Iterable, Iterator, Sequence, BinaryIO
+from controller.observability import span
+from controller.cache import MISSING, SingleFlight
+from .filters import Filters, apply_filters, select_columns
+from .query_cache import SelectCache
+from .url_cache import StorageURLCache
+from .schema_catalog import schema_catalog, CATALOG_QUERY
+from .storage_stream import (
+    StorageStream,
+    StorageDownload,
+    iter_file,
+    iter_mmap,
+    read_chunks,
+    skip_bytes,
+    STORAGE_DOWNLOAD_CHUNK_SIZE,
+    STORAGE_UPLOAD_CHUNK_SIZE,
+    STORAGE_RESUMABLE_CHUNK_SIZE,
+    STORAGE_RESUMABLE_THRESHOLD,
+)
+from .bulk import (
+    BulkInsertResult,
+    ChunkResult,
+    iter_chunks,
+    BULK_CHUNK_SIZE,
+    BULK_CONCURRENCY,
+    BULK_RETRY_BACKOFF,
+    is_retryable,
+)
 
 # Load environment variables
 load_dotenv()
 
+_schema_flight = SingleFlight()
+
+
+def apply_order(query, order_by: Optional[Dict[str, str]]):
+    """Apply {column: "asc" | "desc"} ordering to a query builder"""
+    if order_by:
+        for column, direction in order_by.items():
+            if direction.lower() == "asc":
+                query = query.order(column)
+            else:
+                query = query.order(column, desc=True)
+    return query
+
 
 class SupabaseController:
-    def __init__(self):
+    def __init__(
+        self,
+        cache: Optional[SelectCache] = None,
+        url_cache: Optional[StorageURLCache] = None,
+    ):
+        """
+        Args:
+            cache: Optional read-through cache for select results. Writes through
+                this controller invalidate the cached results of the written table.
+            url_cache: Cache for public and signed storage URLs. A private one is
+                created when not given; pass a shared instance to reuse URLs across
+                controllers.
+        """
+        self.cache = cache
+        self.url_cache = url_cache if url_cache is not None else StorageURLCache()
         self.supabase_url = os.getenv("SUPABASE_URL")
         self.supabase_key = os.getenv("SUPABASE_SERVICE_KEY")
 
@@ -18,56 +77,137 @@ class SupabaseController:
             )
 
         self.client: Client = create_client(self.supabase_url, self.supabase_key)
+        self._storage_stream: Optional[StorageStream] = None
+
+    def _invalidate(self, table_name: str) -> None:
+        if self.cache is not None:
+            self.cache.invalidate(table_name)
 
     def select(
         self,
         table_name: str,
-        columns: str = "*",
-        filters: Optional[Dict[str, Any]] = None,
+        columns: Union[str, Sequence[str]] = "*",
+        filters: Optional[Filters] = None,
         order_by: Optional[Dict[str, str]] = None,
         limit: Optional[int] = None,
+        offset: Optional[int] = None,
     ) -> List[Dict[str, Any]]:
         """
         Select data from a table with optional filtering, ordering, and limiting.
 
         Args:
             table_name: Name of the table to query
-            columns: Columns to select (default "*" for all columns)
-            filters: Dictionary of column-value pairs for filtering
+            columns: Columns to select, as a comma-separated string or a list (default "*" for all columns)
+            filters: Dictionary of column-value pairs, Predicate (see filters.py), or a list of both
             order_by: Dictionary with column name as key and "asc" or "desc" as value
             limit: Maximum number of rows to return
+            offset: Number of rows to skip; combined with limit this becomes a range() request
 
         Returns:
             List of dictionaries representing the selected rows
         """
-        query = self.client.table(table_name).select(columns)
+        columns = select_columns(columns)
+        if self.cache is not None:
+            cache_key = self.cache.key(table_name, columns, filters, order_by, limit, offset=offset)
+            cached = self.cache.get(cache_key)
+            if cached is not MISSING:
+                return cached
 
-        # Apply filters if provided
-        if filters:
-            for column, value in filters.items():
-                query = query.eq(column, value)
+        query = self.client.table(table_name).select(columns)
 
-        # Apply ordering if provided
-        if order_by:
-            for column, direction in order_by.items():
-                if direction.lower() == "asc":
-                    query = query.order(column)
-                else:
-                    query = query.order(column, desc=True)
+        # Apply filters and ordering if provided
+        query = apply_filters(query, filters)
+        query = apply_order(query, order_by)
 
-        # Apply limit if provided
-        if limit:
+        # Apply limit and offset if provided
+        if offset and limit:
+            query = query.range(offset, offset + limit - 1)
+        elif offset:
+            query = query.offset(offset)
+        elif limit:
             query = query.limit(limit)
 
         # Execute the query
-        response = query.execute()
+        with span("supabase.select", table=table_name):
+            response = query.execute()
 
         # Check for errors
         if hasattr(response, "error") and response.error:
             raise Exception(f"Supabase query error: {response.error.message}")
 
+        if self.cache is not None:
+            self.cache.set(cache_key, response.data)
+
         return response.data
 
+    def iter_rows(
+        self,
+        table_name: str,
+        columns: Union[str, Sequence[str]] = "*",
+        filters: Optional[Filters] = None,
+        page_size: int = 1000,
+        key_column: Optional[str] = "id",
+        descending: bool = False,
+        order_by: Optional[Dict[str, str]] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Lazily iterate over every matching row of a table, one page at a time.
+
+        By default pages are fetched with keyset pagination: each page asks for rows
+        whose key_column is greater (or less, when descending) than the last key
+        seen, so every page costs the same no matter how deep into the table it is.
+        key_column must be unique and sortable, and is added to columns if missing.
+        With key_column=None, pages are fetched with range() offsets in order_by order
+        instead. Rows are yielded as soon as their page arrives, and at most one page
+        is held in memory. The select cache is bypassed.
+
+        Args:
+            table_name: Name of the table to read
+            columns: Columns to select, as a comma-separated string or a list (default "*" for all columns)
+            filters: Dictionary of column-value pairs, Predicate, or a list of both
+            page_size: Number of rows requested per page (the server may return fewer)
+            key_column: Unique column used for keyset pagination, or None for range pagination
+            descending: Iterate in descending key order (keyset pagination only)
+            order_by: Ordering used with range pagination
+
+        Yields:
+            Row dictionaries
+        """
+        columns = select_columns(columns)
+        if key_column and columns != "*" and key_column not in [c.strip() for c in columns.split(",")]:
+            columns = f"{columns},{key_column}"
+
+        last_key = None
+        offset = 0
+        while True:
+            query = self.client.table(table_name).select(columns)
+            query = apply_filters(query, filters)
+
+            if key_column:
+                if last_key is not None:
+                    query = query.lt(key_column, last_key) if descending else query.gt(key_column, last_key)
+                query = query.order(key_column, desc=descending).limit(page_size)
+            else:
+                query = apply_order(query, order_by).range(offset, offset + page_size - 1)
+
+            with span("supabase.select", table=table_name):
+                response = query.execute()
+
+            # Check for errors
+            if hasattr(response, "error") and response.error:
+                raise Exception(f"Supabase query error: {response.error.message}")
+
+            rows = response.data
+            yield from rows
+
+            # A short page is not the end: PostgREST caps pages at its max-rows setting
+            # (1000 on Supabase) whatever page_size asks for, so only an empty page is
+            if not rows:
+                return
+            if key_column:
+                last_key = rows[-1][key_column]
+            offset += len(rows)
+
     def insert(
         self, table_name: str, data: Union[Dict[str, Any], List[Dict[str, Any]]]
     ) -> Dict[str, Any]:
@@ -81,16 +221,124 @@ class SupabaseController:
         Returns:
             Dictionary containing the inserted data
         """
-        response = self.client.table(table_name).insert(data).execute()
+        with span("supabase.insert", table=table_name):
+            response = self.client.table(table_name).insert(data).execute()
 
         # Check for errors
         if hasattr(response, "error") and response.error:
             raise Exception(f"Supabase insert error: {response.error.message}")
 
+        self._invalidate(table_name)
+
         return response.data
 
+    def upsert(
+        self, table_name: str, data: Union[Dict[str, Any], List[Dict[str, Any]]], on_conflict: Optional[str] = None
+    ) -> None:
+        """
+        Insert rows, or update them where they conflict with an existing row.
+
+        Args:
+            table_name: Name of the table to upsert into
+            data: Dictionary or list of dictionaries containing the rows
+            on_conflict: Comma-separated columns of the unique constraint (default: primary key)
+        """
+        query = self.client.table(table_name).upsert(data, returning=ReturnMethod.minimal, on_conflict=on_conflict or "")
+        with span("supabase.upsert", table=table_name):
+            response = query.execute()
+
+        # Check for errors
+        if hasattr(response, "error") and response.error:
+            raise Exception(f"Supabase upsert error: {response.error.message}")
+
+        self._invalidate(table_name)
+
+    def _insert_chunk(
+        self,
+        table_name: str,
+        index: int,
+        chunk: List[Dict[str, Any]],
+        upsert: bool,
+        on_conflict: Optional[str],
+        return_rows: bool,
+        max_retries: int,
+    ) -> ChunkResult:
+        """Insert one chunk, retrying transient failures with exponential backoff. Never raises."""
+        returning = ReturnMethod.representation if return_rows else ReturnMethod.minimal
+        result = ChunkResult(index=index, rows=len(chunk))
+        for attempt in range(max_retries + 1):
+            result.attempts = attempt + 1
+            try:
+                table = self.client.table(table_name)
+                if upsert:
+                    query = table.upsert(chunk, returning=returning, on_conflict=on_conflict or "")
+                else:
+                    query = table.insert(chunk, returning=returning)
+                with span("supabase.insert", table=table_name, rows=len(chunk)):
+                    response = query.execute()
+                result.data = response.data if return_rows else None
+                result.error = None
+                return result
+            except Exception as e:
+                result.error = str(e)
+                if attempt == max_retries or not is_retryable(e, idempotent=upsert):
+                    return result
+                time.sleep(BULK_RETRY_BACKOFF * 2 ** attempt)
+        return result
+
+    def bulk_insert(
+        self,
+        table_name: str,
+        rows: Iterable[Dict[str, Any]],
+        chunk_size: int = BULK_CHUNK_SIZE,
+        concurrency: int = BULK_CONCURRENCY,
+        upsert: bool = False,
+        on_conflict: Optional[str] = None,
+        return_rows: bool = False,
+        max_retries: int = 3,
+    ) -> BulkInsertResult:
+        """
+        Insert or upsert a large number of rows in chunks, several chunks at a time.
+
+        Rows are pulled from the iterable lazily and at most `concurrency` chunks are
+        held in memory at once, so a generator of any size can be ingested with flat
+        memory use. A chunk that fails transiently is retried; if it still fails, or
+        fails in a way a retry cannot fix, its error is recorded and the remaining
+        chunks are still sent.
+
+        Args:
+            table_name: Name of the table to insert into
+            rows: Iterable or generator of row dictionaries
+            chunk_size: Number of rows per request
+            concurrency: Maximum number of chunk requests in flight
+            upsert: Upsert instead of insert
+            on_conflict: Comma-separated columns of the unique constraint used by upsert
+            return_rows: Keep the inserted rows in each ChunkResult (costs memory)
+            max_retries: Retries per failed chunk. Inserts are only retried when the chunk was
+                not written; use upsert=True to also retry timeouts and 5xx responses
+
+        Returns:
+            BulkInsertResult with one ChunkResult per chunk, in input order
+        """
+        results = []
+        in_flight = set()
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="supabase-bulk") as executor:
+            for index, chunk in enumerate(iter_chunks(rows, chunk_size)):
+                if len(in_flight) >= concurrency:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    results.extend(future.result() for future in done)
+                # Each chunk runs in a copy of the caller's context so its span joins the trace
+                in_flight.add(executor.submit(
+                    contextvars.copy_context().run, self._insert_chunk, table_name, index, chunk, upsert, on_conflict, return_rows, max_retries
+                ))
+            results.extend(future.result() for future in wait(in_flight).done)
+
+        self._invalidate(table_name)
+
+        return BulkInsertResult(chunks=sorted(results, key=lambda result: result.index))
+
     def update(
-        self, table_name: str, data: Dict[str, Any], filters: Dict[str, Any]
+        self, table_name: str, data: Dict[str, Any], filters: Filters
     ) -> Dict[str, Any]:
         """
         Update rows in a table that match the given filters.
@@ -98,7 +346,7 @@ class SupabaseController:
         Args:
             table_name: Name of the table to update
             data: Dictionary containing the columns and values to update
-            filters: Dictionary of column-value pairs for filtering which rows to update
+            filters: Dictionary of column-value pairs, Predicate, or a list of both selecting the rows to update
 
         Returns:
             Dictionary containing the updated data
@@ -106,24 +354,26 @@ class SupabaseController:
         query = self.client.table(table_name).update(data)
 
         # Apply filters
-        for column, value in filters.items():
-            query = query.eq(column, value)
+        query = apply_filters(query, filters)
 
-        response = query.execute()
+        with span("supabase.update", table=table_name):
+            response = query.execute()
 
         # Check for errors
         if hasattr(response, "error") and response.error:
             raise Exception(f"Supabase update error: {response.error.message}")
 
+        self._invalidate(table_name)
+
         return response.data
 
-    def delete(self, table_name: str, filters: Dict[str, Any]) -> Dict[str, Any]:
+    def delete(self, table_name: str, filters: Filters) -> Dict[str, Any]:
         """
         Delete rows from a table that match the given filters.
 
         Args:
             table_name: Name of the table to delete from
-            filters: Dictionary of column-value pairs for filtering which rows to delete
+            filters: Dictionary of column-value pairs, Predicate, or a list of both selecting the rows to delete
 
         Returns:
             Dictionary containing the deleted data
@@ -131,15 +381,17 @@ class SupabaseController:
         query = self.client.table(table_name).delete()
 
         # Apply filters
-        for column, value in filters.items():
-            query = query.eq(column, value)
+        query = apply_filters(query, filters)
 
-        response = query.execute()
+        with span("supabase.delete", table=table_name):
+            response = query.execute()
 
         # Check for errors
         if hasattr(response, "error") and response.error:
             raise Exception(f"Supabase delete error: {response.error.message}")
 
+        self._invalidate(table_name)
+
         return response.data
 
     def execute_rpc(
@@ -155,7 +407,8 @@ class SupabaseController:
         Returns:
             Dictionary containing the result of the function call
         """
-        response = self.client.rpc(function_name, params or {}).execute()
+        with span("supabase.rpc", function=function_name):
+            response = self.client.rpc(function_name, params or {}).execute()
 
         # Check for errors
         if hasattr(response, "error") and response.error:
@@ -178,9 +431,10 @@ class SupabaseController:
             Dictionary containing the query results
         """
         # This requires the service role key
-        response = self.client.rpc(
-            "exec_sql", {"query": query, "params": params or {}}
-        ).execute()
+        with span("supabase.rpc", function="exec_sql"):
+            response = self.client.rpc(
+                "exec_sql", {"query": query, "params": params or {}}
+            ).execute()
 
         # Check for errors
         if hasattr(response, "error") and response.error:
@@ -188,41 +442,60 @@ class SupabaseController:
 
         return response.data
 
-    def get_table_schema(self, table_name: str) -> Dict[str, Any]:
+    def refresh_schema(self) -> None:
+        """
+        Reload the shared schema catalog from the database and update its snapshot file.
+        Concurrent refreshes in this process share a single query.
         """
-        Get the schema information for a specific table.
+        def load():
+            schema_catalog.load_rows(self.raw_query(CATALOG_QUERY))
+            schema_catalog.write_snapshot()
+
+        _schema_flight.do("catalog", load)
+
+    def _ensure_schema(self, table_name: Optional[str] = None) -> None:
+        if not schema_catalog.needs_refresh(table_name):
+            return
+        # Another worker may have refreshed the snapshot file already
+        if schema_catalog.read_snapshot() and not schema_catalog.needs_refresh(table_name):
+            return
+        if schema_catalog.is_fresh():
+            schema_catalog.mark_miss_refresh()
+        self.refresh_schema()
+
+    def get_table_schema(self, table_name: str, refresh: bool = False) -> List[Dict[str, Any]]:
+        """
+        Get the schema information for a specific table from the schema catalog.
 
         Args:
             table_name: Name of the table to get schema for
+            refresh: Reload the catalog from the database first
 
         Returns:
-            Dictionary containing the table schema information
-        """
-        query = f"""
-        SELECT column_name, data_type, is_nullable
-        FROM information_schema.columns
-        WHERE table_name = '{table_name}'
-        ORDER BY ordinal_position
+            List of column_name, data_type and is_nullable dictionaries in ordinal
+            order, or an empty list if the table does not exist
         """
+        if refresh:
+            self.refresh_schema()
+        else:
+            self._ensure_schema(table_name)
+        return schema_catalog.columns(table_name)
 
-        return self.raw_query(query)
-
-    def list_tables(self) -> List[str]:
+    def list_tables(self, refresh: bool = False) -> List[str]:
         """
-        Get a list of all tables in the database.
+        Get a list of all tables in the public schema from the schema catalog.
+
+        Args:
+            refresh: Reload the catalog from the database first
 
         Returns:
             List of table names
         """
-        query = """
-        SELECT table_name
-        FROM information_schema.tables
-        WHERE table_schema = 'public'
-        ORDER BY table_name
-        """
-
-        result = self.raw_query(query)
-        return [row["table_name"] for row in result]
+        if refresh:
+            self.refresh_schema()
+        else:
+            self._ensure_schema()
+        return schema_catalog.tables()
 
     def get_storage_url(self, bucket: str, path: str) -> str:
         """
@@ -235,7 +508,12 @@ class SupabaseController:
         Returns:
             Public URL for the file
         """
-        return self.client.storage.from_(bucket).get_public_url(path)
+        # The public URL is a pure function of bucket and path, no need to rebuild it
+        url = self.url_cache.get_public(bucket, path)
+        if url is MISSING:
+            url = self.client.storage.from_(bucket).get_public_url(path)
+            self.url_cache.set_public(bucket, path, url)
+        return url
 
     def upload_file(
         self,
@@ -301,8 +579,13 @@ class SupabaseController:
             expires_in: Expiration time in seconds (default: 1 hour)
 
         Returns:
-            Dictionary containing the signed URL information
+            Dictionary containing the signed URL information. A URL signed earlier
+            with the same expires_in is reused while enough of its lifetime is left.
         """
+        cached = self.url_cache.get_signed(bucket, path, expires_in)
+        if cached is not MISSING:
+            return dict(cached)
+
         response = self.client.storage.from_(bucket).create_signed_url(path, expires_in)
 
         # Check for errors
@@ -311,8 +594,31 @@ class SupabaseController:
                 f"Supabase signed URL generation error: {response.error.message}"
             )
 
+        self.url_cache.set_signed(bucket, path, expires_in, dict(response))
         return response
 
+    def get_signed_urls(
+        self, bucket: str, paths: Iterable[str], expires_in: int = 3600
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Generate signed URLs for many files, signing every uncached path in one request.
+
+        Args:
+            bucket: Storage bucket name
+            paths: Paths to the files within the bucket
+            expires_in: Expiration time in seconds (default: 1 hour)
+
+        Returns:
+            Dictionary mapping each path to its signed URL information, shaped like
+            the result of get_signed_url. Paths that could not be signed map to
+            {"error": message} instead.
+        """
+        results, missing = self.url_cache.get_signed_many(bucket, paths, expires_in)
+        if missing:
+            response = self.client.storage.from_(bucket).create_signed_urls(missing, expires_in)
+            results.update(self.url_cache.set_signed_many(bucket, expires_in, response))
+        return results
+
     def delete_file(self, bucket: str, path: str) -> Dict[str, Any]:
         """
         Delete a file from Supabase Storage.
@@ -325,9 +631,157 @@ class SupabaseController:
             Dictionary containing the deletion result
         """
         response = self.client.storage.from_(bucket).remove([path])
+        self.url_cache.forget(bucket, path)
 
         # Check for errors
         if hasattr(response, "error") and response.error:
             raise Exception(f"Supabase storage delete error: {response.error.message}")
 
         return response
+
+    @property
+    def storage_stream(self) -> StorageStream:
+        """Streaming storage client, created on first use"""
+        if self._storage_stream is None:
+            self._storage_stream = StorageStream(self.supabase_url, self.supabase_key)
+        return self._storage_stream
+
+    def open_download(
+        self,
+        bucket: str,
+        path: str,
+        range_header: Optional[str] = None,
+        chunk_size: int = STORAGE_DOWNLOAD_CHUNK_SIZE,
+    ) -> StorageDownload:
+        """
+        Open a streaming download of a file in Supabase Storage.
+
+        Only one chunk is held in memory at a time. Pass the client's Range header
+        through to serve partial content (206) for seeking and resumed downloads.
+
+        Args:
+            bucket: Storage bucket name
+            path: Path to the file within the bucket
+            range_header: Optional HTTP Range header value, e.g. "bytes=0-1023"
+            chunk_size: Size of the yielded chunks in bytes
+
+        Returns:
+            StorageDownload with the status code, headers to forward, and a chunk iterator
+        """
+        return self.storage_stream.open_download(bucket, path, range_header=range_header, chunk_size=chunk_size)
+
+    def upload_stream(
+        self,
+        bucket: str,
+        path: str,
+        data: Union[BinaryIO, Iterable[bytes]],
+        content_type: Optional[str] = None,
+        content_length: Optional[int] = None,
+        upsert: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        Upload a file to Supabase Storage from a file-like object or an iterable of chunks.
+
+        Args:
+            bucket: Storage bucket name
+            path: Path where the file should be stored
+            data: File-like object opened in binary mode, or an iterable of bytes
+            content_type: MIME type of the file
+            content_length: Size in bytes, if known (otherwise chunked transfer encoding is used)
+            upsert: Overwrite an existing file
+
+        Returns:
+            Dictionary containing the upload result
+        """
+        return self.storage_stream.upload(
+            bucket, path, data, content_type=content_type, content_length=content_length, upsert=upsert
+        )
+
+    def upload_resumable(
+        self,
+        bucket: str,
+        path: str,
+        data: Union[BinaryIO, Iterable[bytes]],
+        size: int,
+        content_type: Optional[str] = None,
+        upsert: bool = False,
+        upload_url: Optional[str] = None,
+    ) -> str:
+        """
+        Upload a large file with the resumable (TUS) protocol, 6 MB at a time.
+
+        Failed chunks are retried from the offset the server reports. To resume an
+        interrupted upload, pass the upload_url returned by the first attempt; file-like
+        sources are then seeked past the bytes the server already has.
+
+        Args:
+            bucket: Storage bucket name
+            path: Path where the file should be stored
+            data: File-like object opened in binary mode, or an iterable of bytes
+            size: Total size of the file in bytes
+            content_type: MIME type of the file
+            upsert: Overwrite an existing file
+            upload_url: URL of an earlier, interrupted upload to resume
+
+        Returns:
+            The upload URL, which can be used to resume the upload
+        """
+        stream = self.storage_stream
+        offset = 0
+        if upload_url is None:
+            upload_url = stream.create_resumable_upload(bucket, path, size, content_type=content_type, upsert=upsert)
+        else:
+            offset = stream.resumable_offset(upload_url)
+
+        source = data
+        if offset:
+            if hasattr(data, "seek"):
+                data.seek(offset)
+            else:
+                source = skip_bytes(iter_file(data) if hasattr(data, "read") else data, offset)
+
+        stream.upload_resumable(upload_url, read_chunks(source, STORAGE_RESUMABLE_CHUNK_SIZE), offset=offset)
+        return upload_url
+
+    def upload_file_mmap(
+        self,
+        bucket: str,
+        path: str,
+        local_path: str,
+        content_type: Optional[str] = None,
+        upsert: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        Upload a local file by memory-mapping it instead of reading it into memory.
+
+        Files of STORAGE_RESUMABLE_THRESHOLD bytes or more use the resumable protocol.
+
+        Args:
+            bucket: Storage bucket name
+            path: Path where the file should be stored
+            local_path: Path of the local file to upload
+            content_type: MIME type of the file
+            upsert: Overwrite an existing file
+
+        Returns:
+            Dictionary containing the upload result
+        """
+        size = os.path.getsize(local_path)
+        if size == 0:
+            return self.upload_stream(bucket, path, [b""], content_type=content_type, content_length=0, upsert=upsert)
+
+        with open(local_path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            if size >= STORAGE_RESUMABLE_THRESHOLD:
+                stream = self.storage_stream
+                upload_url = stream.create_resumable_upload(bucket, path, size, content_type=content_type, upsert=upsert)
+                stream.upload_resumable(upload_url, iter_mmap(mapped, chunk_size=STORAGE_RESUMABLE_CHUNK_SIZE))
+                return {"path": path, "upload_url": upload_url, "size": size}
+
+            return self.upload_stream(
+                bucket,
+                path,
+                iter_mmap(mapped, chunk_size=STORAGE_UPLOAD_CHUNK_SIZE),
+                content_type=content_type,
+                content_length=size,
+                upsert=upsert,
+            )
@@ -0,0 +1,78 @@
+from typing import Any, Dict, Iterable, List, Tuple
+
+from controller.cache import TTLCache, MISSING
+
+# A cached signed URL is dropped once less than this share of its lifetime is left...
+SIGNED_URL_REFRESH_FRACTION = 0.1
+# ...or less than this many seconds, whichever is larger
+SIGNED_URL_MIN_REMAINING = 30
+
+
+class StorageURLCache:
+    """
+    Caches Supabase Storage URLs.
+
+    Signed URLs are kept until shortly before they expire, so a cached URL always
+    has at least max(SIGNED_URL_MIN_REMAINING, 10% of expires_in) seconds of validity
+    left when it is handed out. Public URLs are pure functions of bucket and path
+    and never expire.
+    """
+    def __init__(self, max_size: int = 10000):
+        self.signed = TTLCache(max_size=max_size, ttl=None)
+        self.public = TTLCache(max_size=max_size, ttl=None)
+
+    @staticmethod
+    def signed_ttl(expires_in: int) -> float:
+        return expires_in - max(SIGNED_URL_MIN_REMAINING, expires_in * SIGNED_URL_REFRESH_FRACTION)
+
+    def get_signed(self, bucket: str, path: str, expires_in: int) -> Any:
+        return self.signed.get((bucket, path, expires_in))
+
+    def set_signed(self, bucket: str, path: str, expires_in: int, value: Any) -> None:
+        ttl = self.signed_ttl(expires_in)
+        if ttl > 0:
+            self.signed.set((bucket, path, expires_in), value, ttl=ttl)
+
+    def get_signed_many(
+        self, bucket: str, paths: Iterable[str], expires_in: int
+    ) -> Tuple[Dict[str, Dict[str, Any]], List[str]]:
+        """Split paths into cached signed URLs and the (deduplicated) paths still to sign"""
+        results: Dict[str, Dict[str, Any]] = {}
+        missing: List[str] = []
+        for path in dict.fromkeys(paths):
+            cached = self.get_signed(bucket, path, expires_in)
+            if cached is MISSING:
+                missing.append(path)
+            else:
+                results[path] = dict(cached)
+        return results, missing
+
+    def set_signed_many(
+        self, bucket: str, expires_in: int, response: List[Dict[str, Any]]
+    ) -> Dict[str, Dict[str, Any]]:
+        """Cache the items of a create_signed_urls response and map them by path"""
+        results: Dict[str, Dict[str, Any]] = {}
+        for item in response:
+            path = item.get("path")
+            url = item.get("signedURL") or item.get("signedUrl")
+            if item.get("error") or not url:
+                results[path] = {"error": item.get("error") or "Signed URL missing from response"}
+                continue
+            signed = {"signedURL": url, "signedUrl": url}
+            self.set_signed(bucket, path, expires_in, signed)
+            results[path] = dict(signed)
+        return results
+
+    def get_public(self, bucket: str, path: str) -> Any:
+        return self.public.get((bucket, path))
+
+    def set_public(self, bucket: str, path: str, url: str) -> None:
+        self.public.set((bucket, path), url)
+
+    def forget(self, bucket: str, path: str) -> None:
+        """Drop every cached URL for a file, e.g. after it is deleted"""
+        self.signed.delete_where(lambda key: key[0] == bucket and key[1] == path)
+        self.public.delete((bucket, path))
+
+    def stats(self) -> Dict[str, Any]:
+        return {"signed": self.signed.stats(), "public": self.public.stats()}
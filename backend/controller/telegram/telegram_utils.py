@@ -1,24 +1,284 @@
+import asyncio
+import collections
+import contextvars
 import requests
 import time
 import os
+import httpx
+import logging
 from dotenv import load_dotenv
+from controller.observability import span
 
 # Load environment variables from .env file
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# Bot API base URL; override to point at a local Bot API server or a stand-in
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org").rstrip("/")
+
+# Reused so synchronous sends keep the TLS connection alive
+_session = requests.Session()
+
 
 def send_telegram_notification(message, markdown=None, chat_id=None, bot_token=None):
-    print("sending telegram notification: ", message)
+    logger.debug("Sending telegram notification: %s", message)
 
     bot_token = bot_token or os.getenv("TELEGRAM_BOT_TOKEN")
     chat_id = chat_id or os.getenv("GROUP_CHAT_ID")
-    url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
+    url = f"{TELEGRAM_API_URL}/bot{bot_token}/sendMessage"
 
     if markdown:
         payload = {"chat_id": chat_id, "text": message, "parse_mode": "MarkdownV2"}
     else:
         payload = {"chat_id": chat_id, "text": message}
 
-    response = requests.post(url, json=payload)
+    with span("telegram.send"):
+        response = _session.post(url, json=payload, timeout=10)
     return response.json()
 
+
+
+# Telegram allows about 1 message/second per private chat, 20/minute per group and 30/second overall
+TELEGRAM_CHAT_INTERVAL = float(os.getenv("TELEGRAM_CHAT_INTERVAL", 1.0))
+TELEGRAM_GROUP_INTERVAL = float(os.getenv("TELEGRAM_GROUP_INTERVAL", 3.0))
+TELEGRAM_GLOBAL_RATE = float(os.getenv("TELEGRAM_GLOBAL_RATE", 30))
+TELEGRAM_COALESCE_WINDOW = float(os.getenv("TELEGRAM_COALESCE_WINDOW", 0))
+TELEGRAM_MAX_PENDING = int(os.getenv("TELEGRAM_MAX_PENDING", 10000))
+TELEGRAM_MAX_MESSAGE_LENGTH = 4096
+
+# Errors raised before the request reached Telegram, so retrying cannot send a message twice
+_NOT_SENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+class TelegramQueueFull(Exception):
+    """Raised when too many messages are waiting to be sent"""
+
+
+class TelegramSenderClosed(Exception):
+    """Set on queued messages that were not sent before the sender was closed"""
+
+
+def log_send_failure(future):
+    """Done-callback for enqueue futures nobody awaits, so failed deliveries are logged"""
+    if future.cancelled():
+        return
+    error = future.exception()
+    if error is not None:
+        logger.error("Queued Telegram message was not sent: %s", error)
+    elif isinstance(future.result(), dict) and future.result().get("ok") is False:
+        logger.error("Telegram rejected a queued message: %s", future.result().get("description"))
+
+
+def _retry_after(response):
+    """Seconds Telegram asks to wait after a 429, from the body, the Retry-After header, or 1"""
+    try:
+        return float(response.json()["parameters"]["retry_after"])
+    except (ValueError, KeyError, TypeError):
+        pass
+    try:
+        return float(response.headers.get("retry-after", 1))
+    except ValueError:
+        return 1.0
+
+
+class TelegramSender:
+    """
+    Async Telegram sender with a persistent keep-alive HTTP client.
+
+    Queued messages are delivered by one background worker per chat, so a slow or
+    rate-limited chat never holds up the others. Workers respect Telegram's per-chat
+    and global rate limits, retry 429 responses after the advertised retry_after,
+    and can coalesce bursts of messages to the same chat into one message.
+    """
+
+    def __init__(
+        self,
+        bot_token=None,
+        chat_id=None,
+        coalesce_window=TELEGRAM_COALESCE_WINDOW,
+        max_retries=3,
+        max_pending=TELEGRAM_MAX_PENDING,
+    ):
+        """
+        Args:
+            bot_token: Bot token (default: TELEGRAM_BOT_TOKEN)
+            chat_id: Default chat id (default: GROUP_CHAT_ID)
+            coalesce_window: Seconds to wait for more messages to the same chat before sending; 0 disables coalescing
+            max_retries: Retries for 429, 5xx and connection errors. Read timeouts are not retried,
+                since Telegram may already have delivered the message
+            max_pending: Maximum number of queued messages before enqueue raises TelegramQueueFull
+        """
+        self.bot_token = bot_token or os.getenv("TELEGRAM_BOT_TOKEN")
+        self.chat_id = chat_id or os.getenv("GROUP_CHAT_ID")
+        self.coalesce_window = coalesce_window
+        self.max_retries = max_retries
+        self.max_pending = max_pending
+        self._client = None
+        self._queues = {}
+        self._workers = {}
+        self._pending = 0
+        self._next_send = {}
+        self._global_next_send = 0.0
+
+    def _get_client(self):
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=TELEGRAM_API_URL,
+                timeout=httpx.Timeout(10.0, connect=5.0),
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+            )
+        return self._client
+
+    @property
+    def pending(self):
+        """Number of messages queued but not yet sent"""
+        return self._pending
+
+    def enqueue(self, message, markdown=None, chat_id=None):
+        """
+        Queue a message for delivery and return immediately.
+
+        Args:
+            message: Text to send
+            markdown: Send with MarkdownV2 parse mode
+            chat_id: Target chat (default: the sender's chat_id)
+
+        Returns:
+            asyncio.Future resolved with the Telegram API response once the message is sent
+        """
+        if self._pending >= self.max_pending:
+            raise TelegramQueueFull(f"{self._pending} Telegram messages are already pending")
+
+        chat_id = chat_id or self.chat_id
+        future = asyncio.get_running_loop().create_future()
+        queue = self._queues.setdefault(chat_id, collections.deque())
+        queue.append((message, bool(markdown), future))
+        self._pending += 1
+
+        worker = self._workers.get(chat_id)
+        if worker is None or worker.done():
+            # The worker outlives this request, so it must not inherit its trace context
+            self._workers[chat_id] = contextvars.Context().run(asyncio.create_task, self._chat_worker(chat_id))
+        return future
+
+    async def send(self, message, markdown=None, chat_id=None):
+        """Queue a message and wait until it has been sent"""
+        return await self.enqueue(message, markdown=markdown, chat_id=chat_id)
+
+    async def _chat_worker(self, chat_id):
+        queue = self._queues[chat_id]
+        while queue:
+            if self.coalesce_window:
+                await asyncio.sleep(self.coalesce_window)
+            batch = self._take_batch(queue)
+            self._pending -= len(batch)
+
+            text = "\n".join(message for message, _, _ in batch)
+            markdown = batch[0][1]
+            try:
+                await self._wait_for_slot(chat_id)
+                with span("telegram.send", messages=len(batch)):
+                    result = await self._post(chat_id, text, markdown)
+            except asyncio.CancelledError:
+                self._fail(batch, TelegramSenderClosed("Telegram sender closed before the message was sent"))
+                raise
+            except Exception as e:
+                self._fail(batch, e)
+                continue
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_result(result)
+
+        del self._queues[chat_id]
+        self._workers.pop(chat_id, None)
+
+    @staticmethod
+    def _fail(batch, error):
+        for _, _, future in batch:
+            if not future.done():
+                future.set_exception(error)
+
+    def _take_batch(self, queue):
+        """Pop the next message, plus following messages it can be merged with when coalescing"""
+        batch = [queue.popleft()]
+        if not self.coalesce_window:
+            return batch
+        length = len(batch[0][0])
+        while queue:
+            message, markdown, _ = queue[0]
+            if markdown != batch[0][1] or length + 1 + len(message) > TELEGRAM_MAX_MESSAGE_LENGTH:
+                break
+            batch.append(queue.popleft())
+            length += 1 + len(message)
+        return batch
+
+    async def _wait_for_slot(self, chat_id):
+        """Sleep until both the chat's and the bot's rate limits allow another message"""
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        interval = TELEGRAM_GROUP_INTERVAL if str(chat_id).startswith("-") else TELEGRAM_CHAT_INTERVAL
+
+        chat_at = max(now, self._next_send.get(chat_id, 0.0))
+        self._next_send[chat_id] = chat_at + interval
+        global_at = max(now, self._global_next_send)
+        self._global_next_send = global_at + 1 / TELEGRAM_GLOBAL_RATE
+
+        delay = max(chat_at, global_at) - now
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def _post(self, chat_id, text, markdown):
+        payload = {"chat_id": chat_id, "text": text}
+        if markdown:
+            payload["parse_mode"] = "MarkdownV2"
+
+        url = f"/bot{self.bot_token}/sendMessage"
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = await self._get_client().post(url, json=payload)
+            except _NOT_SENT_ERRORS:
+                if attempt == self.max_retries:
+                    raise
+                await asyncio.sleep(2 ** attempt)
+                continue
+
+            if response.status_code == 429 and attempt < self.max_retries:
+                retry_after = _retry_after(response)
+                # Push back every message for this chat, not just this one
+                self._next_send[chat_id] = asyncio.get_running_loop().time() + retry_after
+                await asyncio.sleep(retry_after)
+                continue
+            if response.status_code >= 500 and attempt < self.max_retries:
+                await asyncio.sleep(2 ** attempt)
+                continue
+            try:
+                return response.json()
+            except ValueError:
+                # Not from the Bot API, e.g. a proxy's error page
+                raise Exception(f"Telegram API error: {response.status_code} {response.text[:200]}") from None
+
+    async def aclose(self, timeout=5.0):
+        """Wait up to timeout seconds for queued messages, then stop the workers and close the client"""
+        workers = [worker for worker in self._workers.values() if not worker.done()]
+        if workers:
+            done, pending = await asyncio.wait(workers, timeout=timeout)
+            for worker in pending:
+                worker.cancel()
+            if pending:
+                await asyncio.wait(pending)
+
+        # Messages the cancelled workers never reached; their callers must not wait forever
+        error = TelegramSenderClosed("Telegram sender closed before the message was sent")
+        for queue in self._queues.values():
+            self._fail(queue, error)
+        self._queues.clear()
+        self._workers.clear()
+        self._pending = 0
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+# Shared sender for this worker process
+telegram_sender = TelegramSender()
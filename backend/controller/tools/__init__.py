@@ -3,6 +3,6 @@ Tools module containing definitions and implementations for OpenAI API tools.
 """
 
 from .tools import Tools
+from .registry import registry, tool, ToolSpec, ToolRegistry
 
-__all__ = ['Tools'] 
-
+__all__ = ['Tools', 'registry', 'tool', 'ToolSpec', 'ToolRegistry'] 
@@ -0,0 +1,170 @@
+import asyncio
+import concurrent.futures
+import contextvars
+import multiprocessing
+import os
+import threading
+from typing import Any, Dict, Optional
+
+from dotenv import load_dotenv
+
+from controller.observability import span
+
+load_dotenv()
+
+# How a tool runs:
+#   async: a coroutine awaited on the event loop (non-blocking I/O)
+#   io:    a blocking function run in the shared tool thread pool
+#   cpu:   a CPU-bound function run in a process pool, so it does not hold the worker's GIL
+TOOL_KINDS = ('async', 'io', 'cpu')
+
+# Threads for io tools (per worker process)
+TOOL_IO_THREADS = int(os.getenv('TOOL_IO_THREADS', 16))
+# Processes for cpu tools (per worker process), started on first use
+TOOL_CPU_PROCESSES = int(os.getenv('TOOL_CPU_PROCESSES', min(2, os.cpu_count() or 1)))
+# Seconds a tool call may take unless the tool declares its own timeout
+TOOL_TIMEOUT = float(os.getenv('TOOL_TIMEOUT', 30))
+
+
+def _release_on(loop: asyncio.AbstractEventLoop, limit: asyncio.Semaphore) -> None:
+    # An abandoned call can finish after its loop has closed; its slot died with the loop
+    if not loop.is_closed():
+        try:
+            loop.call_soon_threadsafe(limit.release)
+        except RuntimeError:
+            pass
+
+
+class ToolExecutor:
+    """
+    Runs tool calls according to their kind, with per-tool concurrency limits and timeouts.
+
+    A timed-out or cancelled async tool is cancelled. Threads and processes cannot be
+    interrupted, so a timed-out io or cpu call is abandoned: its result is dropped,
+    it keeps its pool slot and its concurrency slot until it returns, and calls
+    still queued behind it are cancelled. The concurrency slot is what stops a
+    hanging tool from filling the whole pool.
+    """
+    def __init__(self, io_threads: int = TOOL_IO_THREADS, cpu_processes: int = TOOL_CPU_PROCESSES):
+        """
+        Args:
+            io_threads: Size of the thread pool for io tools
+            cpu_processes: Size of the process pool for cpu tools
+        """
+        self.io_threads = io_threads
+        self._threads = self._thread_pool()
+        self.cpu_processes = cpu_processes
+        self._processes: Optional[concurrent.futures.ProcessPoolExecutor] = None
+        self._processes_pid: Optional[int] = None
+        self._processes_lock = threading.Lock()
+        self._limits: Dict[str, asyncio.Semaphore] = {}
+
+    def _thread_pool(self) -> concurrent.futures.ThreadPoolExecutor:
+        return concurrent.futures.ThreadPoolExecutor(max_workers=self.io_threads, thread_name_prefix='tool')
+
+    def _process_pool(self) -> concurrent.futures.ProcessPoolExecutor:
+        # Created lazily in the process that uses it, never in the gunicorn master
+        with self._processes_lock:
+            if self._processes is None or self._processes_pid != os.getpid():
+                # forkserver children do not inherit this process's threads and locks
+                method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+                self._processes = concurrent.futures.ProcessPoolExecutor(
+                    max_workers=self.cpu_processes, mp_context=multiprocessing.get_context(method)
+                )
+                self._processes_pid = os.getpid()
+            return self._processes
+
+    def _limit(self, spec) -> Optional[asyncio.Semaphore]:
+        if not spec.max_concurrency:
+            return None
+        limit = self._limits.get(spec.name)
+        if limit is None:
+            limit = self._limits[spec.name] = asyncio.Semaphore(spec.max_concurrency)
+        return limit
+
+    def _submit(self, spec, args: Dict[str, Any]) -> concurrent.futures.Future:
+        if spec.kind == 'cpu':
+            return self._process_pool().submit(spec.func, **args)
+        # Copy the context so spans inside the tool join the caller's trace
+        return self._threads.submit(contextvars.copy_context().run, spec.func, **args)
+
+    async def acall(self, spec, args: Dict[str, Any]) -> Any:
+        """
+        Run a tool call from the event loop.
+
+        Args:
+            spec: The tool's ToolSpec
+            args: Keyword arguments for the tool
+
+        Returns:
+            The tool's result
+
+        Raises:
+            TimeoutError: If the call takes longer than the tool's timeout
+        """
+        timeout = spec.timeout or TOOL_TIMEOUT
+        limit = self._limit(spec)
+        if limit is not None:
+            await limit.acquire()
+
+        with span("tool.call", tool=spec.name, kind='async' if spec.async_func else spec.kind):
+            if spec.async_func is not None:
+                try:
+                    return await asyncio.wait_for(spec.async_func(**args), timeout)
+                except asyncio.TimeoutError:
+                    raise TimeoutError(f"Tool {spec.name} timed out after {timeout}s") from None
+                finally:
+                    if limit is not None:
+                        limit.release()
+
+            try:
+                future = self._submit(spec, args)
+            except BaseException:
+                if limit is not None:
+                    limit.release()
+                raise
+            if limit is not None:
+                # Hold the slot until the thread or process is really done, even if we stop waiting
+                loop = asyncio.get_running_loop()
+                future.add_done_callback(lambda _: _release_on(loop, limit))
+            try:
+                return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+            except asyncio.TimeoutError:
+                raise TimeoutError(f"Tool {spec.name} timed out after {timeout}s") from None
+
+    def call(self, spec, args: Dict[str, Any]) -> Any:
+        """
+        Run a tool call from synchronous code, such as a worker thread. Must not be
+        called on the event loop thread; use acall there.
+
+        Per-tool concurrency limits apply to acall only; here the pools bound concurrency.
+
+        Raises:
+            TimeoutError: If the call takes longer than the tool's timeout
+        """
+        timeout = spec.timeout or TOOL_TIMEOUT
+        with span("tool.call", tool=spec.name, kind=spec.kind):
+            if spec.func is None:
+                # Async-only tool: run it on a private event loop in this thread
+                try:
+                    return asyncio.run(asyncio.wait_for(spec.async_func(**args), timeout))
+                except asyncio.TimeoutError:
+                    raise TimeoutError(f"Tool {spec.name} timed out after {timeout}s") from None
+            future = self._submit(spec, args)
+            try:
+                return future.result(timeout)
+            except concurrent.futures.TimeoutError:
+                future.cancel()
+                raise TimeoutError(f"Tool {spec.name} timed out after {timeout}s") from None
+
+    def shutdown(self) -> None:
+        """Stop the pools without waiting for abandoned calls. Later calls start fresh pools."""
+        threads, self._threads = self._threads, self._thread_pool()
+        threads.shutdown(wait=False, cancel_futures=True)
+        if self._processes is not None and self._processes_pid == os.getpid():
+            self._processes.shutdown(wait=False, cancel_futures=True)
+            self._processes = None
+
+
+# Process-wide executor shared by every caller
+tool_executor = ToolExecutor()
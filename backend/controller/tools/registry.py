@@ -0,0 +1,203 @@
+import asyncio
+import dataclasses
+import json
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from agents import FunctionTool, RunContextWrapper
+
+from .executor import TOOL_KINDS, tool_executor
+
+
+class FrozenDict(dict):
+    """
+    A read-only dict. It is still a real dict, so the OpenAI SDK and FastAPI
+    serialize it as-is, but shared tool definitions cannot be mutated by a request.
+    """
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("Tool definitions are read-only")
+
+    __setitem__ = __delitem__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return (FrozenDict, (dict(self),))
+
+
+def freeze(value: Any) -> Any:
+    """Recursively convert dicts to FrozenDicts and lists to tuples"""
+    if isinstance(value, dict):
+        return FrozenDict((key, freeze(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def build_agent_tool(definition: Dict[str, Any], invoke: Callable[[Dict[str, Any]], Awaitable[Any]]) -> FunctionTool:
+    """
+    Wrap a tool as an Agents SDK FunctionTool that uses the same JSON schema as its
+    Responses API definition. invoke receives the parsed arguments and runs the
+    tool through the tool executor, so it never blocks the event loop.
+    """
+    async def on_invoke_tool(context: RunContextWrapper[Any], arguments: str) -> Any:
+        return await invoke(json.loads(arguments or "{}"))
+
+    return FunctionTool(
+        name=definition["name"],
+        description=definition["description"],
+        params_json_schema=definition["parameters"],
+        on_invoke_tool=on_invoke_tool,
+        # Optional parameters with defaults are not allowed in strict schemas
+        strict_json_schema=False,
+    )
+
+
+@dataclass(frozen=True)
+class ToolSpec:
+    """
+    A registered tool: its precomputed OpenAI definition, its implementations, how
+    to run them and its Agents SDK wrapper, all built once at registration
+    """
+    name: str
+    # Synchronous implementation (None for an async-only tool)
+    func: Optional[Callable[..., Any]]
+    definition: FrozenDict
+    agent_tool: FunctionTool
+    # One of TOOL_KINDS; says how func runs
+    kind: str = "io"
+    # Coroutine implementation, preferred on the event loop when present
+    async_func: Optional[Callable[..., Awaitable[Any]]] = None
+    # Seconds per call (None: TOOL_TIMEOUT)
+    timeout: Optional[float] = None
+    # Concurrent calls allowed per worker process (None: unlimited)
+    max_concurrency: Optional[int] = None
+
+
+class ToolRegistry:
+    """
+    Registry of tools keyed by name.
+
+    Tools register themselves with the @tool decorator when their module is imported,
+    so the registry is built once per process and every lookup is a dict access.
+    """
+    def __init__(self):
+        self._tools: Dict[str, ToolSpec] = {}
+        self._definitions: Tuple[FrozenDict, ...] = ()
+
+    def register(self,
+                 name: str,
+                 description: str,
+                 parameters: Optional[Dict[str, Any]] = None,
+                 kind: Optional[str] = None,
+                 timeout: Optional[float] = None,
+                 max_concurrency: Optional[int] = None) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+        """
+        Decorator that registers a function as a tool.
+
+        Args:
+            name: Tool name exposed to the model
+            description: Tool description exposed to the model
+            parameters: JSON schema of the tool arguments
+            kind: "async" for a coroutine function, "io" for blocking I/O (run in a
+                thread pool) or "cpu" for CPU-heavy work (run in a process pool; the
+                function must be importable by name). Default: "async" for coroutine
+                functions, otherwise "io".
+            timeout: Seconds per call (default: TOOL_TIMEOUT)
+            max_concurrency: Concurrent calls allowed per worker process (default: unlimited)
+
+        Returns:
+            Decorator that registers the function and returns it unchanged
+        """
+        def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
+            if name in self._tools:
+                raise ValueError(f"Tool {name} is already registered")
+            is_async = asyncio.iscoroutinefunction(func)
+            tool_kind = kind or ("async" if is_async else "io")
+            if tool_kind not in TOOL_KINDS:
+                raise ValueError(f"Unknown tool kind {tool_kind} for {name}, expected one of {TOOL_KINDS}")
+            if (tool_kind == "async") != is_async:
+                raise ValueError(f"Tool {name} must be a coroutine function if and only if its kind is async")
+
+            definition = freeze({
+                "type": "function",
+                "name": name,
+                "description": description,
+                "parameters": parameters or {"type": "object", "properties": {}, "additionalProperties": False},
+            })
+            self._tools[name] = ToolSpec(
+                name=name,
+                func=None if is_async else func,
+                async_func=func if is_async else None,
+                definition=definition,
+                agent_tool=build_agent_tool(definition, lambda args: tool_executor.acall(self.get(name), args)),
+                kind=tool_kind,
+                timeout=timeout,
+                max_concurrency=max_concurrency,
+            )
+            self._definitions = self._definitions + (definition,)
+            return func
+
+        return decorator
+
+    def register_async(self, name: str) -> Callable[[Callable[..., Awaitable[Any]]], Callable[..., Awaitable[Any]]]:
+        """
+        Decorator that adds a coroutine implementation to a registered synchronous tool.
+
+        Calls made from the event loop then await it instead of using a thread or
+        process; synchronous callers keep using the original function. Only register
+        natively async code: a timeout cancels the coroutine and frees its concurrency
+        slot, so work it handed to a thread would keep running outside the tool's limits.
+        """
+        def decorator(func: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+            if not asyncio.iscoroutinefunction(func):
+                raise ValueError(f"Async implementation of {name} must be a coroutine function")
+            self._tools[name] = dataclasses.replace(self.get(name), async_func=func)
+            return func
+
+        return decorator
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._tools
+
+    def __len__(self) -> int:
+        return len(self._tools)
+
+    def get(self, name: str) -> ToolSpec:
+        """Get a tool by name. Raises ValueError if it is not registered."""
+        spec = self._tools.get(name)
+        if spec is None:
+            raise ValueError(f"Tool {name} not found")
+        return spec
+
+    def names(self) -> List[str]:
+        return list(self._tools)
+
+    def definitions(self) -> Tuple[FrozenDict, ...]:
+        """Get all tool definitions in registration order"""
+        return self._definitions
+
+    def definitions_by_names(self, names: Iterable[str]) -> List[FrozenDict]:
+        """Get tool definitions for the given names, skipping unknown names"""
+        tools = self._tools
+        return [tools[name].definition for name in dict.fromkeys(names) if name in tools]
+
+    def functions_by_names(self, names: Iterable[str]) -> List[Callable[..., Any]]:
+        """Get tool implementations for the given names, skipping unknown names"""
+        tools = self._tools
+        return [tools[name].func or tools[name].async_func for name in dict.fromkeys(names) if name in tools]
+
+    def agent_tools_by_names(self, names: Iterable[str]) -> List[FunctionTool]:
+        """Get the prebuilt Agents SDK tools for the given names, skipping unknown names"""
+        tools = self._tools
+        return [tools[name].agent_tool for name in dict.fromkeys(names) if name in tools]
+
+
+# Process-wide registry. Tool modules register into it at import.
+registry = ToolRegistry()
+tool = registry.register
@@ -1,3 +1,23 @@
+from .registry import tool
+
 class WeatherTool:
+    @staticmethod
+    @tool(
+        name="get_weather",
+        description="Get current temperature for a given location.",
+        parameters={
+            "type": "object",
+            "properties": {
+                "location": {
+                    "type": "string",
+                    "description": "City and country e.g. Bogotá, Colombia"
+                }
+            },
+            "required": [
+                "location"
+            ],
+            "additionalProperties": False
+        },
+    )
     def get_weather(location: str) -> str:
         return "Weather data for " + location + " is sunny"
@@ -1,9 +1,121 @@
+import asyncio
+import os
+import threading
+from typing import Any, Optional
 from duckduckgo_search import DDGS
+from dotenv import load_dotenv
+from controller.cache import TTLCache, SQLiteCache, SingleFlight, AsyncSingleFlight, MISSING
+from .registry import tool
+
+load_dotenv()
+
+WEB_SEARCH_CACHE_TTL = float(os.getenv('WEB_SEARCH_CACHE_TTL', 900))
+WEB_SEARCH_CACHE_SIZE = int(os.getenv('WEB_SEARCH_CACHE_SIZE', 1024))
+# Optional SQLite file shared by all gunicorn workers
+WEB_SEARCH_CACHE_PATH = os.getenv('WEB_SEARCH_CACHE_PATH')
+
 
 class WebSearchTool:
+    """
+    DuckDuckGo web search with an in-process TTL/LRU cache, an optional shared
+    SQLite cache and single-flight coalescing of identical concurrent queries.
+    """
+    _cache = TTLCache(max_size=WEB_SEARCH_CACHE_SIZE, ttl=WEB_SEARCH_CACHE_TTL)
+    _shared_cache: Optional[SQLiteCache] = (
+        SQLiteCache(WEB_SEARCH_CACHE_PATH, ttl=WEB_SEARCH_CACHE_TTL, namespace='web_search')
+        if WEB_SEARCH_CACHE_PATH else None
+    )
+    _flight = SingleFlight()
+    _async_flight = AsyncSingleFlight()
+    # DDGS sessions are reused, one per thread
+    _local = threading.local()
+
+    @staticmethod
+    def _cache_key(query: str, max_results: int) -> str:
+        return f"{' '.join(query.lower().split())}|{max_results}"
+
+    @classmethod
+    def _session(cls) -> DDGS:
+        session = getattr(cls._local, 'session', None)
+        if session is None:
+            session = DDGS()
+            cls._local.session = session
+        return session
+
+    @classmethod
+    def _cached(cls, key: str) -> Any:
+        result = cls._cache.get(key)
+        if result is MISSING and cls._shared_cache is not None:
+            result = cls._shared_cache.get(key)
+            if result is not MISSING:
+                cls._cache.set(key, result)
+        return result
+
+    @classmethod
+    def _fetch(cls, query: str, max_results: int, key: str) -> Any:
+        # Another caller may have filled the cache while this one waited
+        result = cls._cached(key)
+        if result is not MISSING:
+            return result
+
+        results = cls._session().text(query, max_results=max_results)
+        result = results if results else "No results found."
+
+        cls._cache.set(key, result)
+        if cls._shared_cache is not None:
+            cls._shared_cache.set(key, result)
+        return result
+
+    @staticmethod
+    @tool(
+        name="web_search",
+        description="Search the web for information",
+        parameters={
+            "type": "object",
+            "properties": {
+                "query": {
+                    "type": "string",
+                    "description": "The search query"
+                },
+                "max_results": {
+                    "type": "integer",
+                    "description": "The maximum number of results to return",
+                    "default": 3
+                }
+            },
+            "required": [
+                "query"
+            ],
+            "additionalProperties": False
+        },
+        kind="io",
+        timeout=20,
+        # DuckDuckGo throttles bursts from one address
+        max_concurrency=8,
+    )
     def web_search(query: str, max_results: int = 3) -> str:
-        with DDGS() as ddgs:
-            results = ddgs.text(query, max_results=max_results)
-            if not results:
-                return "No results found."
-            return results
+        key = WebSearchTool._cache_key(query, max_results)
+        result = WebSearchTool._cached(key)
+        if result is not MISSING:
+            return result
+        return WebSearchTool._flight.do(key, lambda: WebSearchTool._fetch(query, max_results, key))
+
+    # Not registered as web_search's async implementation: cancelling it would not stop the
+    # search thread, so tool calls take the io path, which holds max_concurrency until it returns
+    @staticmethod
+    async def aweb_search(query: str, max_results: int = 3) -> str:
+        """Async entry point. Cache hits return without a thread hop; misses search in a worker thread."""
+        key = WebSearchTool._cache_key(query, max_results)
+        result = WebSearchTool._cache.get(key)
+        if result is not MISSING:
+            return result
+        return await WebSearchTool._async_flight.do(
+            key, lambda: asyncio.to_thread(WebSearchTool.web_search, query, max_results)
+        )
+
+    @staticmethod
+    def cache_stats() -> dict:
+        stats = {"memory": WebSearchTool._cache.stats()}
+        if WebSearchTool._shared_cache is not None:
+            stats["shared"] = WebSearchTool._shared_cache.stats()
+        return stats
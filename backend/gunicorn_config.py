@@ -1,16 +1,40 @@
 # gunicorn_config.py
+import os
+import shutil
+import socket
 
-# Worker configuration
-workers = 2  # Reduced number of workers for Digital Ocean's resource constraints
+# Metrics: each worker writes its samples to files in this directory and /metrics
+# aggregates them. It must be set before the app (and prometheus_client) is imported,
+# and is emptied here so counters of a previous run are not carried over.
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/backend_prometheus")
+shutil.rmtree(os.environ["PROMETHEUS_MULTIPROC_DIR"], ignore_errors=True)
+os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+
+from controller.server import BacklogAutoscaler, max_workers_for_memory, worker_count
+from controller.server.autoscaler import AUTOSCALE_ENABLED
+
+# Worker configuration: one async worker per CPU of the container's quota, capped by what fits
+# in its memory limit (see controller/server/resources.py); WEB_CONCURRENCY overrides it
+workers = int(os.getenv('WEB_CONCURRENCY', 0)) or worker_count()
 worker_class = 'uvicorn.workers.UvicornWorker'  # Using Uvicorn workers for ASGI
-threads = 1  # Single thread per worker
+# Heartbeat files on tmpfs; a disk-backed /tmp can stall them and get healthy workers killed
+worker_tmp_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
 
 # Request handling
 max_requests = 1000
 max_requests_jitter = 50
-timeout = 29  # Keep under 30 seconds for Digital Ocean's health check
-graceful_timeout = 29
-keepalive = 2
+# Slow requests are cut off by RequestTimeoutMiddleware (REQUEST_TIMEOUT) with a 504. Workers
+# heartbeat from their event loop, so this only kills a worker whose loop is stuck.
+timeout = int(os.getenv('WORKER_TIMEOUT', 60))
+graceful_timeout = int(os.getenv('GRACEFUL_TIMEOUT', 30))
+# Must exceed the load balancer's idle timeout (60s on Digital Ocean), so the balancer closes
+# idle connections first and never reuses one the worker has just closed (a 502)
+keepalive = int(os.getenv('KEEPALIVE', 65))
+
+# Autoscaling (opt-in): workers may grow up to this from the listen queue depth
+autoscale_max_workers = int(os.getenv('AUTOSCALE_MAX_WORKERS', 0)) or min(
+    max_workers_for_memory() or workers, 2 * workers
+)
 
 # Logging
 accesslog = '-'
@@ -27,6 +51,29 @@ bind = '0.0.0.0:8080'
 # keyfile = 'path/to/keyfile'
 # certfile = 'path/to/certfile'
 
-# Prevent timeouts during startup
-timeout = 0  # During startup
 preload_app = True  # Load application code before worker processes are forked
+
+
+def on_starting(server):
+    # With preload_app the app is already imported here, before workers are forked,
+    # so a schema catalog loaded now is inherited by every worker
+    if os.getenv("SUPABASE_SCHEMA_PRELOAD", "false").lower() == "true":
+        from controller.supabase.schema_catalog import preload_schema_catalog
+        preload_schema_catalog()
+
+
+def child_exit(server, worker):
+    # Drop the exited worker's in-flight gauges from the aggregated metrics
+    from controller.observability import mark_process_dead
+    mark_process_dead(worker.pid)
+
+
+def when_ready(server):
+    server.log.info("Starting %d workers", workers)
+    if AUTOSCALE_ENABLED:
+        ports = [
+            listener.sock.getsockname()[1] for listener in server.LISTENERS
+            if listener.sock.family in (socket.AF_INET, socket.AF_INET6)
+        ]
+        server.autoscaler = BacklogAutoscaler(server, ports, min_workers=workers, max_workers=autoscale_max_workers)
+        server.autoscaler.start()
@@ -1,12 +1,19 @@
 import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Depends, HTTPException, Request
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import HTMLResponse, JSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
 import uvicorn
 
 load_dotenv()
 
+from controller.observability import (
+    TraceMiddleware, MetricsMiddleware, configure_logging, shutdown_logging, generate_metrics,
+)
+from controller.observability.diagnostics import DIAGNOSTICS_ENABLED, ProfileMiddleware, loop_monitor
+from controller.server import RequestTimeoutMiddleware
+
 # Environment configuration
 ENVIRONMENT = os.getenv('ENVIRONMENT', 'development')
 FRONTEND_URL = os.getenv('FRONTEND_URL', 'http://localhost:5173')
@@ -15,14 +22,38 @@ ALLOWED_ORIGINS = [FRONTEND_URL]
 if ENVIRONMENT == 'production':
     ALLOWED_ORIGINS.append('https://www.google.com')  # TODO: Change to the production URL
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Startup and shutdown hooks for shared resources."""
+    # Runs in each worker after the fork, so every worker gets its own log writer thread
+    configure_logging()
+    if DIAGNOSTICS_ENABLED:
+        loop_monitor.start()
+    yield
+    await loop_monitor.stop()
+    # Flush queued notifications and close pooled HTTP clients on shutdown
+    from controller.openai.openai_utils import OpenAIUtils
+    from controller.telegram.telegram_utils import telegram_sender
+    from controller.supabase.async_supabase_utils import AsyncSupabaseController
+    from controller.tools.executor import tool_executor
+    await telegram_sender.aclose()
+    await OpenAIUtils.aclose()
+    await AsyncSupabaseController.aclose()
+    tool_executor.shutdown()
+    shutdown_logging()
+
 app = FastAPI(
     title="SaaS API",
     description="API for SaaS application",
     version="1.0.0",
     docs_url="/api/v1/docs",
-    openapi_url="/apispec.json"
+    openapi_url="/apispec.json",
+    lifespan=lifespan
 )
 
+# Per-request timeout (inside CORS, so a 504 still carries the CORS headers)
+app.add_middleware(RequestTimeoutMiddleware)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -32,12 +63,27 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Profiling of single requests on demand (inside tracing, so profiles are named by trace id)
+if DIAGNOSTICS_ENABLED:
+    app.add_middleware(ProfileMiddleware)
+
+# Per-request trace id and sampled spans
+app.add_middleware(TraceMiddleware)
+# Request counts, latency and in-flight requests per route, served on /metrics
+app.add_middleware(MetricsMiddleware)
+
 # Health check endpoint
 @app.get("/")
 async def health_check():
     """Health check endpoint for Digital Ocean."""
     return HTMLResponse(status_code=200)
 
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus metrics, aggregated across all workers."""
+    body, content_type = generate_metrics()
+    return Response(content=body, media_type=content_type)
+
 # Import and include routers
 from routes.telegram_routes import router as telegram_router
 from routes.openai_route import router as openai_router
@@ -47,6 +93,10 @@ app.include_router(telegram_router, prefix="/telegram", tags=["Telegram"])
 app.include_router(openai_router, prefix="/openai", tags=["OpenAI"])
 app.include_router(sample_router, prefix="/sample", tags=["Sample"])
 
+if DIAGNOSTICS_ENABLED:
+    from routes.diagnostics_route import router as diagnostics_router
+    app.include_router(diagnostics_router, prefix="/diagnostics", tags=["Diagnostics"])
+
 if __name__ == "__main__":
     port = int(os.getenv("PORT", 8000))  # Digital Ocean often uses port 8000
     uvicorn.run(
@@ -0,0 +1,59 @@
+import asyncio
+import os
+import time
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Depends, Header
+from fastapi.responses import FileResponse, PlainTextResponse
+from controller.observability.diagnostics import (
+    loop_monitor,
+    profile_window,
+    list_profiles,
+    profile_path,
+    is_admin,
+)
+
+def require_admin(x_diagnostics_token: Optional[str] = Header(None)):
+    if not is_admin(x_diagnostics_token):
+        raise HTTPException(status_code=403, detail="Invalid diagnostics token")
+
+# Every route here reports on or profiles the worker process that handles the request
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+@router.get("/loop")
+async def get_loop_stats():
+    """
+    Get event loop lag and recent blocked-loop events, with the stack of the code that blocked.
+    """
+    return loop_monitor.stats()
+
+@router.post("/profile")
+async def create_profile(seconds: float = 10.0, loop_only: bool = False, save: bool = True):
+    """
+    Profile this worker for a time window and return the samples as collapsed stacks,
+    which flamegraph.pl and speedscope read directly.
+    """
+    if seconds <= 0:
+        raise HTTPException(status_code=400, detail="seconds must be positive")
+    profiler = await profile_window(seconds, loop_only=loop_only)
+    headers = {"X-Profile-Samples": str(profiler.samples)}
+    if save:
+        name = f"window-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+        headers["X-Profile"] = os.path.basename(await asyncio.to_thread(profiler.write, name))
+    return PlainTextResponse(profiler.collapsed(), headers=headers)
+
+@router.get("/profiles")
+def get_profiles():
+    """
+    List saved profiles, newest first.
+    """
+    return list_profiles()
+
+@router.get("/profiles/{name}")
+async def get_profile(name: str):
+    """
+    Download a saved profile.
+    """
+    path = profile_path(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail=f"Profile {name} not found")
+    return FileResponse(path, media_type="text/plain")
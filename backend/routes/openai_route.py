@@ -1,11 +1,22 @@
-from typing import Optional, List, Dict, Any, Union
+from typing import Optional, List, Dict, Any, Union, AsyncIterator
 from fastapi import APIRouter, HTTPException, Body
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
-import traceback
+from sse_starlette.sse import EventSourceResponse
 import asyncio
+import json
+import logging
+import openai
 from controller.openai.openai_utils import OpenAIUtils
+from controller.openai.batch import ndjson, estimated_seconds, OPENAI_BATCH_CONCURRENCY, OPENAI_BATCH_MAX_ITEMS
+from controller.server.request_timeout import REQUEST_STREAM_TIMEOUT
 from controller.tools import Tools
 
+logger = logging.getLogger(__name__)
+
+# Seconds before the stream timeout at which an online batch stops and reports it
+BATCH_TIMEOUT_MARGIN = 5
+
 router = APIRouter()
 openai_utils = OpenAIUtils()
 
@@ -19,6 +30,17 @@ class ResponseRequest(BaseModel):
     tools: Optional[List[str]] = []
     temperature: Optional[float] = 0.7
     stream: Optional[bool] = False
+    # Set to false to skip the response cache for this request
+    cache: Optional[bool] = True
+    # Continue a server-side conversation; input then holds only the new message(s)
+    conversation_id: Optional[str] = None
+
+class BatchRequest(BaseModel):
+    items: List[ResponseRequest]
+    # online: run now and stream NDJSON results; offline: submit to the OpenAI Batch API
+    mode: Optional[str] = "online"
+    # Lowers the number of calls in flight; never above OPENAI_BATCH_CONCURRENCY
+    concurrency: Optional[int] = Field(None, ge=1)
 
 class SingleAgentResponseRequest(BaseModel):
     name: str
@@ -27,6 +49,12 @@ class SingleAgentResponseRequest(BaseModel):
     model: Optional[str] = "gpt-4o"
     temperature: Optional[float] = 0.7
     tools: Optional[List[str]] = []
+    stream: Optional[bool] = False
+
+async def to_sse(events: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[Dict[str, str]]:
+    """Serialize stream events from OpenAIUtils into Server-Sent Events."""
+    async for event in events:
+        yield {"event": event["event"], "data": json.dumps(event["data"], default=str)}
 
 @router.post("/response")
 async def create_response(request: ResponseRequest):
@@ -37,19 +65,48 @@ async def create_response(request: ResponseRequest):
         # Get tool definitions based on the requested tool names
         processed_tools = Tools.get_tools_by_names(request.tools) if request.tools else []
         
-        print(f"Processed tools: {processed_tools}")
+        logger.debug("Processed tools: %s", request.tools)
         # Format input properly
         formatted_input = request.input
         if isinstance(formatted_input, list):
             # Convert Pydantic model objects to dictionaries
             formatted_input = [message.dict() for message in formatted_input]
+
+        if request.conversation_id and request.stream:
+            events = openai_utils.stream_conversation(
+                conversation_id=request.conversation_id,
+                input_text=formatted_input,
+                model=request.model,
+                tools=processed_tools,
+                temperature=request.temperature,
+            )
+            return EventSourceResponse(to_sse(events))
+
+        if request.conversation_id:
+            return await openai_utils.aconverse(
+                conversation_id=request.conversation_id,
+                input_text=formatted_input,
+                model=request.model,
+                tools=processed_tools,
+                temperature=request.temperature,
+                cache=request.cache,
+            )
+
+        if request.stream:
+            events = openai_utils.stream_response(
+                input_text=formatted_input,
+                model=request.model,
+                tools=processed_tools,
+                temperature=request.temperature,
+            )
+            return EventSourceResponse(to_sse(events))
         
-        response = openai_utils.create_response(
+        response = await openai_utils.acreate_response(
             input_text=formatted_input,
             model=request.model,
             tools=processed_tools,
             temperature=request.temperature,
-            stream=request.stream
+            cache=request.cache,
         )
         
         
@@ -62,10 +119,95 @@ async def create_response(request: ResponseRequest):
     except HTTPException as e:
         # Re-raise HTTP exceptions
         raise
+
+    except asyncio.TimeoutError as e:
+        # Tool loop ran out of its wall-clock budget
+        raise HTTPException(status_code=504, detail=str(e) or "Tool loop timed out")
     
     except Exception as e:
-        print(f"Error in create_response endpoint: {str(e)}")
-        print(traceback.format_exc())
+        logger.exception("Error in create_response endpoint")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/batch")
+async def create_batch(request: BatchRequest):
+    """
+    Run many response requests in one call.
+
+    Online mode streams one NDJSON line per item as it completes, with the item's
+    index in the request. Offline mode submits the items to the OpenAI Batch API
+    and returns the batch, whose results are fetched from GET /batch/{batch_id}.
+    """
+    try:
+        if len(request.items) > OPENAI_BATCH_MAX_ITEMS:
+            raise HTTPException(status_code=413, detail=f"A batch can have at most {OPENAI_BATCH_MAX_ITEMS} items")
+        if request.mode not in ("online", "offline"):
+            raise HTTPException(status_code=400, detail="mode must be online or offline")
+
+        items = []
+        for item in request.items:
+            formatted_input = item.input
+            if isinstance(formatted_input, list):
+                formatted_input = [message.dict() for message in formatted_input]
+            items.append({
+                "input_text": formatted_input,
+                "model": item.model,
+                "tools": Tools.get_tools_by_names(item.tools) if item.tools else [],
+                "temperature": item.temperature,
+            })
+
+        if request.mode == "offline":
+            return await openai_utils.submit_batch(items)
+
+        concurrency = min(request.concurrency or OPENAI_BATCH_CONCURRENCY, OPENAI_BATCH_CONCURRENCY)
+        timeout = None
+        if REQUEST_STREAM_TIMEOUT:
+            # The server cuts streams off after REQUEST_STREAM_TIMEOUT; end with an error line first
+            timeout = max(REQUEST_STREAM_TIMEOUT - BATCH_TIMEOUT_MARGIN, 0)
+            if estimated_seconds(len(items), concurrency) > timeout:
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"An online batch of {len(items)} items cannot finish within {REQUEST_STREAM_TIMEOUT:g}s; "
+                           "use mode: offline",
+                )
+
+        for item, request_item in zip(items, request.items):
+            item["cache"] = request_item.cache
+        results = openai_utils.batch_responses(items, concurrency=concurrency, timeout=timeout)
+        return StreamingResponse(ndjson(results), media_type="application/x-ndjson")
+
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    except HTTPException as e:
+        raise
+
+    except Exception as e:
+        logger.exception("Error in create_batch endpoint")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/batch/{batch_id}")
+async def get_batch(batch_id: str):
+    """
+    Get the status of an offline batch, with results sorted by index once it has finished.
+    """
+    try:
+        return await openai_utils.get_batch(batch_id)
+    except openai.NotFoundError:
+        raise HTTPException(status_code=404, detail=f"Batch {batch_id} not found")
+    except Exception as e:
+        logger.exception("Error in get_batch endpoint")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.delete("/conversations/{conversation_id}")
+async def delete_conversation(conversation_id: str):
+    """
+    Forget a server-side conversation.
+    """
+    try:
+        await openai_utils.conversations.delete(conversation_id)
+        return {"success": True}
+    except Exception as e:
+        logger.exception("Error in delete_conversation endpoint")
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/single-agent-response")
@@ -80,14 +222,24 @@ async def create_single_agent_response(request: SingleAgentResponseRequest):
         # Get tool definitions based on the requested tool names
         processed_tools = Tools.get_function_tools_by_names(request.tools) if request.tools else []
         
-        print(f"Processed tools: {processed_tools}")
+        logger.debug("Processed tools: %s", request.tools)
         # Format input properly
         formatted_input = request.input
         if isinstance(formatted_input, list):
             # Convert Pydantic model objects to dictionaries
             formatted_input = [message.dict() for message in formatted_input]
         
-        print('TOOLS: ', processed_tools)
+        if request.stream:
+            events = openai_utils.stream_single_agent_response(
+                name=request.name,
+                instructions=request.instructions,
+                input_text=formatted_input,
+                model=request.model,
+                tools=processed_tools,
+                temperature=request.temperature,
+            )
+            return EventSourceResponse(to_sse(events))
+
         response = await openai_utils.create_single_agent_response(
             name=request.name,
             instructions=request.instructions,
@@ -108,8 +260,7 @@ async def create_single_agent_response(request: SingleAgentResponseRequest):
         raise
     
     except Exception as e:
-        print(f"Error in create_response endpoint: {str(e)}")
-        print(traceback.format_exc())
+        logger.exception("Error in create_single_agent_response endpoint")
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/available-tools")
@@ -120,3 +271,21 @@ async def get_available_tools():
     Returns the IDs of available tools that can be referenced in the /response endpoint.
     """
     return {"available_tools": list(Tools.get_all_tools_definitions())}
+
+@router.get("/response-cache/stats")
+async def get_response_cache_stats():
+    """
+    Get hit-rate metrics for the response cache of this worker process.
+    """
+    if openai_utils.response_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **(await openai_utils.response_cache.astats())}
+
+@router.get("/rate-limiter/stats")
+async def get_rate_limiter_stats():
+    """
+    Get queue depth, wait times and token usage of the OpenAI rate limiter in this worker process.
+    """
+    if openai_utils.rate_limiter is None:
+        return {"enabled": False}
+    return {"enabled": True, **(await openai_utils.rate_limiter.astats())}
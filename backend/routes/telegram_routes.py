@@ -1,13 +1,14 @@
 from typing import Optional
-from fastapi import APIRouter, HTTPException, Body
+from fastapi import APIRouter, HTTPException, Body, Response
 from pydantic import BaseModel
-from controller.telegram.telegram_utils import send_telegram_notification
+from controller.telegram.telegram_utils import telegram_sender, TelegramQueueFull, log_send_failure
 
 router = APIRouter()
 
 class TelegramMessage(BaseModel):
     message: str
     markdown: Optional[bool] = False
+    wait: Optional[bool] = False
     
 class MessageResponse(BaseModel):
     success: bool
@@ -15,14 +16,24 @@ class MessageResponse(BaseModel):
     response: Optional[dict] = None
 
 @router.post("/bot/send", response_model=MessageResponse)
-async def send_telegram_message(data: TelegramMessage):
+async def send_telegram_message(data: TelegramMessage, response: Response):
     """
     Send a text message to Telegram.
     
     Send a text message to the default Telegram chat configured in environment variables.
+    The message is queued and the endpoint returns 202 right away, unless wait is true,
+    in which case it returns once Telegram has accepted the message.
     """
     try:
-        response = send_telegram_notification(data.message, markdown=data.markdown)
-        return {"success": True, "message": "Message sent successfully", "response": response}
+        if data.wait:
+            result = await telegram_sender.send(data.message, markdown=data.markdown)
+            return {"success": True, "message": "Message sent successfully", "response": result}
+
+        # Nobody awaits the delivery, so log it if it fails
+        telegram_sender.enqueue(data.message, markdown=data.markdown).add_done_callback(log_send_failure)
+        response.status_code = 202
+        return {"success": True, "message": "Message queued"}
+    except TelegramQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e)) 
@@ -0,0 +1,74 @@
+import signal
+
+import pytest
+
+from controller.server import autoscaler
+from controller.server.autoscaler import BacklogAutoscaler
+
+
+class FakeLog:
+    def info(self, *args):
+        pass
+
+
+class FakeArbiter:
+    pid = 1234
+    log = FakeLog()
+
+    def __init__(self, num_workers: int):
+        self.num_workers = num_workers
+
+
+@pytest.fixture
+def signals(monkeypatch):
+    sent = []
+    monkeypatch.setattr(autoscaler.os, "kill", lambda pid, signum: sent.append((pid, signum)))
+    return sent
+
+
+def make(workers: int = 2, **kwargs) -> BacklogAutoscaler:
+    options = dict(min_workers=2, max_workers=4, backlog_high=8, up_samples=3, down_samples=5)
+    options.update(kwargs)
+    return BacklogAutoscaler(FakeArbiter(workers), ports=[8000], **options)
+
+
+def test_adds_a_worker_after_consecutive_saturated_samples(signals):
+    scaler = make()
+    assert scaler.step(8) is None
+    assert scaler.step(20) is None
+    assert scaler.step(8) == signal.SIGTTIN
+    assert signals == [(1234, signal.SIGTTIN)]
+
+
+def test_a_sample_below_the_threshold_restarts_the_count(signals):
+    scaler = make()
+    for backlog in (8, 8, 7, 8, 8):
+        assert scaler.step(backlog) is None
+    assert signals == []
+
+
+def test_counts_restart_after_a_resize(signals):
+    scaler = make()
+    for _ in range(3):
+        scaler.step(8)
+    assert scaler.step(8) is None
+    assert len(signals) == 1
+
+
+def test_removes_a_worker_after_consecutive_empty_samples(signals):
+    scaler = make(workers=3)
+    results = [scaler.step(0) for _ in range(5)]
+    assert results == [None] * 4 + [signal.SIGTTOU]
+    assert signals == [(1234, signal.SIGTTOU)]
+
+
+def test_stays_within_the_worker_bounds(signals):
+    at_max, at_min = make(workers=4), make(workers=2)
+    for _ in range(10):
+        at_max.step(100)
+        at_min.step(0)
+    assert signals == []
+
+
+def test_max_workers_is_never_below_min_workers():
+    assert make(min_workers=3, max_workers=1).max_workers == 3
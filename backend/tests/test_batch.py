@@ -0,0 +1,162 @@
+import asyncio
+
+import httpx
+import openai
+import pytest
+
+from controller.openai.batch import OPENAI_BATCH_ITEM_SECONDS, AdaptiveLimiter, estimated_seconds, run_batch
+
+
+def rate_limit_error(retry_after: str = "0") -> openai.RateLimitError:
+    request = httpx.Request("POST", "https://api.openai.com/v1/responses")
+    response = httpx.Response(429, headers={"retry-after": retry_after}, request=request)
+    return openai.RateLimitError("Rate limited", response=response, body=None)
+
+
+async def collect(results):
+    return [result async for result in results]
+
+
+def test_limiter_halves_on_429_and_recovers_after_successes():
+    async def run():
+        limiter = AdaptiveLimiter(4)
+        await limiter.acquire()
+        await limiter.release(rate_limited=True, retry_after=0)
+        assert limiter.limit == 2
+        for _ in range(2):
+            await limiter.acquire()
+            await limiter.release()
+        return limiter
+
+    limiter = asyncio.run(run())
+    assert limiter.limit == 3
+    assert limiter.rate_limited == 1
+
+
+def test_limiter_pauses_new_calls_for_the_retry_after():
+    async def run():
+        limiter = AdaptiveLimiter(4)
+        loop = asyncio.get_running_loop()
+        await limiter.acquire()
+        await limiter.release(rate_limited=True, retry_after=0.2)
+        started = loop.time()
+        await limiter.acquire()
+        return loop.time() - started
+
+    assert asyncio.run(run()) >= 0.15
+
+
+def test_run_batch_never_exceeds_the_concurrency():
+    in_flight = peak = 0
+
+    async def call(item):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.001)
+        in_flight -= 1
+        return item["value"] * 2
+
+    async def run():
+        results = run_batch([{"value": i} for i in range(50)], call, concurrency=3)
+        first = await results.__anext__()
+        # Workers, not one task per item
+        tasks = len(asyncio.all_tasks())
+        return [first] + await collect(results), tasks
+
+    results, tasks = asyncio.run(run())
+    assert peak <= 3
+    assert tasks <= 3 + 1
+    assert sorted(result["index"] for result in results) == list(range(50))
+    assert all(result["response"] == result["index"] * 2 for result in results)
+
+
+def test_run_batch_retries_after_429():
+    attempts = {}
+
+    async def call(item):
+        attempts[item["id"]] = attempts.get(item["id"], 0) + 1
+        if attempts[item["id"]] == 1:
+            raise rate_limit_error()
+        return "ok"
+
+    results = asyncio.run(collect(run_batch([{"id": i} for i in range(4)], call, concurrency=2)))
+    assert [result["status"] for result in results] == ["ok"] * 4
+    assert attempts == {0: 2, 1: 2, 2: 2, 3: 2}
+
+
+def test_run_batch_reports_an_item_that_stays_rate_limited():
+    async def call(item):
+        raise rate_limit_error()
+
+    results = asyncio.run(collect(run_batch([{}], call, concurrency=1, max_retries=2)))
+    assert results == [{"index": 0, "status": "error", "error": "Rate limited"}]
+
+
+def test_run_batch_reports_errors_per_item():
+    async def call(item):
+        if item["fail"]:
+            raise ValueError("bad item")
+        return "ok"
+
+    results = asyncio.run(collect(run_batch([{"fail": False}, {"fail": True}], call, concurrency=1)))
+    assert results == [
+        {"index": 0, "status": "ok", "response": "ok"},
+        {"index": 1, "status": "error", "error": "bad item"},
+    ]
+
+
+def test_closing_the_results_cancels_pending_items():
+    started, cancelled = [], []
+
+    async def call(item):
+        started.append(item["id"])
+        if item["id"] == 0:
+            return "ok"
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(item["id"])
+            raise
+
+    async def run():
+        results = run_batch([{"id": i} for i in range(10)], call, concurrency=2)
+        first = await results.__anext__()
+        await results.aclose()
+        await asyncio.sleep(0)
+        return first
+
+    assert asyncio.run(run())["index"] == 0
+    # Only the items a worker had taken were started, and they were cancelled
+    assert len(started) <= 3
+    assert sorted(cancelled) == sorted(started[1:])
+
+
+@pytest.mark.parametrize("items", [0, 1])
+def test_run_batch_with_few_items(items):
+    async def call(item):
+        return "ok"
+
+    assert len(asyncio.run(collect(run_batch([{}] * items, call, concurrency=4)))) == items
+
+
+def test_run_batch_ends_with_a_timeout_line():
+    async def call(item):
+        if item["slow"]:
+            await asyncio.sleep(10)
+        return "ok"
+
+    async def run():
+        items = [{"slow": False}, {"slow": True}, {"slow": True}]
+        return await collect(run_batch(items, call, concurrency=3, timeout=0.1))
+
+    assert asyncio.run(run()) == [
+        {"index": 0, "status": "ok", "response": "ok"},
+        {"status": "error", "error": "timeout"},
+    ]
+
+
+def test_estimated_seconds_counts_rounds_of_concurrent_calls():
+    assert estimated_seconds(16, 16) == OPENAI_BATCH_ITEM_SECONDS
+    assert estimated_seconds(17, 16) == 2 * OPENAI_BATCH_ITEM_SECONDS
+    assert estimated_seconds(0, 16) == 0
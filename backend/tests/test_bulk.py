@@ -0,0 +1,43 @@
+import httpx
+import pytest
+from postgrest.exceptions import APIError
+
+from controller.supabase.bulk import is_retryable
+
+REQUEST = httpx.Request("POST", "https://db.test/rest/v1/items")
+
+
+@pytest.mark.parametrize("error", [
+    httpx.ConnectError("refused", request=REQUEST),
+    httpx.ConnectTimeout("timed out", request=REQUEST),
+    httpx.PoolTimeout("no connection", request=REQUEST),
+    APIError({"code": 429, "message": "JSON could not be generated"}),
+    APIError({"code": "PGRST003", "message": "Timed out acquiring connection from connection pool."}),
+    APIError({"code": "40001", "message": "could not serialize access"}),
+    APIError({"code": "57014", "message": "canceling statement due to statement timeout"}),
+])
+def test_failures_that_wrote_nothing_are_always_retried(error):
+    assert is_retryable(error, idempotent=False)
+    assert is_retryable(error, idempotent=True)
+
+
+@pytest.mark.parametrize("error", [
+    httpx.ReadTimeout("no response", request=REQUEST),
+    httpx.RemoteProtocolError("connection closed", request=REQUEST),
+    APIError({"code": 502, "message": "JSON could not be generated"}),
+])
+def test_failures_that_may_have_written_are_only_retried_for_upserts(error):
+    assert not is_retryable(error, idempotent=False)
+    assert is_retryable(error, idempotent=True)
+
+
+@pytest.mark.parametrize("error", [
+    APIError({"code": "23505", "message": "duplicate key value violates unique constraint"}),
+    APIError({"code": "PGRST204", "message": "Could not find the 'nope' column"}),
+    APIError({"code": 400, "message": "JSON could not be generated"}),
+    APIError({}),
+    ValueError("not JSON serializable"),
+])
+def test_errors_about_the_rows_are_never_retried(error):
+    assert not is_retryable(error, idempotent=False)
+    assert not is_retryable(error, idempotent=True)
@@ -0,0 +1,27 @@
+import asyncio
+import time
+
+from controller.observability.diagnostics import LoopMonitor
+
+
+def test_heartbeat_records_lag_and_reset_starts_a_new_window():
+    monitor = LoopMonitor(interval=0.01, threshold=10, lag_history=100)
+
+    async def run():
+        monitor.start()
+        await asyncio.sleep(0.05)
+        # Hold the loop so the next heartbeat fires late
+        time.sleep(0.05)
+        await asyncio.sleep(0.03)
+        stats, kept = monitor.stats(), len(monitor.lags)
+        monitor.reset_lag()
+        after_reset = monitor.stats()
+        await monitor.stop()
+        return stats, kept, after_reset
+
+    stats, kept, after_reset = asyncio.run(run())
+    assert stats["running"]
+    assert stats["lag_samples"] == kept > 0
+    assert stats["lag_max_ms"] >= 30
+    assert after_reset["lag_samples"] == 0 and after_reset["lag_max_ms"] == 0
+    assert not monitor.lags
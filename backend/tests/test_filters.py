@@ -0,0 +1,105 @@
+import pytest
+
+from controller.supabase.filters import And, Col, Not, Or, Predicate, apply_filters, select_columns
+
+
+class RecordingQuery:
+    """Stands in for a postgrest query builder and records the filters applied to it"""
+    def __init__(self):
+        self.calls = []
+        self._negate_next = False
+
+    @property
+    def not_(self):
+        self._negate_next = True
+        return self
+
+    def filter(self, column, operator, criteria):
+        self.calls.append(("filter", column, operator, criteria))
+        return self
+
+    def eq(self, column, value):
+        self.calls.append(("eq", column, value))
+        return self
+
+    def or_(self, expression):
+        self.calls.append(("not.or" if self._negate_next else "or", expression))
+        self._negate_next = False
+        return self
+
+
+def applied(filters):
+    return apply_filters(RecordingQuery(), filters).calls
+
+
+def test_predicate_is_abstract():
+    with pytest.raises(TypeError):
+        Predicate()
+
+
+def test_condition_rendering():
+    assert Col("age").gte(18).to_postgrest() == "age.gte.18"
+    assert Col("deleted_at").is_(None).to_postgrest() == "deleted_at.is.null"
+    assert Col("vip").is_(True).to_postgrest() == "vip.is.true"
+    assert Col("status").in_(["open", "on hold"]).to_postgrest() == "status.in.(open,on hold)"
+
+
+def test_reserved_characters_are_quoted_inside_expressions():
+    assert Col("name").eq("a,b").to_postgrest() == 'name.eq."a,b"'
+    assert Col("name").eq('say "hi"').to_postgrest() == 'name.eq."say \\"hi\\""'
+    assert Col("tag").in_(["x.y", "z"]).to_postgrest() == 'tag.in.("x.y",z)'
+    # Top-level filters are not inside an expression and are sent as is
+    assert applied(Col("name").eq("a,b")) == [("filter", "name", "eq", "a,b")]
+
+
+def test_or_and_and_flatten():
+    a, b, c = Col("a").eq(1), Col("b").eq(2), Col("c").eq(3)
+    assert isinstance(a | b | c, Or) and len((a | b | c).predicates) == 3
+    assert isinstance(a & b & c, And) and len((a & b & c).predicates) == 3
+    assert ((a & b) | c).to_postgrest() == "or(and(a.eq.1,b.eq.2),c.eq.3)"
+
+
+def test_between_is_inclusive():
+    assert Col("age").between(18, 65).to_postgrest() == "and(age.gte.18,age.lte.65)"
+
+
+def test_negation_rendering():
+    a, b = Col("a").eq(1), Col("b").gt(2)
+    assert (~a).to_postgrest() == "a.not.eq.1"
+    assert (~(a | b)).to_postgrest() == "not.or(a.eq.1,b.gt.2)"
+    assert (~(a & b)).to_postgrest() == "not.and(a.eq.1,b.gt.2)"
+
+
+def test_double_negation_cancels():
+    a = Col("a").eq(1)
+    assert (~~a).to_postgrest() == "a.eq.1"
+    assert Not(Not(a)).to_postgrest() == "a.eq.1"
+    assert (~~~a).to_postgrest() == "a.not.eq.1"
+    assert applied(~~a) == [("filter", "a", "eq", "1")]
+
+
+def test_nested_negation():
+    a, b = Col("a").eq(1), Col("b").gt(2)
+    assert (~(~a & b)).to_postgrest() == "not.and(a.not.eq.1,b.gt.2)"
+    assert (~(a | ~b)).to_postgrest() == "not.or(a.eq.1,b.not.gt.2)"
+    # not(not a and b) is applied as (a or not b)
+    assert applied(~(~a & b)) == [("or", "a.eq.1,b.not.gt.2")]
+
+
+def test_apply():
+    a, b = Col("a").eq(1), Col("b").gt(2)
+    assert applied(a & b) == [("filter", "a", "eq", "1"), ("filter", "b", "gt", "2")]
+    assert applied(a | b) == [("or", "a.eq.1,b.gt.2")]
+    assert applied(~a) == [("filter", "a", "not.eq", "1")]
+    assert applied(~(a | b)) == [("not.or", "a.eq.1,b.gt.2")]
+    assert applied(~(a & b)) == [("or", "a.not.eq.1,b.not.gt.2")]
+
+
+def test_apply_filters_mixes_dicts_and_predicates():
+    assert applied([{"org": 7}, Col("a").eq(1)]) == [("eq", "org", 7), ("filter", "a", "eq", "1")]
+    assert applied(None) == []
+
+
+def test_select_columns():
+    assert select_columns("*") == "*"
+    assert select_columns(["id", "name"]) == "id,name"
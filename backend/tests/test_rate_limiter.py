@@ -0,0 +1,89 @@
+import asyncio
+
+import pytest
+
+from controller.openai.rate_limiter import MemoryBucketStore, RateLimiter, SQLiteBucketStore, _take
+
+
+def test_take_spends_one_request_and_the_tokens():
+    state, wait = _take((60, 1000, 0.0), now=0.0, rpm=60, tpm=1000, tokens=100)
+    assert wait == 0
+    assert state == (59, 900, 0.0)
+
+
+def test_take_refills_in_proportion_to_elapsed_time():
+    # 60 rpm and 600 tpm refill one request and 10 tokens per second
+    state, wait = _take((0, 0, 0.0), now=2.0, rpm=60, tpm=600, tokens=10)
+    assert wait == 0
+    assert state == pytest.approx((1, 10, 2.0))
+
+
+def test_take_refill_is_capped_at_the_limit():
+    state, _ = _take((60, 1000, 0.0), now=3600.0, rpm=60, tpm=1000, tokens=0)
+    assert state[:2] == (59, 1000)
+
+
+def test_take_reports_the_wait_of_the_emptier_bucket():
+    # One request is free, but 50 more tokens take 5s at 600 tpm
+    state, wait = _take((1, 50, 0.0), now=0.0, rpm=60, tpm=600, tokens=100)
+    assert wait == pytest.approx(5.0)
+    assert state == (1, 50, 0.0)
+
+    _, wait = _take((0.5, 1000, 0.0), now=0.0, rpm=60, tpm=1000, tokens=1)
+    assert wait == pytest.approx(0.5)
+
+
+def test_take_ignores_a_disabled_bucket():
+    state, wait = _take((0, 0, 0.0), now=0.0, rpm=0, tpm=600, tokens=0)
+    assert wait == 0
+    state, wait = _take((0, 0, 0.0), now=0.0, rpm=60, tpm=0, tokens=10**6)
+    assert wait == pytest.approx(1.0)
+
+
+@pytest.mark.parametrize("make_store", [
+    lambda tmp_path: MemoryBucketStore(60, 1000),
+    lambda tmp_path: SQLiteBucketStore(str(tmp_path / "limits.sqlite3"), 60, 1000),
+])
+def test_store_take_and_adjust(tmp_path, make_store):
+    store = make_store(tmp_path)
+    assert store.try_take(600) == 0
+    assert store.try_take(600) > 0
+    store.adjust(300)
+    assert store.levels()["tokens_available"] == pytest.approx(700, abs=1)
+    # Returned tokens never overfill the bucket
+    store.adjust(10**6)
+    assert store.levels()["tokens_available"] == 1000
+
+
+def test_sqlite_stores_share_buckets(tmp_path):
+    path = str(tmp_path / "limits.sqlite3")
+    first, second = SQLiteBucketStore(path, 60, 1000), SQLiteBucketStore(path, 60, 1000)
+    assert first.try_take(800) == 0
+    assert second.try_take(800) > 0
+
+
+def test_limiter_corrects_the_estimate_with_reported_usage(tmp_path):
+    class Usage:
+        total_tokens = 100
+
+    async def run(limiter):
+        reserved = await limiter.acquire(600)
+        await limiter.arecord_usage(reserved, Usage())
+        return await limiter.astats()
+
+    limiter = RateLimiter(rpm=0, tpm=1000, path=str(tmp_path / "limits.sqlite3"), max_wait=1)
+    stats = asyncio.run(run(limiter))
+    assert stats["tokens_available"] == pytest.approx(900, abs=1)
+    assert stats["tokens_used"] == 100
+
+
+def test_limiter_times_out_when_capacity_does_not_return():
+    limiter = RateLimiter(rpm=1, tpm=0, path=None, max_wait=0.1)
+
+    async def run():
+        await limiter.acquire(1)
+        with pytest.raises(TimeoutError):
+            await limiter.acquire(1)
+
+    asyncio.run(run())
+    assert limiter.timeouts == 1
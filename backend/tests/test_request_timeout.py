@@ -0,0 +1,61 @@
+import asyncio
+import json
+
+from controller.server.request_timeout import RequestTimeoutMiddleware
+
+
+def run_app(app, path="/slow"):
+    """Call an ASGI app with an HTTP GET and return the messages it sent"""
+    scope = {"type": "http", "method": "GET", "path": path, "headers": []}
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    return messages
+
+
+def sleeping_app(before_start: float, chunks: int = 0, between_chunks: float = 0):
+    async def app(scope, receive, send):
+        await asyncio.sleep(before_start)
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        for _ in range(chunks):
+            await send({"type": "http.response.body", "body": b"chunk", "more_body": True})
+            await asyncio.sleep(between_chunks)
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+    return app
+
+
+def test_fast_response_passes_through():
+    messages = run_app(RequestTimeoutMiddleware(sleeping_app(0), timeout=1, stream_timeout=1))
+    assert messages[0]["status"] == 200
+    assert messages[-1] == {"type": "http.response.body", "body": b"", "more_body": False}
+
+
+def test_response_that_does_not_start_gets_a_504():
+    messages = run_app(RequestTimeoutMiddleware(sleeping_app(10), timeout=0.1, stream_timeout=1))
+    assert messages[0]["status"] == 504
+    assert json.loads(messages[1]["body"]) == {"detail": "Request timed out"}
+
+
+def test_started_stream_runs_past_the_timeout_until_the_stream_timeout():
+    app = sleeping_app(0, chunks=100, between_chunks=0.05)
+    messages = run_app(RequestTimeoutMiddleware(app, timeout=0.1, stream_timeout=0.3))
+    assert messages[0]["status"] == 200
+    chunks = [message for message in messages[1:] if message["body"]]
+    # Longer than the first-byte timeout, cut off at the stream timeout without a 504 or a final body
+    assert 2 < len(chunks) < 100
+    assert all(message["more_body"] for message in messages[1:])
+
+
+def test_excluded_path_is_not_bounded():
+    app = RequestTimeoutMiddleware(sleeping_app(0.2), timeout=0.05, stream_timeout=0.05, exclude=("/metrics",))
+    assert run_app(app, path="/metrics")[0]["status"] == 200
+
+
+def test_zero_timeout_disables_the_bound():
+    assert run_app(RequestTimeoutMiddleware(sleeping_app(0.1), timeout=0, stream_timeout=0))[0]["status"] == 200
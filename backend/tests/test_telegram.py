@@ -0,0 +1,66 @@
+import asyncio
+
+import httpx
+import pytest
+
+from controller.telegram import telegram_utils
+from controller.telegram.telegram_utils import TelegramSender, TelegramSenderClosed
+
+
+@pytest.fixture(autouse=True)
+def no_waits(monkeypatch):
+    monkeypatch.setattr(telegram_utils, "TELEGRAM_GLOBAL_RATE", 10**6)
+    monkeypatch.setattr(telegram_utils, "TELEGRAM_CHAT_INTERVAL", 0)
+
+
+def sender_with(handler, **kwargs) -> TelegramSender:
+    sender = TelegramSender(bot_token="token", chat_id="1", **kwargs)
+    sender._client = httpx.AsyncClient(base_url="https://telegram.test", transport=httpx.MockTransport(handler))
+    return sender
+
+
+def test_connection_errors_are_retried(monkeypatch):
+    sleep = asyncio.sleep
+    monkeypatch.setattr(telegram_utils.asyncio, "sleep", lambda delay: sleep(0))
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if len(calls) == 1:
+            raise httpx.ConnectError("refused", request=request)
+        return httpx.Response(200, json={"ok": True})
+
+    sender = sender_with(handler)
+    assert asyncio.run(sender._post("1", "hello", False)) == {"ok": True}
+    assert len(calls) == 2
+
+
+def test_read_timeouts_are_not_retried():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        raise httpx.ReadTimeout("no response", request=request)
+
+    sender = sender_with(handler)
+    with pytest.raises(httpx.ReadTimeout):
+        asyncio.run(sender._post("1", "hello", False))
+    # The message may have been delivered, so it is not sent again
+    assert len(calls) == 1
+
+
+def test_aclose_fails_messages_that_were_not_sent():
+    async def handler(request):
+        await asyncio.sleep(10)
+
+    async def run():
+        sender = sender_with(handler)
+        futures = [sender.enqueue(f"message {i}") for i in range(3)]
+        await asyncio.sleep(0.01)
+        await sender.aclose(timeout=0.01)
+        results = await asyncio.gather(*futures, return_exceptions=True)
+        return sender, results
+
+    sender, results = asyncio.run(run())
+    assert all(isinstance(result, TelegramSenderClosed) for result in results)
+    assert sender.pending == 0